@@ -0,0 +1,227 @@
+"""Shared helpers for the benchmark scripts.
+
+The application modules live in `src/` and import each other as top-level
+packages (`models`, `services`, ...), so benchmarks put `src/` on the path
+the same way `python src/main.py` does.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+SRC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"
+)
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from sqlalchemy import event  # noqa: E402
+
+from interfaces.indexable_document_interface import (  # noqa: E402
+    IndexableDocumentInterface,
+)
+
+
+class StatementCounter:
+    """Count SQL statements and commits issued through an engine.
+
+    Statements mentioning `watch_table` are additionally counted in
+    `table_queries`, which isolates e.g. token resolution from entry writes.
+    """
+
+    def __init__(self, engine, watch_table: str = "") -> None:
+        self.engine = engine
+        self.watch_table = watch_table
+        self.queries = 0
+        self.table_queries = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries += 1
+        if self.watch_table and self.watch_table in statement:
+            self.table_queries += 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def reset(self) -> None:
+        self.queries = 0
+        self.table_queries = 0
+        self.commits = 0
+
+
+class SampleFields:
+    def __init__(self, fields, weights) -> None:
+        self.fields = fields
+        self.weights = weights
+
+
+class SampleDocument(IndexableDocumentInterface):
+    """Minimal `IndexableDocumentInterface` implementation for benchmarks."""
+
+    def __init__(self, document_type: int, document_id: int, fields, weights) -> None:
+        self.document_type = document_type
+        self.document_id = document_id
+        self.indexable_fields = SampleFields(fields, weights)
+
+    def get_document_id(self) -> int:
+        return self.document_id
+
+    def get_document_type(self) -> int:
+        return self.document_type
+
+    def get_indexable_fields(self):
+        return self.indexable_fields
+
+
+WORDS = (
+    "the and with for organic cotton shirt trousers leather boots wireless "
+    "headphones stainless steel kitchen knife waterproof jacket running shoes "
+    "ceramic coffee mug bamboo cutting board portable charger vintage denim "
+    "backpack travel adapter garden hose ergonomic office chair standing desk"
+).split()
+
+
+def make_documents(count: int, seed: int = 42, document_type: int = 1):
+    """Build `count` product-like documents with a title and a description."""
+    import random
+
+    rng = random.Random(seed)
+    documents = []
+    for document_id in range(1, count + 1):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 6)))
+        description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 40)))
+        documents.append(
+            SampleDocument(
+                document_type,
+                document_id,
+                {1: title, 2: description},
+                {1: 10, 2: 1},
+            )
+        )
+    return documents
+
+
+def make_vocabulary(size: int, seed: int = 42):
+    """Build `size` distinct pronounceable pseudo-words of 4-10 letters."""
+    import random
+
+    rng = random.Random(seed)
+    consonants, vowels = "bcdfghklmnprstvz", "aeiou"
+    words = set()
+    while len(words) < size:
+        length = rng.randint(4, 10)
+        words.add(
+            "".join(
+                rng.choice(consonants if i % 2 == 0 else vowels) for i in range(length)
+            )
+        )
+    return sorted(words)
+
+
+def make_zipf_documents(
+    count: int,
+    vocabulary_size: int = 20_000,
+    exponent: float = 1.1,
+    seed: int = 42,
+    document_type: int = 1,
+):
+    """Build documents whose words follow a Zipf distribution.
+
+    Returns (documents, vocabulary ordered from most to least frequent).
+    """
+    import random
+
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    rng.shuffle(vocabulary)
+    weights = [1.0 / (rank**exponent) for rank in range(1, vocabulary_size + 1)]
+
+    documents = []
+    for document_id in range(1, count + 1):
+        title = rng.choices(vocabulary, weights=weights, k=rng.randint(3, 6))
+        description = rng.choices(vocabulary, weights=weights, k=rng.randint(20, 40))
+        documents.append(
+            SampleDocument(
+                document_type,
+                document_id,
+                {1: " ".join(title), 2: " ".join(description)},
+                {1: 10, 2: 1},
+            )
+        )
+    return documents, vocabulary
+
+
+# Field ids and weights of the synthetic catalog built by `iter_corpus`
+CORPUS_FIELDS = {"title": 1, "description": 2, "brand": 3, "category": 4}
+CORPUS_WEIGHTS = {1: 10, 2: 1, 3: 5, 4: 3}
+
+
+def iter_corpus(
+    count: int,
+    seed: int = 42,
+    vocabulary_size: int = 50_000,
+    exponent: float = 1.07,
+    document_type: int = 1,
+):
+    """Lazily generate a seeded, product-like synthetic catalog.
+
+    Titles and descriptions draw words from a Zipfian vocabulary; brands and
+    categories come from small Zipfian pools of their own. Descriptions mix
+    in capitalized words, punctuation, sizes and model numbers. Documents
+    are generated from one random stream, so the first N documents of a
+    larger corpus equal the corpus of N documents with the same seed.
+    """
+    import itertools
+    import random
+
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    rng.shuffle(vocabulary)
+    cumulative = list(
+        itertools.accumulate(
+            1.0 / (rank**exponent) for rank in range(1, vocabulary_size + 1)
+        )
+    )
+    brands = [word.capitalize() for word in make_vocabulary(500, seed + 1)]
+    brand_weights = list(
+        itertools.accumulate(1.0 / rank for rank in range(1, len(brands) + 1))
+    )
+    categories = [
+        " > ".join(words)
+        for words in zip(
+            rng.choices(vocabulary[:40], k=300),
+            rng.choices(vocabulary[40:400], k=300),
+            rng.choices(vocabulary[400:4000], k=300),
+        )
+    ]
+    decorations = ("", "", "", "", ",", ".", "!", ":", " -", " (new)")
+
+    for document_id in range(1, count + 1):
+        title = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(3, 8))
+        description = []
+        for word in rng.choices(
+            vocabulary, cum_weights=cumulative, k=rng.randint(10, 40)
+        ):
+            roll = rng.random()
+            if roll < 0.05:
+                word = word.capitalize()
+            elif roll < 0.08:
+                word = f"{rng.randint(1, 999)}{rng.choice(('mm', 'cm', 'ml', 'g'))}"
+            elif roll < 0.1:
+                word = f"{word[:2].upper()}-{rng.randint(100, 9999)}"
+            description.append(word + rng.choice(decorations))
+        yield SampleDocument(
+            document_type,
+            document_id,
+            {
+                1: " ".join(title).capitalize(),
+                2: " ".join(description),
+                3: rng.choices(brands, cum_weights=brand_weights)[0],
+                4: rng.choice(categories),
+            },
+            dict(CORPUS_WEIGHTS),
+        )
@@ -0,0 +1,143 @@
+"""Per-field entries vs aggregated postings (one row per token and document).
+
+Indexes the synthetic catalog once per layout into an on-disk database and
+reports tokens, entry rows, file size, indexing speed and search latency of
+the SQL backend. Search results (documents and scores) of both layouts must
+be identical. Finally the per-field database is reindexed with the
+aggregated layout, which must leave exactly the rows of a fresh aggregated
+index.
+
+    python benchmarks/bench_aggregated_entries.py --documents 5000 --queries 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import iter_corpus
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+import models.index_entry  # noqa: F401
+import models.index_field_hash  # noqa: F401
+import models.index_token  # noqa: F401
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def make_queries(documents, count: int, seed: int):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(documents).get_indexable_fields().fields[1].split()
+        queries.append(" ".join(rng.sample(words, min(len(words), 2))))
+    return queries
+
+
+def count_rows(session: Session, table: str) -> int:
+    return session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+
+def run(layout: str, directory: str, documents, queries, limit: int) -> dict:
+    path = os.path.join(directory, f"{layout}.db")
+    engine = create_sqlite_engine(SqliteSettings(database_file=path))
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        service = SearchIndexingService(
+            session, build_tokenizers(), aggregate_entries=layout == "aggregated"
+        )
+        stats = service.index_documents(documents)
+        session.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        tokens = count_rows(session, "indextoken")
+        entries = count_rows(session, "indexentry")
+
+        search = SearchService(session, build_tokenizers())
+        latencies, results = [], []
+        for query in queries:
+            started = time.perf_counter()
+            found = search.search(1, query, limit=limit)
+            latencies.append(time.perf_counter() - started)
+            results.append([(result.document_id, result.score) for result in found])
+    engine.dispose()
+
+    return {
+        "layout": layout,
+        "tokens": tokens,
+        "entries": entries,
+        "size_mb": os.path.getsize(path) / 1e6,
+        "docs_per_s": stats.documents_per_second,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": statistics.quantiles(latencies, n=100)[98] * 1000,
+        "results": results,
+        "path": path,
+    }
+
+
+def switch_layout(path: str, documents) -> int:
+    """Reindex a per-field database with the aggregated layout; return rows."""
+    engine = create_sqlite_engine(SqliteSettings(database_file=path))
+    with Session(engine) as session:
+        SearchIndexingService(
+            session, build_tokenizers(), aggregate_entries=True
+        ).index_documents(documents)
+        entries = count_rows(session, "indexentry")
+    engine.dispose()
+    return entries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = list(iter_corpus(args.documents, seed=args.seed))
+    queries = make_queries(documents, args.queries, args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [
+            run(layout, directory, documents, queries, args.limit)
+            for layout in ("fields", "aggregated")
+        ]
+        print(
+            f"{'layout':<11} {'tokens':>9} {'entries':>10} {'size MB':>8} "
+            f"{'docs/s':>8} {'p50 ms':>7} {'p99 ms':>7}"
+        )
+        for result in runs:
+            print(
+                f"{result['layout']:<11} {result['tokens']:>9} "
+                f"{result['entries']:>10} {result['size_mb']:>8.1f} "
+                f"{result['docs_per_s']:>8.1f} {result['p50_ms']:>7.2f} "
+                f"{result['p99_ms']:>7.2f}"
+            )
+        identical = runs[0]["results"] == runs[1]["results"]
+        print(f"search results identical: {identical}")
+        switched = switch_layout(runs[0]["path"], documents)
+        print(
+            f"fields -> aggregated reindex: {switched} entries "
+            f"(fresh: {runs[1]['entries']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
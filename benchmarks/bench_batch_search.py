@@ -0,0 +1,119 @@
+"""Batch search: `search_many` vs one `search` call per query.
+
+Indexes the synthetic catalog into an on-disk database and answers batches
+of queries (e.g. the widgets of one page) both ways with the SQL backend,
+reporting the time per batch and SQL statements per batch. Results of both
+must be identical.
+
+    python benchmarks/bench_batch_search.py --documents 5000 --batch 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import StatementCounter, iter_corpus
+
+from sqlmodel import Session
+
+from services.schema_migration_service import SchemaMigrationService
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def make_batches(documents, batches: int, size: int, seed: int):
+    """Batches of one- and two-word queries from the same few documents."""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(batches):
+        related = rng.sample(documents, 3)
+        batch = []
+        for _ in range(size):
+            words = rng.choice(related).get_indexable_fields().fields[1].split()
+            batch.append(
+                " ".join(rng.sample(words, min(len(words), rng.randint(1, 2))))
+            )
+        result.append(batch)
+    return result
+
+
+def as_rows(results):
+    return [
+        [(result.document_id, result.score) for result in found] for found in results
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = list(iter_corpus(args.documents, seed=args.seed))
+    batches = make_batches(documents, args.batches, args.batch, args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(
+            SqliteSettings(database_file=os.path.join(directory, "batch.db"))
+        )
+        SchemaMigrationService(engine).migrate()
+        with Session(engine) as session:
+            SearchIndexingService(session, build_tokenizers()).index_documents(
+                documents
+            )
+            service = SearchService(session, build_tokenizers())
+            modes = {
+                "sequential": lambda batch: [
+                    service.search(1, query, limit=args.limit) for query in batch
+                ],
+                "search_many": lambda batch: service.search_many(
+                    1, batch, limit=args.limit
+                ),
+            }
+            counter = StatementCounter(engine)
+            timings = {mode: [] for mode in modes}
+            statements = {mode: 0 for mode in modes}
+            results = {mode: [] for mode in modes}
+            for batch in batches:
+                for mode, run in modes.items():
+                    counter.reset()
+                    started = time.perf_counter()
+                    found = run(batch)
+                    timings[mode].append(time.perf_counter() - started)
+                    statements[mode] += counter.queries
+                    results[mode].append(as_rows(found))
+        engine.dispose()
+
+    print(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'SQL/batch':>10}")
+    for mode in modes:
+        cuts = statistics.quantiles(timings[mode], n=20)
+        print(
+            f"{mode:<12} {statistics.median(timings[mode]) * 1000:>8.2f} "
+            f"{cuts[18] * 1000:>8.2f} {statements[mode] / len(batches):>10.1f}"
+        )
+    identical = results["sequential"] == results["search_many"]
+    print(f"results identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
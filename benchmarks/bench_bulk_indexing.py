@@ -0,0 +1,77 @@
+"""Compare per-document indexing with the chunked `index_documents` API.
+
+python benchmarks/bench_bulk_indexing.py --documents 5000 --batch-size 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from _common import StatementCounter, make_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from services.search_indexing_service import SearchIndexingService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def run(mode: str, documents, batch_size: int) -> dict:
+    # A file database so commits pay the real journal cost
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        counter = StatementCounter(engine)
+
+        with Session(engine) as session:
+            service = SearchIndexingService(session, build_tokenizers())
+            started = time.perf_counter()
+            if mode == "per-document":
+                for document in documents:
+                    service.index_document(document)
+            else:
+                service.index_documents(iter(documents), batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return {
+        "mode": mode,
+        "docs_per_s": len(documents) / elapsed,
+        "queries": counter.queries,
+        "commits": counter.commits,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, seed=args.seed)
+    print(f"{'mode':<14} {'docs/s':>10} {'queries':>10} {'commits':>10}")
+    for mode in ("per-document", "bulk"):
+        result = run(mode, documents, args.batch_size)
+        print(
+            f"{result['mode']:<14} {result['docs_per_s']:>10.1f} "
+            f"{result['queries']:>10} {result['commits']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Delete-and-reinsert vs change-aware reindexing of a document update stream.
+
+The corpus is indexed once, then a stream of updates is applied one document
+at a time. Most updates leave the indexed text alone (e.g. a price change),
+some change one word of the description and a few rewrite the title.
+"replace" drops the stored field hashes before each update, so every update
+deletes and reinserts all entries of its document as before; "diff" skips
+unchanged documents and only writes the entries that differ. Rows written
+are SQLite's `total_changes`; search results of both databases must match.
+
+    python benchmarks/bench_incremental_reindex.py --documents 2000 --updates 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from _common import SampleDocument, make_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def make_updates(documents, count: int, unchanged: float, seed: int):
+    rng = random.Random(seed)
+    words = " ".join(
+        " ".join(document.indexable_fields.fields.values()) for document in documents
+    ).split()
+
+    updates = []
+    for _ in range(count):
+        document = rng.choice(documents)
+        fields = dict(document.indexable_fields.fields)
+        roll = rng.random()
+        if roll >= unchanged:
+            field_id = 1 if roll >= unchanged + (1 - unchanged) * 0.75 else 2
+            text = fields[field_id].split()
+            text[rng.randrange(len(text))] = rng.choice(words)
+            fields[field_id] = " ".join(text)
+        updated = SampleDocument(
+            document.document_type,
+            document.document_id,
+            fields,
+            dict(document.indexable_fields.weights),
+        )
+        updates.append(updated)
+        documents[document.document_id - 1] = updated
+    return updates
+
+
+def run(mode: str, documents, updates, queries) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            service = SearchIndexingService(session, build_tokenizers())
+            service.index_documents(documents)
+
+            connection = session.connection().connection.dbapi_connection
+            changes_before = connection.total_changes
+            started = time.perf_counter()
+            for document in updates:
+                if mode == "replace":
+                    service._remove_document_index(
+                        document.document_type, document.document_id
+                    )
+                service.index_document(document)
+            elapsed = time.perf_counter() - started
+            connection = session.connection().connection.dbapi_connection
+            rows_written = connection.total_changes - changes_before
+
+            search = SearchService(session, build_tokenizers())
+            results = [
+                [(r.document_id, r.score) for r in search.search(1, query, limit=20)]
+                for query in queries
+            ]
+        engine.dispose()
+
+    return {
+        "mode": mode,
+        "updates_per_s": len(updates) / elapsed,
+        "rows_written": rows_written,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument(
+        "--unchanged", type=float, default=0.8, help="Share of no-op updates"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, seed=args.seed)
+    initial = list(documents)
+    updates = make_updates(documents, args.updates, args.unchanged, args.seed)
+    rng = random.Random(args.seed)
+    queries = [
+        " ".join(
+            rng.sample(
+                " ".join(
+                    rng.choice(documents).indexable_fields.fields.values()
+                ).split(),
+                2,
+            )
+        )
+        for _ in range(50)
+    ]
+
+    results = {}
+    print(f"{'mode':<8} {'updates/s':>10} {'rows written':>13}")
+    for mode in ("replace", "diff"):
+        result = run(mode, initial, updates, queries)
+        results[mode] = result["results"]
+        print(
+            f"{mode:<8} {result['updates_per_s']:>10.1f} "
+            f"{result['rows_written']:>13}"
+        )
+    print(f"search results identical: {results['replace'] == results['diff']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Single-document updates: one commit per call vs the journaled ingest buffer.
+
+Replays a stream of small updates (a few hot documents updated repeatedly)
+into an on-disk database, once through `index_document` per update and once
+through `IngestBuffer` with and without fsync of its journal. Reports
+updates/s, commits and the latency of `wait_visible` after the last update.
+Every run must leave the same index entries.
+
+Then crashes a buffer between sealing its journal and committing, and checks
+that a restarted buffer replays the updates, reports them visible only once
+they are committed, and keeps flushing afterwards.
+
+    python benchmarks/bench_ingest_buffer.py --updates 5000 --documents 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import threading
+import random
+import tempfile
+import time
+
+from _common import StatementCounter, iter_corpus
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from services.ingest_buffer import IngestBuffer
+from services.schema_migration_service import SchemaMigrationService
+from services.search_indexing_service import SearchIndexingService
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def make_updates(count: int, documents: int, seed: int):
+    """Updates of random documents; a fifth of them hit 1% of the documents."""
+    corpus = list(iter_corpus(documents, seed=seed))
+    rng = random.Random(seed)
+    hot = corpus[: max(1, documents // 100)]
+    return [rng.choice(hot if rng.random() < 0.2 else corpus) for _ in range(count)]
+
+
+def entries(engine) -> list:
+    with Session(engine) as session:
+        return session.execute(
+            text(
+                "SELECT e.document_id, t.name, t.weight, e.field_id, e.weight "
+                "FROM indexentry e JOIN indextoken t ON t.id = e.token_id "
+                "ORDER BY 1, 2, 3, 4"
+            )
+        ).all()
+
+
+def run(mode: str, directory: str, updates) -> dict:
+    engine = create_sqlite_engine(
+        SqliteSettings(database_file=os.path.join(directory, f"{mode}.db"))
+    )
+    SchemaMigrationService(engine).migrate()
+    counter = StatementCounter(engine)
+    wait_ms = 0.0
+    started = time.perf_counter()
+    if mode == "per-call":
+        with Session(engine) as session:
+            service = SearchIndexingService(session, build_tokenizers())
+            for document in updates:
+                service.index_document(document)
+    else:
+        buffer = IngestBuffer(
+            lambda session: SearchIndexingService(session, build_tokenizers()),
+            lambda: Session(engine),
+            os.path.join(directory, f"{mode}.journal"),
+            fsync=mode == "buffer+fsync",
+        )
+        buffer.start()
+        for document in updates:
+            sequence = buffer.submit([document])
+        waited = time.perf_counter()
+        buffer.wait_visible(sequence)
+        wait_ms = (time.perf_counter() - waited) * 1000
+        buffer.stop()
+    elapsed = time.perf_counter() - started
+    result = {
+        "mode": mode,
+        "updates_per_s": len(updates) / elapsed,
+        "commits": counter.commits,
+        "wait_ms": wait_ms,
+        "entries": entries(engine),
+    }
+    engine.dispose()
+    return result
+
+
+def check_crash_replay(directory: str, documents) -> bool:
+    """Kill a flush inside `index_documents`, restart, and replay the journal."""
+    engine = create_sqlite_engine(
+        SqliteSettings(database_file=os.path.join(directory, "crash.db"))
+    )
+    SchemaMigrationService(engine).migrate()
+    journal = os.path.join(directory, "crash.journal")
+    crashed, resume = threading.Event(), threading.Event()
+
+    class Crash:
+        def index_documents(self, documents, batch_size):
+            # Sealed but never committed; the flush thread never returns,
+            # as if the process had died here
+            crashed.set()
+            threading.Event().wait()
+
+    buffer = IngestBuffer(lambda session: Crash(), lambda: Session(engine), journal)
+    buffer.start()
+    buffer.submit(documents[:10])
+    buffer.wait_visible(buffer.submitted_sequence, timeout=0)
+    crashed.wait(10)
+
+    class Delayed(SearchIndexingService):
+        def index_documents(self, documents, batch_size):
+            resume.wait(10)
+            return super().index_documents(documents, batch_size=batch_size)
+
+    restarted = IngestBuffer(
+        lambda session: Delayed(session, build_tokenizers()),
+        lambda: Session(engine),
+        journal,
+    )
+    restarted.start()
+    replayed = restarted.stats()
+    resume.set()
+    visible = restarted.wait_visible(replayed["submitted_sequence"], timeout=10)
+    later = restarted.wait_visible(restarted.submit(documents[10:20]), timeout=10)
+    stats = restarted.stats()
+    restarted.stop()
+    indexed = {row[0] for row in entries(engine)}
+    engine.dispose()
+    return (
+        replayed["sealed_journals"] == 1
+        and replayed["visible_sequence"] < replayed["submitted_sequence"]
+        and visible
+        and later
+        and stats["sealed_journals"] == 0
+        and indexed == {document.document_id for document in documents[:20]}
+        and glob.glob(glob.escape(journal) + ".*") == []
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    updates = make_updates(args.updates, args.documents, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [
+            run(mode, directory, updates)
+            for mode in ("per-call", "buffer+fsync", "buffer")
+        ]
+    print(f"{'mode':<13} {'updates/s':>10} {'commits':>8} {'wait ms':>8}")
+    for result in runs:
+        print(
+            f"{result['mode']:<13} {result['updates_per_s']:>10.1f} "
+            f"{result['commits']:>8} {result['wait_ms']:>8.1f}"
+        )
+    identical = all(result["entries"] == runs[0]["entries"] for result in runs)
+    print(f"index entries identical: {identical}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        recovered = check_crash_replay(directory, updates)
+    print(f"crash between seal and commit recovered: {recovered}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Index maintenance: orphan tokens, file size and search latency after churn.
+
+Indexes the synthetic catalog into an on-disk database, then reindexes a
+share of the documents with the text of another catalog, which leaves
+orphan tokens and a fragmented entry table behind. Runs every maintenance
+task while a reader thread keeps searching, and reports tokens, file size,
+free pages and search latency before and after, plus the reader's latency
+during maintenance. Searches must return the same results before and after.
+Finally snapshots the database while a writer keeps indexing and checks the
+snapshot's integrity.
+
+    python benchmarks/bench_maintenance.py --documents 20000 --churn 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from _common import iter_corpus
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from services.index_maintenance_service import (
+    MAINTENANCE_TASKS,
+    IndexMaintenanceService,
+    MaintenanceSettings,
+)
+from services.schema_migration_service import SchemaMigrationService
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def make_queries(documents, count: int, seed: int):
+    rng = random.Random(seed)
+    queries = []
+    for document in rng.sample(documents, count):
+        words = document.get_indexable_fields().fields[1].split()
+        queries.append(" ".join(rng.sample(words, min(len(words), 2))))
+    return queries
+
+
+def storage(engine, path: str) -> dict:
+    with Session(engine) as session:
+        tokens = session.execute(text("SELECT COUNT(*) FROM indextoken")).scalar()
+        orphans = session.execute(
+            text(
+                "SELECT COUNT(*) FROM indextoken WHERE id NOT IN "
+                "(SELECT token_id FROM indexentry)"
+            )
+        ).scalar()
+        free_pages = session.execute(text("PRAGMA freelist_count")).scalar()
+    size = sum(
+        os.path.getsize(file) for file in (path, f"{path}-wal") if os.path.exists(file)
+    )
+    return {"tokens": tokens, "orphans": orphans, "bytes": size, "free": free_pages}
+
+
+def search_all(engine, queries, limit: int):
+    latencies, results = [], []
+    with Session(engine) as session:
+        service = SearchService(session, build_tokenizers())
+        for query in queries:
+            started = time.perf_counter()
+            found = service.search(1, query, limit=limit)
+            latencies.append(time.perf_counter() - started)
+            results.append([(result.document_id, result.score) for result in found])
+    return latencies, results
+
+
+def percentiles(latencies) -> str:
+    cuts = statistics.quantiles(latencies, n=20)
+    return f"p50 {statistics.median(latencies) * 1000:.2f} ms, p95 {cuts[18] * 1000:.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--churn", type=float, default=0.5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pause-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = list(iter_corpus(args.documents, seed=args.seed))
+    churned = list(iter_corpus(int(args.documents * args.churn), seed=args.seed + 1))
+    current = churned + documents[len(churned) :]
+    queries = make_queries(current, args.queries, args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "maintenance.db")
+        engine = create_sqlite_engine(SqliteSettings(database_file=path))
+        SchemaMigrationService(engine).migrate()
+        with Session(engine) as session:
+            service = SearchIndexingService(session, build_tokenizers())
+            service.index_documents(documents)
+            service.index_documents(churned)
+
+        before = storage(engine, path)
+        latencies_before, results_before = search_all(engine, queries, args.limit)
+
+        maintenance = IndexMaintenanceService(
+            engine, MaintenanceSettings(pause_seconds=args.pause_ms / 1000)
+        )
+        during, stop = [], threading.Event()
+
+        def read():
+            while not stop.is_set():
+                latencies, _ = search_all(engine, queries[:20], args.limit)
+                during.extend(latencies)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        timings = {}
+        for task in MAINTENANCE_TASKS:
+            started = time.perf_counter()
+            maintenance.run([task])
+            timings[task] = time.perf_counter() - started
+        stop.set()
+        reader.join()
+
+        after = storage(engine, path)
+        latencies_after, results_after = search_all(engine, queries, args.limit)
+
+        print(f"{'':<8} {'tokens':>9} {'orphans':>9} {'bytes':>12} {'free pages':>11}")
+        for name, stats in (("before", before), ("after", after)):
+            print(
+                f"{name:<8} {stats['tokens']:>9} {stats['orphans']:>9} "
+                f"{stats['bytes']:>12} {stats['free']:>11}"
+            )
+        print("task seconds: " + ", ".join(f"{t} {s:.2f}" for t, s in timings.items()))
+        print(f"search before:        {percentiles(latencies_before)}")
+        print(f"search after:         {percentiles(latencies_after)}")
+        print(f"search during tasks:  {percentiles(during)}")
+        print(f"results identical: {results_before == results_after}")
+
+        # Snapshot while documents keep being reindexed
+        stop.clear()
+
+        def write():
+            with Session(engine) as session:
+                service = SearchIndexingService(session, build_tokenizers())
+                batches = (documents[: len(churned)], churned)
+                while not stop.is_set():
+                    for batch in batches:
+                        service.index_documents(batch[:500])
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        snapshot = os.path.join(directory, "snapshot", "maintenance.db")
+        started = time.perf_counter()
+        size = maintenance.snapshot(snapshot)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        writer.join()
+        engine.dispose()
+
+        connection = sqlite3.connect(snapshot)
+        check = connection.execute("PRAGMA integrity_check").fetchone()[0]
+        connection.close()
+        print(f"snapshot under writes: {size} bytes in {elapsed:.2f}s, {check}")
+
+
+if __name__ == "__main__":
+    main()
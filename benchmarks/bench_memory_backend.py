@@ -0,0 +1,115 @@
+"""Search latency of the SQL backend vs the in-memory inverted index.
+
+Documents are indexed with a `MemoryIndexBackend` replica attached, then a
+part of them is re-indexed with new content to exercise replacement. Every
+query is answered by both backends and the results must be identical; a
+second memory index rebuilt with `MemoryIndexBackend.load` must agree too.
+
+    python benchmarks/bench_memory_backend.py --documents 5000 --queries 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import WORDS, make_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from backends.memory_index_backend import MemoryIndexBackend
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def percentile(values, fraction: float) -> float:
+    return values[max(0, int(len(values) * fraction) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    queries = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        for _ in range(args.queries)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        replica = MemoryIndexBackend()
+
+        with Session(engine) as session:
+            indexer = SearchIndexingService(
+                session, build_tokenizers(), replicas=[replica]
+            )
+            indexer.index_documents(make_documents(args.documents, seed=args.seed))
+            # Re-index every fourth document with different content
+            updated = make_documents(args.documents, seed=args.seed + 1)[::4]
+            indexer.index_documents(updated)
+
+        with Session(engine) as session:
+            loaded = MemoryIndexBackend.load(session)
+        print(f"memory index: {replica.stats()}")
+
+        latencies = {"sql": [], "memory": []}
+        mismatches = 0
+        with Session(engine) as session:
+            services = {
+                "sql": SearchService(session, build_tokenizers()),
+                "memory": SearchService(session, build_tokenizers(), backend=replica),
+            }
+            reloaded = SearchService(session, build_tokenizers(), backend=loaded)
+            for query in queries:
+                results = {}
+                for name, service in services.items():
+                    started = time.perf_counter()
+                    found = service.search(1, query, limit=args.limit)
+                    latencies[name].append(time.perf_counter() - started)
+                    results[name] = [(r.document_id, r.score) for r in found]
+                expected = results["sql"]
+                reloaded_results = [
+                    (r.document_id, r.score)
+                    for r in reloaded.search(1, query, limit=args.limit)
+                ]
+                if results["memory"] != expected or reloaded_results != expected:
+                    mismatches += 1
+
+        engine.dispose()
+
+    print(f"{'backend':<8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for name, values in latencies.items():
+        values.sort()
+        print(
+            f"{name:<8} {statistics.median(values) * 1000:>8.2f} "
+            f"{percentile(values, 0.95) * 1000:>8.2f} "
+            f"{statistics.fmean(values) * 1000:>8.2f}"
+        )
+    print(f"queries with differing results: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
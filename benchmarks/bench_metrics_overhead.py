@@ -0,0 +1,118 @@
+"""Cost of the metrics hooks on indexing and search.
+
+The same corpus is indexed and searched with metrics disabled (no
+`IndexingMetrics`/`SearchMetrics`, as with `METRICS_ENABLED=0`) and
+enabled. Rounds alternate between the two modes so drift affects both; the
+median round is reported. Ends with the size of one `/metrics` rendering.
+
+    python benchmarks/bench_metrics_overhead.py --documents 2000 --queries 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from _common import make_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from services.search_indexing_service import IndexingMetrics, SearchIndexingService
+from services.search_service import SearchMetrics, SearchService
+from utils.metrics import MetricsRegistry
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def index_round(documents, metrics) -> float:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        service = SearchIndexingService(session, build_tokenizers(), metrics=metrics)
+        started = time.perf_counter()
+        service.index_documents(documents, batch_size=100)
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+
+def search_round(session, queries, metrics) -> float:
+    service = SearchService(session, build_tokenizers(), metrics=metrics)
+    started = time.perf_counter()
+    for query in queries:
+        service.search(1, query, limit=20)
+    return (time.perf_counter() - started) / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, seed=args.seed)
+    rng = random.Random(args.seed)
+    queries = [
+        " ".join(
+            rng.sample(
+                " ".join(
+                    rng.choice(documents).indexable_fields.fields.values()
+                ).split(),
+                2,
+            )
+        )
+        for _ in range(args.queries)
+    ]
+
+    registry = MetricsRegistry()
+    modes = {
+        "disabled": (None, None),
+        "enabled": (IndexingMetrics(registry), SearchMetrics(registry)),
+    }
+    indexing = {mode: [] for mode in modes}
+    search = {mode: [] for mode in modes}
+
+    for _ in range(args.rounds):
+        for mode, (indexing_metrics, _) in modes.items():
+            indexing[mode].append(index_round(documents, indexing_metrics))
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        SearchIndexingService(session, build_tokenizers()).index_documents(documents)
+        for _ in range(args.rounds):
+            for mode, (_, search_metrics) in modes.items():
+                search[mode].append(search_round(session, queries, search_metrics))
+    engine.dispose()
+
+    print(f"{'metrics':<9} {'index s':>9} {'search ms':>10}")
+    for mode in modes:
+        print(
+            f"{mode:<9} {statistics.median(indexing[mode]):>9.3f} "
+            f"{statistics.median(search[mode]) * 1000:>10.3f}"
+        )
+    started = time.perf_counter()
+    rendered = registry.render()
+    print(
+        f"/metrics: {len(rendered.splitlines())} lines, "
+        f"rendered in {(time.perf_counter() - started) * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
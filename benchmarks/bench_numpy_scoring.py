@@ -0,0 +1,99 @@
+"""Python vs NumPy scoring of long postings lists in the memory backend.
+
+Fills a `MemoryIndexBackend` with synthetic entries whose token ids follow
+a Zipf distribution, so queries that include frequent tokens match a large
+share of the documents: tens of thousands of entries per query with the
+default sizes, hundreds of thousands with `--documents 1000000`. Every
+query is scored exhaustively in Python, with MaxScore pruning in Python and
+with `numpy_scoring`; all three must return the same results.
+
+    python benchmarks/bench_numpy_scoring.py --documents 100000 --queries 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from itertools import accumulate
+
+import _common  # noqa: F401
+
+from backends.memory_index_backend import MemoryIndexBackend
+from services.search_service import MIN_NORMALIZED_SCORE
+
+
+def fill(backends, documents: int, tokens: int, per_document: int, seed: int):
+    """Give every document `per_document` Zipf-distributed tokens."""
+    rng = random.Random(seed)
+    population = range(1, tokens + 1)
+    cumulative = list(accumulate(1.0 / rank for rank in population))
+    for start in range(0, documents, 10_000):
+        keys, entries = [], []
+        for document_id in range(start, min(documents, start + 10_000)):
+            keys.append((1, document_id))
+            picked = set(
+                rng.choices(population, cum_weights=cumulative, k=per_document)
+            )
+            entries.extend(
+                (1, document_id, token_id, 1, rng.randint(1, 10)) for token_id in picked
+            )
+        for backend in backends:
+            backend.replace_documents(keys, entries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=50_000)
+    parser.add_argument("--per-document", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--query-tokens", type=int, default=12)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    backends = {
+        "python": MemoryIndexBackend(prune_top_k=False),
+        "python+maxscore": MemoryIndexBackend(prune_top_k=True),
+        "numpy": MemoryIndexBackend(prune_top_k=False, numpy_scoring=True),
+    }
+    fill(backends.values(), args.documents, args.tokens, args.per_document, args.seed)
+
+    rng = random.Random(args.seed + 1)
+    # Half of every query from the 200 most frequent tokens, half from the rest
+    queries = [
+        rng.sample(range(1, 201), args.query_tokens // 2)
+        + rng.sample(range(201, args.tokens + 1), args.query_tokens // 2)
+        for _ in range(args.queries)
+    ]
+    postings = backends["python"]._postings[1]
+    matched = statistics.mean(
+        sum(len(postings[token_id][0]) for token_id in query if token_id in postings)
+        for query in queries
+    )
+    print(f"entries matched per query: {matched:.0f}")
+
+    for limit in (args.limit, None):
+        print(f"\nlimit={limit}")
+        print(f"{'scoring':<16} {'p50 ms':>8} {'p95 ms':>8}")
+        results = {}
+        for name, backend in backends.items():
+            latencies, found = [], []
+            for query in queries:
+                started = time.perf_counter()
+                found.append(backend.search(1, query, limit, MIN_NORMALIZED_SCORE))
+                latencies.append(time.perf_counter() - started)
+            results[name] = found
+            cuts = statistics.quantiles(latencies, n=20)
+            print(
+                f"{name:<16} {statistics.median(latencies) * 1000:>8.2f} "
+                f"{cuts[18] * 1000:>8.2f}"
+            )
+        identical = all(found == results["python"] for found in results.values())
+        print(f"results identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Scaling of `index_documents_parallel` with the number of tokenizer workers.
+
+python benchmarks/bench_parallel_indexing.py --documents 20000 --workers 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from _common import make_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from services.search_indexing_service import SearchIndexingService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def run(documents, workers: int, batch_size: int, ordered: bool) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            service = SearchIndexingService(session, build_tokenizers())
+            started = time.perf_counter()
+            if workers == 0:
+                service.index_documents(iter(documents), batch_size=batch_size)
+            else:
+                service.index_documents_parallel(
+                    iter(documents),
+                    batch_size=batch_size,
+                    workers=workers,
+                    ordered=ordered,
+                )
+            elapsed = time.perf_counter() - started
+        engine.dispose()
+    return len(documents) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--unordered", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, seed=args.seed)
+    serial = run(documents, 0, args.batch_size, True)
+    print(f"cpu count: {os.cpu_count()}")
+    print(f"{'workers':<8} {'docs/s':>10} {'speedup':>8}")
+    print(f"{'serial':<8} {serial:>10.1f} {1.0:>8.2f}")
+    for workers in args.workers:
+        rate = run(documents, workers, args.batch_size, not args.unordered)
+        print(f"{workers:<8} {rate:>10.1f} {rate / serial:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Indexed prefix tokens vs query-time expansion through a token dictionary.
+
+"tokens" indexes every prefix of length >= 4 with `PrefixTokenizer`;
+"dictionary" indexes words and trigrams only and expands each query word to
+the indexed words it is a prefix of (`TokenDictionary`). Queries are words
+of random documents cut to a random prefix of at least 4 characters, like
+a user typing. Reports index size, indexing and search speed, and how many
+of the top results both modes share.
+
+    python benchmarks/bench_prefix_dictionary.py --documents 5000 --queries 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import make_zipf_documents
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from backends.token_dictionary import TokenDictionary
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers(mode: str):
+    tokenizers = [
+        WordTokenizer(weight=1),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+    if mode == "tokens":
+        tokenizers.insert(1, PrefixTokenizer(min_prefix_length=4, weight=5))
+    return tokenizers
+
+
+def make_queries(documents, count: int, words: int, seed: int):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        text_words = " ".join(
+            rng.choice(documents).indexable_fields.fields.values()
+        ).split()
+        picked = rng.sample(text_words, min(words, len(text_words)))
+        queries.append(
+            " ".join(
+                word[: rng.randint(min(4, len(word)), len(word))] for word in picked
+            )
+        )
+    return queries
+
+
+def run(mode: str, documents, queries, limit: int, max_expansions: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            started = time.perf_counter()
+            SearchIndexingService(session, build_tokenizers(mode)).index_documents(
+                documents
+            )
+            indexing_seconds = time.perf_counter() - started
+            tokens = session.execute(text("SELECT COUNT(*) FROM indextoken")).scalar()
+            entries = session.execute(text("SELECT COUNT(*) FROM indexentry")).scalar()
+        engine.dispose()
+        size = os.path.getsize(path)
+
+        dictionary = None
+        if mode == "dictionary":
+            dictionary = TokenDictionary(weights=(1,), max_expansions=max_expansions)
+
+        engine = create_engine(f"sqlite:///{path}")
+        latencies = []
+        results = []
+        with Session(engine) as session:
+            service = SearchService(
+                session, build_tokenizers(mode), token_dictionary=dictionary
+            )
+            if dictionary is not None:
+                dictionary.refresh(session)
+            for query in queries:
+                started = time.perf_counter()
+                found = service.search(1, query, limit=limit)
+                latencies.append(time.perf_counter() - started)
+                results.append({result.document_id for result in found})
+        engine.dispose()
+
+    return {
+        "mode": mode,
+        "tokens": tokens,
+        "entries": entries,
+        "size_mb": size / 1024 / 1024,
+        "docs_per_s": len(documents) / indexing_seconds,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": statistics.quantiles(latencies, n=100)[98] * 1000,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--words", type=int, default=2, help="Words per query")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--max-expansions", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents, _ = make_zipf_documents(args.documents, seed=args.seed)
+    queries = make_queries(documents, args.queries, args.words, args.seed)
+
+    runs = [
+        run(mode, documents, queries, args.limit, args.max_expansions)
+        for mode in ("tokens", "dictionary")
+    ]
+    print(
+        f"{'mode':<11} {'tokens':>9} {'entries':>10} {'size MB':>8} "
+        f"{'docs/s':>8} {'p50 ms':>7} {'p99 ms':>7}"
+    )
+    for result in runs:
+        print(
+            f"{result['mode']:<11} {result['tokens']:>9} {result['entries']:>10} "
+            f"{result['size_mb']:>8.1f} {result['docs_per_s']:>8.1f} "
+            f"{result['p50_ms']:>7.2f} {result['p99_ms']:>7.2f}"
+        )
+    shared = [
+        len(a & b) / max(1, len(a | b))
+        for a, b in zip(runs[0]["results"], runs[1]["results"])
+    ]
+    print(f"mean top-{args.limit} overlap (Jaccard): {statistics.fmean(shared):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Insert and search cost of the legacy vs composite index layout.
+
+`legacy` recreates the five single-column `indexentry` indexes and the
+unindexed `indextoken.name` of schema version 0; `composite` is the current
+schema. Entries are synthetic (Zipf-distributed token ids) so large tables
+can be built without tokenizing text.
+
+    python benchmarks/bench_schema_indexes.py --entries 2000000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import _common  # noqa: F401
+
+from sqlalchemy import insert, text
+from sqlmodel import Session, SQLModel, create_engine
+
+from models.index_entry import IndexEntry
+from models.index_token import IndexToken
+from services.schema_migration_service import LEGACY_ENTRY_INDEXES
+from services.search_service import SearchService
+
+
+def make_legacy(engine) -> None:
+    with engine.begin() as connection:
+        for index in (*IndexToken.__table__.indexes, *IndexEntry.__table__.indexes):
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        for name in LEGACY_ENTRY_INDEXES:
+            column = name[len("ix_indexentry_") :]
+            connection.execute(text(f"CREATE INDEX {name} ON indexentry ({column})"))
+
+
+def zipf_sampler(rng: random.Random, size: int, exponent: float = 1.1):
+    weights = [1.0 / (rank**exponent) for rank in range(1, size + 1)]
+    population = list(range(1, size + 1))
+
+    def sample(k: int):
+        return rng.choices(population, weights=weights, k=k)
+
+    return sample
+
+
+def run(layout: str, args) -> dict:
+    rng = random.Random(args.seed)
+    sample_tokens = zipf_sampler(rng, args.tokens)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        if layout == "legacy":
+            make_legacy(engine)
+
+        with engine.begin() as connection:
+            connection.execute(
+                insert(IndexToken),
+                [
+                    {"name": f"tok{token_id}", "weight": 1}
+                    for token_id in range(1, args.tokens + 1)
+                ],
+            )
+
+        per_document = 120
+        documents = max(1, args.entries // per_document)
+        started = time.perf_counter()
+        batch = []
+        with engine.begin() as connection:
+            for document_id in range(1, documents + 1):
+                for token_id in sample_tokens(per_document):
+                    batch.append(
+                        {
+                            "token_id": token_id,
+                            "document_type": document_id % 3,
+                            "field_id": 1,
+                            "document_id": document_id,
+                            "weight": rng.randint(1, 50),
+                        }
+                    )
+                if len(batch) >= 50_000:
+                    connection.execute(insert(IndexEntry), batch)
+                    batch = []
+            if batch:
+                connection.execute(insert(IndexEntry), batch)
+        insert_elapsed = time.perf_counter() - started
+
+        latencies = []
+        with Session(engine) as session:
+            service = SearchService(session, [])
+            for _ in range(args.queries):
+                names = [f"tok{t}" for t in sample_tokens(args.query_tokens)]
+                started = time.perf_counter()
+                service.execute_search(1, names, limit=20)
+                latencies.append(time.perf_counter() - started)
+
+        engine.dispose()
+        size = os.path.getsize(os.path.join(directory, "bench.db"))
+
+    latencies.sort()
+    return {
+        "layout": layout,
+        "entries_per_s": documents * per_document / insert_elapsed,
+        "search_p50_ms": statistics.median(latencies) * 1000,
+        "search_p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "db_mb": size / 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=2_000_000)
+    parser.add_argument("--tokens", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-tokens", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(
+        f"{'layout':<10} {'entries/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'size MB':>8}"
+    )
+    for layout in ("legacy", "composite"):
+        result = run(layout, args)
+        print(
+            f"{result['layout']:<10} {result['entries_per_s']:>10.0f} "
+            f"{result['search_p50_ms']:>8.2f} {result['search_p95_ms']:>8.2f} "
+            f"{result['db_mb']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Open cost, size and search latency of compiled segments.
+
+Indexes sample documents into SQLite, compiles them into exact and
+quantized segments and compares:
+
+- the time to build a `MemoryIndexBackend` from SQLite vs mapping segments
+- database vs segment file size
+- search latency per backend; exact segments must return the SQL results,
+  quantized ones report their top-k overlap with them
+
+    python benchmarks/bench_segments.py --documents 5000 --queries 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import WORDS, make_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from backends.memory_index_backend import MemoryIndexBackend
+from backends.segment_index_backend import SegmentIndexBackend
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from services.segment_compiler_service import SegmentCompilerService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    queries = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        for _ in range(args.queries)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "bench.db")
+        engine = create_engine(f"sqlite:///{database}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            SearchIndexingService(session, build_tokenizers()).index_documents(
+                make_documents(args.documents, seed=args.seed)
+            )
+
+        exact_dir = os.path.join(directory, "exact")
+        quantized_dir = os.path.join(directory, "quantized")
+        with Session(engine) as session:
+            _, compile_elapsed = timed(
+                lambda: SegmentCompilerService(session).compile(quantized_dir)
+            )
+            SegmentCompilerService(session).compile(exact_dir, quantize=False)
+            _, load_elapsed = timed(lambda: MemoryIndexBackend.load(session))
+
+        backends = {}
+        backends["exact"], _ = timed(lambda: SegmentIndexBackend.open(exact_dir))
+        backends["quantized"], open_elapsed = timed(
+            lambda: SegmentIndexBackend.open(quantized_dir)
+        )
+
+        def size(path: str) -> int:
+            return sum(
+                os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+            )
+
+        print(f"compile (quantized):     {compile_elapsed * 1000:8.1f} ms")
+        print(f"memory index load:       {load_elapsed * 1000:8.1f} ms")
+        print(f"segment open:            {open_elapsed * 1000:8.1f} ms")
+        print(f"database size:           {os.path.getsize(database) / 1e6:8.2f} MB")
+        print(f"exact segments:          {size(exact_dir) / 1e6:8.2f} MB")
+        print(f"quantized segments:      {size(quantized_dir) / 1e6:8.2f} MB")
+
+        latencies = {"sql": [], "exact": [], "quantized": []}
+        exact_mismatches = 0
+        overlap = []
+        with Session(engine) as session:
+            services = {
+                "sql": SearchService(session, build_tokenizers()),
+                "exact": SearchService(
+                    session, build_tokenizers(), backend=backends["exact"]
+                ),
+                "quantized": SearchService(
+                    session, build_tokenizers(), backend=backends["quantized"]
+                ),
+            }
+            for query in queries:
+                results = {}
+                for name, service in services.items():
+                    found, elapsed = timed(
+                        lambda: service.search(1, query, limit=args.limit)
+                    )
+                    latencies[name].append(elapsed)
+                    results[name] = [(r.document_id, r.score) for r in found]
+                if results["exact"] != results["sql"]:
+                    exact_mismatches += 1
+                expected = {document_id for document_id, _ in results["sql"]}
+                if expected:
+                    found_ids = {document_id for document_id, _ in results["quantized"]}
+                    overlap.append(len(expected & found_ids) / len(expected))
+
+        for backend in backends.values():
+            backend.close()
+        engine.dispose()
+
+    print(f"{'backend':<10} {'p50 ms':>8} {'mean ms':>8}")
+    for name, values in latencies.items():
+        print(
+            f"{name:<10} {statistics.median(values) * 1000:>8.2f} "
+            f"{statistics.fmean(values) * 1000:>8.2f}"
+        )
+    print(f"exact segment queries differing from SQL: {exact_mismatches}")
+    if overlap:
+        print(f"quantized top-{args.limit} overlap: {statistics.fmean(overlap):.3f}")
+
+
+if __name__ == "__main__":
+    main()
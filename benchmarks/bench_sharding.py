@@ -0,0 +1,160 @@
+"""One SQLite database vs documents partitioned over several shard files.
+
+Indexes the synthetic catalog into a single database and into `--shards`
+shard databases (one writer thread per shard), then runs the same queries
+against both and reports indexing speed and search latency. Results of the
+sharded index (documents and scores) must equal those of the single
+database. Finally the single database is resharded into a different number
+of shards, which must again give the same results.
+
+    python benchmarks/bench_sharding.py --documents 5000 --shards 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import iter_corpus
+
+from sqlmodel import Session
+
+from services.schema_migration_service import SchemaMigrationService
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from services.sharded_index_service import (
+    IndexShards,
+    ShardedIndexingService,
+    ShardedSearchService,
+    ShardSettings,
+    reshard,
+)
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def make_queries(documents, count: int, seed: int):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(documents).get_indexable_fields().fields[1].split()
+        queries.append(" ".join(rng.sample(words, min(len(words), 2))))
+    return queries
+
+
+def run_queries(search, queries, limit: int):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - started)
+        results.append([(result.document_id, result.score) for result in found])
+    return latencies, results
+
+
+def open_shards(directory: str, name: str, count: int) -> IndexShards:
+    settings = ShardSettings(count, os.path.join(directory, name + "-{shard}.db"))
+    shards = IndexShards.open(settings, SqliteSettings())
+    shards.migrate()
+    return shards
+
+
+def sharded_search(shards: IndexShards, queries, limit: int):
+    service = ShardedSearchService(
+        shards,
+        build_tokenizers(),
+        lambda session, shard: SearchService(session, build_tokenizers()),
+    )
+    try:
+        return run_queries(
+            lambda query: service.search(1, query, limit=limit), queries, limit
+        )
+    finally:
+        service.executor.shutdown()
+
+
+def report(name: str, docs_per_s: float, latencies) -> None:
+    print(
+        f"{name:<14} {docs_per_s:>8.1f} "
+        f"{statistics.median(latencies) * 1000:>7.2f} "
+        f"{statistics.quantiles(latencies, n=100)[98] * 1000:>7.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--reshard-to", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = list(iter_corpus(args.documents, seed=args.seed))
+    queries = make_queries(documents, args.queries, args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "single.db")
+        engine = create_sqlite_engine(SqliteSettings(database_file=path))
+        SchemaMigrationService(engine).migrate()
+        with Session(engine) as session:
+            single_stats = SearchIndexingService(
+                session, build_tokenizers()
+            ).index_documents(documents)
+            search = SearchService(session, build_tokenizers())
+            single_latencies, single_results = run_queries(
+                lambda query: search.search(1, query, limit=args.limit),
+                queries,
+                args.limit,
+            )
+        engine.dispose()
+
+        shards = open_shards(directory, "shard", args.shards)
+        indexer = ShardedIndexingService(
+            shards,
+            lambda session, shard: SearchIndexingService(session, build_tokenizers()),
+        )
+        sharded_stats = indexer.index_documents(documents)
+        indexer.executor.shutdown()
+        sharded_latencies, sharded_results = sharded_search(shards, queries, args.limit)
+        shards.dispose()
+
+        print(f"{'index':<14} {'docs/s':>8} {'p50 ms':>7} {'p99 ms':>7}")
+        report("single", single_stats.documents_per_second, single_latencies)
+        report(
+            f"{args.shards} shards",
+            sharded_stats.documents_per_second,
+            sharded_latencies,
+        )
+        print(f"search results identical: {single_results == sharded_results}")
+
+        source = IndexShards.open(ShardSettings(1, path), SqliteSettings())
+        target = open_shards(directory, "resharded", args.reshard_to)
+        stats = reshard(source, target)
+        _, resharded_results = sharded_search(target, queries, args.limit)
+        source.dispose()
+        target.dispose()
+        print(
+            f"reshard single -> {args.reshard_to} shards: {stats.documents} "
+            f"documents in {stats.elapsed_seconds:.1f}s, results identical: "
+            f"{single_results == resharded_results}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Concurrent readers plus one writer under the default and tuned SQLite profile.
+
+`default` is a plain engine (rollback journal, synchronous=FULL, default
+cache, no mmap); `tuned` is `create_sqlite_engine(SqliteSettings())`. Reader
+threads run searches while one writer thread reindexes documents in batches.
+
+    python benchmarks/bench_sqlite_profile.py --readers 8 --seconds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from _common import WORDS, make_documents
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def build_engine(profile: str, path: str, readers: int):
+    if profile == "default":
+        return create_engine(
+            f"sqlite:///{path}", connect_args={"check_same_thread": False}
+        )
+    return create_sqlite_engine(
+        SqliteSettings(database_file=path, pool_size=readers + 1)
+    )
+
+
+def run(profile: str, args) -> dict:
+    documents = make_documents(args.documents, seed=args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_engine(
+            profile, os.path.join(directory, "bench.db"), args.readers
+        )
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            SearchIndexingService(session, build_tokenizers()).index_documents(
+                documents
+            )
+
+        stop = threading.Event()
+        latencies = []
+        errors = {"read": 0, "write": 0}
+        written = [0]
+        lock = threading.Lock()
+
+        def reader(seed: int) -> None:
+            index = seed
+            local = []
+            while not stop.is_set():
+                query = f"{WORDS[index % len(WORDS)]} {WORDS[(index * 7) % len(WORDS)]}"
+                index += 1
+                started = time.perf_counter()
+                try:
+                    with Session(engine) as session:
+                        SearchService(session, build_tokenizers()).search(
+                            1, query, limit=20
+                        )
+                except OperationalError:
+                    with lock:
+                        errors["read"] += 1
+                    continue
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+
+        def writer() -> None:
+            position = 0
+            while not stop.is_set():
+                batch = documents[position : position + args.batch_size]
+                position = (position + args.batch_size) % len(documents)
+                try:
+                    with Session(engine) as session:
+                        SearchIndexingService(
+                            session, build_tokenizers()
+                        ).index_documents(batch, batch_size=args.batch_size)
+                    written[0] += len(batch)
+                except OperationalError:
+                    errors["write"] += 1
+
+        threads = [
+            threading.Thread(target=reader, args=(i,)) for i in range(args.readers)
+        ]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "reads_per_s": len(latencies) / args.seconds,
+        "read_p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "read_p99_ms": (
+            latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000
+            if latencies
+            else 0.0
+        ),
+        "writes_per_s": written[0] / args.seconds,
+        "errors": errors["read"] + errors["write"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(
+        f"{'profile':<8} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'docs/s':>8} {'errors':>7}"
+    )
+    for profile in ("default", "tuned"):
+        result = run(profile, args)
+        print(
+            f"{result['profile']:<8} {result['reads_per_s']:>8.1f} "
+            f"{result['read_p50_ms']:>8.2f} {result['read_p99_ms']:>8.2f} "
+            f"{result['writes_per_s']:>8.1f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
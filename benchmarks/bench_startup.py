@@ -0,0 +1,191 @@
+"""API cold start: import cost and time to first request.
+
+Profiles `import main` with `python -X importtime` (median of `--runs`
+fresh interpreters) and lists the slowest modules it imports directly. Then
+indexes the synthetic catalog into an on-disk database, starts
+`src/main.py` under uvicorn once per startup mode and measures, from
+process start, when `/` first answers (live), when the first search
+answers and when `/ready` answers 200 (warm). Runs with the memory backend
+by default, whose load at startup dominates a cold start.
+
+    python benchmarks/bench_startup.py --documents 20000 --backend memory
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from _common import iter_corpus
+
+from sqlmodel import Session, SQLModel
+
+from services.schema_migration_service import SchemaMigrationService
+from services.search_indexing_service import SearchIndexingService
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def import_profile(runs: int, environment: dict):
+    """Median `import main` time and the slowest modules main imports directly."""
+    totals, modules = [], {}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=environment["WORKDIR"],
+            env=environment,
+            capture_output=True,
+            text=True,
+        ).stderr
+        for line in output.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if name.strip() == "main":
+                totals.append(int(cumulative) / 1000)
+            elif depth == 1:
+                modules.setdefault(name.strip(), []).append(int(cumulative) / 1000)
+    slowest = sorted(
+        ((statistics.median(times), name) for name, times in modules.items()),
+        reverse=True,
+    )
+    return statistics.median(totals), slowest
+
+
+def get(port: int, path: str) -> int:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as r:
+            return r.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except OSError:
+        return 0
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def cold_start(environment: dict, query: str, timeout: float) -> dict:
+    """Seconds from process start to live, first search and ready."""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SRC, "main.py")],
+        cwd=environment["WORKDIR"],
+        env={**environment, "PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    marks = {}
+    search = f"/search?document_type=1&q={urllib.request.quote(query)}"
+    try:
+        while time.perf_counter() - started < timeout and len(marks) < 3:
+            if "live" not in marks:
+                if get(port, "/") == 200:
+                    marks["live"] = time.perf_counter() - started
+                else:
+                    time.sleep(0.01)
+                    continue
+            if "first search" not in marks and get(port, search) == 200:
+                marks["first search"] = time.perf_counter() - started
+            if "ready" not in marks:
+                if get(port, "/ready") == 200:
+                    marks["ready"] = time.perf_counter() - started
+                else:
+                    time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    return marks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--backend", default="memory", choices=("sql", "memory"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "startup.db")
+        engine = create_sqlite_engine(SqliteSettings(database_file=path))
+        SchemaMigrationService(engine).migrate()
+        documents = list(iter_corpus(args.documents, seed=args.seed))
+        with Session(engine) as session:
+            SearchIndexingService(
+                session,
+                [
+                    WordTokenizer(weight=1),
+                    PrefixTokenizer(min_prefix_length=4, weight=5),
+                    NGramsTokenizer(ngram_length=3, weight=1),
+                ],
+            ).index_documents(documents)
+
+        # The schema check at startup on an up-to-date database
+        timings = {}
+        for name, check in (
+            ("create_all", lambda: SQLModel.metadata.create_all(engine)),
+            ("migrate", lambda: SchemaMigrationService(engine).migrate()),
+        ):
+            started = time.perf_counter()
+            for _ in range(20):
+                check()
+            timings[name] = (time.perf_counter() - started) / 20 * 1000
+        engine.dispose()
+        print(
+            f"schema check on an up-to-date database: migrate "
+            f"{timings['migrate']:.2f} ms, create_all {timings['create_all']:.2f} ms"
+        )
+
+        environment = {
+            **os.environ,
+            "PYTHONPATH": SRC,
+            "SQLITE_FILE": path,
+            "INDEX_BACKEND": args.backend,
+            "LOG_LEVEL": "WARNING",
+            "WORKDIR": directory,
+        }
+        total, slowest = import_profile(args.runs, environment)
+        print(f"\nimport main: {total:.0f} ms (median of {args.runs})")
+        for milliseconds, name in slowest[:10]:
+            print(f"  {milliseconds:>7.1f} ms  {name}")
+
+        query = " ".join(
+            documents[0].get_indexable_fields().fields[1].split()[:2]
+        ).lower()
+        print(f"\n{'mode':<14} {'live s':>8} {'search s':>9} {'ready s':>8}")
+        results = {}
+        for mode, fast in (("default", "0"), ("FAST_STARTUP", "1")):
+            marks = cold_start(
+                {**environment, "FAST_STARTUP": fast}, query, args.timeout
+            )
+            results[mode] = marks
+            print(
+                f"{mode:<14} {marks.get('live', float('nan')):>8.2f} "
+                f"{marks.get('first search', float('nan')):>9.2f} "
+                f"{marks.get('ready', float('nan')):>8.2f}"
+            )
+        print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Reproducible benchmark suite with JSON results and regression checks.
+
+Runs against a seeded synthetic catalog (`iter_corpus`: Zipfian titles and
+descriptions, brands, categories) and measures:
+- tokenizer throughput of every tokenizer and of the fused pipeline
+- indexing throughput for each corpus size, into an on-disk database with
+  the production SQLite profile
+- index size on disk after a WAL checkpoint
+- search latency percentiles over queries drawn from the indexed documents
+
+Results are written as JSON (`--output`). With `--baseline` every metric is
+compared with an earlier run; `--max-regression 0.1` additionally exits
+with status 1 when any metric got more than 10% worse.
+
+    python benchmarks/bench_suite.py --sizes 10000 --output baseline.json
+    python benchmarks/bench_suite.py --sizes 10000 --baseline baseline.json \\
+        --max-regression 0.1
+    python benchmarks/bench_suite.py --sizes 10000,100000,1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from _common import iter_corpus
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+import models.index_entry  # noqa: F401
+import models.index_field_hash  # noqa: F401
+import models.index_token  # noqa: F401
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.fused_tokenizer import FusedTokenizer
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+# name -> {"value": float, "unit": str, "better": "higher" | "lower"}
+Metrics = Dict[str, Dict[str, object]]
+
+
+def build_tokenizers():
+    """The tokenizers `main.py` uses in the default prefix mode."""
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def record(metrics: Metrics, name: str, value: float, unit: str, better: str):
+    metrics[name] = {"value": round(float(value), 6), "unit": unit, "better": better}
+    print(f"  {name:<40} {value:>14.3f} {unit}")
+
+
+def bench_tokenizers(metrics: Metrics, args) -> None:
+    texts = [
+        content
+        for document in iter_corpus(args.tokenizer_documents, seed=args.seed)
+        for content in document.get_indexable_fields().fields.values()
+    ]
+    megabytes = sum(len(content.encode("utf-8")) for content in texts) / 1e6
+    tokenizers = build_tokenizers()
+    fused = FusedTokenizer(tokenizers)
+    runs = {
+        "word": tokenizers[0].tokenize,
+        "prefix": tokenizers[1].tokenize,
+        "ngrams": tokenizers[2].tokenize,
+        "fused": fused.tokenize_pairs,
+    }
+    for name, tokenize in runs.items():
+        best, tokens = float("inf"), 0
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            tokens = sum(len(tokenize(content)) for content in texts)
+            best = min(best, time.perf_counter() - started)
+        record(
+            metrics, f"tokenizer.{name}.tokens_per_s", tokens / best, "1/s", "higher"
+        )
+        record(
+            metrics, f"tokenizer.{name}.mb_per_s", megabytes / best, "MB/s", "higher"
+        )
+
+
+def make_queries(documents, count: int, seed: int) -> List[str]:
+    """One to three words of random documents; a third are cut to a prefix."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(documents).get_indexable_fields().fields[1].split()
+        picked = rng.sample(words, min(len(words), rng.randint(1, 3)))
+        if rng.random() < 0.33:
+            picked[-1] = picked[-1][: max(4, len(picked[-1]) // 2)]
+        queries.append(" ".join(picked))
+    return queries
+
+
+def bench_size(metrics: Metrics, size: int, args) -> None:
+    with tempfile.TemporaryDirectory(dir=args.workdir) as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = create_sqlite_engine(SqliteSettings(database_file=path))
+        SQLModel.metadata.create_all(engine)
+
+        with Session(engine) as session:
+            service = SearchIndexingService(session, build_tokenizers())
+            stats = service.index_documents(
+                iter_corpus(size, seed=args.seed), batch_size=args.batch_size
+            )
+            record(
+                metrics,
+                f"index.{size}.docs_per_s",
+                stats.documents_per_second,
+                "1/s",
+                "higher",
+            )
+            record(
+                metrics,
+                f"index.{size}.entries_per_s",
+                stats.entries_per_second,
+                "1/s",
+                "higher",
+            )
+            session.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+
+        size_bytes = sum(
+            os.path.getsize(path + suffix)
+            for suffix in ("", "-wal")
+            if os.path.exists(path + suffix)
+        )
+        record(metrics, f"index.{size}.size_mb", size_bytes / 1e6, "MB", "lower")
+        record(metrics, f"index.{size}.bytes_per_doc", size_bytes / size, "B", "lower")
+
+        sample = list(itertools.islice(iter_corpus(size, seed=args.seed), 10_000))
+        queries = make_queries(sample, args.queries, args.seed)
+        with Session(engine) as session:
+            search = SearchService(session, build_tokenizers())
+            for query in queries[: args.queries // 10]:
+                search.search(1, query, limit=args.limit)
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                search.search(1, query, limit=args.limit)
+                latencies.append((time.perf_counter() - started) * 1000)
+        engine.dispose()
+
+    cuts = statistics.quantiles(latencies, n=100)
+    for name, value in (("p50", cuts[49]), ("p95", cuts[94]), ("p99", cuts[98])):
+        record(metrics, f"search.{size}.{name}_ms", value, "ms", "lower")
+
+
+def environment(args) -> Dict[str, object]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "sizes": args.sizes,
+        "queries": args.queries,
+        "limit": args.limit,
+    }
+
+
+def compare(current: Metrics, baseline: Metrics, threshold: Optional[float]) -> bool:
+    """Print the change of every shared metric; return True if none regressed."""
+    ok = True
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(current.keys() & baseline.keys()):
+        old, new = baseline[name]["value"], current[name]["value"]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if current[name]["better"] == "higher" else change
+        flag = ""
+        if threshold is not None and worse > threshold:
+            flag, ok = "  REGRESSION", False
+        print(f"{name:<40} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes", default="10000", help="Comma-separated corpus sizes to index"
+    )
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--tokenizer-documents", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-tokenizers", action="store_true")
+    parser.add_argument("--workdir", default=None, help="Where databases are built")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="Fail when a metric is worse than the baseline by this fraction",
+    )
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",") if size]
+    if args.max_regression is not None and not args.baseline:
+        parser.error("--max-regression needs --baseline")
+
+    metrics: Metrics = {}
+    if not args.skip_tokenizers:
+        print("tokenizers")
+        bench_tokenizers(metrics, args)
+    for size in args.sizes:
+        print(f"corpus of {size} documents")
+        bench_size(metrics, size, args)
+
+    results = {"environment": environment(args), "metrics": metrics}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        if not compare(metrics, baseline["metrics"], args.max_regression):
+            print(f"\nregressed by more than {args.max_regression:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
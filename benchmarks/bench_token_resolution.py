@@ -0,0 +1,117 @@
+"""Compare queries and commits per indexed document for token resolution.
+
+`per-token` replays the original flow (one find-or-create per token, which
+commits on every miss, plus separate commits for the delete and the insert).
+`batched` is `SearchIndexingService.index_document` with the token cache
+disabled and `cached` is the default configuration with its LRU token cache.
+
+    python benchmarks/bench_token_resolution.py --documents 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from _common import StatementCounter, make_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+from models.index_entry import IndexEntry
+from models.index_token import IndexToken
+from services.search_indexing_service import SearchIndexingService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def index_per_token(service: SearchIndexingService, document) -> None:
+    document_type, document_id, rows = service._tokenize_document(document)
+
+    service._remove_document_index(document_type, document_id)
+    service.session.commit()
+
+    entries = []
+    for token_value, token_weight, field_id, final_weight in rows:
+        token_id = service.find_or_create_token(token_value, token_weight)
+        entries.append(
+            IndexEntry(
+                token_id=token_id,
+                document_type=document_type,
+                field_id=field_id,
+                document_id=document_id,
+                weight=final_weight,
+            )
+        )
+    service.session.add_all(entries)
+    service.session.commit()
+
+
+def run(mode: str, documents) -> dict:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    counter = StatementCounter(engine, watch_table=IndexToken.__tablename__)
+
+    with Session(engine) as session:
+        service = SearchIndexingService(
+            session,
+            build_tokenizers(),
+            token_cache_size=100_000 if mode == "cached" else 0,
+        )
+        counter.reset()
+        started = time.perf_counter()
+        for document in documents:
+            if mode == "per-token":
+                index_per_token(service, document)
+            else:
+                service.index_document(document)
+        elapsed = time.perf_counter() - started
+
+    count = len(documents)
+    return {
+        "mode": mode,
+        "queries_per_doc": counter.queries / count,
+        "token_queries_per_doc": counter.table_queries / count,
+        "commits_per_doc": counter.commits / count,
+        "docs_per_s": count / elapsed,
+        "cache": service.token_cache.stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, seed=args.seed)
+    print(
+        f"{'mode':<10} {'queries/doc':>12} {'token q/doc':>12} "
+        f"{'commits/doc':>12} {'docs/s':>10}"
+    )
+    for mode in ("per-token", "batched", "cached"):
+        result = run(mode, documents)
+        print(
+            f"{result['mode']:<10} {result['queries_per_doc']:>12.1f} "
+            f"{result['token_queries_per_doc']:>12.1f} "
+            f"{result['commits_per_doc']:>12.1f} {result['docs_per_s']:>10.1f}"
+        )
+        if mode == "cached":
+            cache = result["cache"]
+            print(
+                f"token cache: hit rate {cache['hit_rate']:.1%}, "
+                f"{cache['size']} entries, {cache['evictions']} evictions"
+            )
+
+
+if __name__ == "__main__":
+    main()
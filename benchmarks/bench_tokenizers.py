@@ -0,0 +1,85 @@
+"""Separate tokenizers vs the fused single-normalization pipeline.
+
+Tokenizes a corpus of product-style texts (mixed case, punctuation, sizes and
+model numbers) with word, prefix and 3-gram tokenizers, once by calling each
+tokenizer's `tokenize` and once through `FusedTokenizer.tokenize_pairs`.
+
+    python benchmarks/bench_tokenizers.py --texts 2000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from _common import WORDS
+
+from utils.fused_tokenizer import FusedTokenizer
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+DECORATIONS = ["", "", "", ",", ".", "!", " -", ":", "/", " (new)", " & more"]
+
+
+def make_corpus(count: int, seed: int):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(30, 80)):
+            word = rng.choice(WORDS)
+            if rng.random() < 0.15:
+                word = word.capitalize()
+            if rng.random() < 0.05:
+                word = (
+                    f"{word} {rng.randint(1, 999)}{rng.choice(['cm', 'ml', 'GB', ''])}"
+                )
+            words.append(word + rng.choice(DECORATIONS))
+        texts.append(" ".join(words))
+    return texts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.texts, args.seed)
+    tokenizers = [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+    fused = FusedTokenizer(tokenizers)
+
+    def separate(text):
+        return [
+            (token.name, token.weight)
+            for tokenizer in tokenizers
+            for token in tokenizer.tokenize(text)
+        ]
+
+    for text in corpus[:50]:
+        assert separate(text) == fused.tokenize_pairs(text)
+
+    total_chars = sum(len(text) for text in corpus)
+    print(f"{'pipeline':<10} {'best s':>8} {'MB/s':>8} {'texts/s':>10}")
+    for name, run in (("separate", separate), ("fused", fused.tokenize_pairs)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for text in corpus:
+                run(text)
+            best = min(best, time.perf_counter() - started)
+        print(
+            f"{name:<10} {best:>8.3f} {total_chars / best / 1e6:>8.2f} "
+            f"{len(corpus) / best:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
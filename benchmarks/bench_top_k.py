@@ -0,0 +1,125 @@
+"""Exhaustive scoring vs MaxScore top-k pruning on long queries.
+
+Documents use a Zipf-distributed synthetic vocabulary and queries take
+words from random documents, so multi-word queries expand into dozens of
+prefix and trigram tokens with very different list lengths. Every query is
+evaluated by the SQL and memory backends with and without
+pruning; the pruned results must equal the exhaustive ones.
+
+    python benchmarks/bench_top_k.py --documents 5000 --queries 200 --limit 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import make_zipf_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from backends.memory_index_backend import MemoryIndexBackend
+from backends.sql_index_backend import SqlIndexBackend
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+
+def build_tokenizers():
+    return [
+        WordTokenizer(weight=1),
+        PrefixTokenizer(min_prefix_length=4, weight=5),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=5, help="Words per query")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents, _ = make_zipf_documents(
+        args.documents, vocabulary_size=args.vocabulary, seed=args.seed
+    )
+    rng = random.Random(args.seed)
+    queries = []
+    for _ in range(args.queries):
+        words = " ".join(rng.choice(documents).indexable_fields.fields.values()).split()
+        queries.append(" ".join(rng.sample(words, min(args.words, len(words)))))
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            SearchIndexingService(session, build_tokenizers()).index_documents(
+                documents
+            )
+            memory = MemoryIndexBackend.load(session)
+            exhaustive_memory = MemoryIndexBackend.load(session, prune_top_k=False)
+
+        latencies = {}
+        mismatches = {"sql": 0, "memory": 0}
+        token_counts = []
+        with Session(engine) as session:
+            tokenizers = build_tokenizers()
+            services = {
+                ("sql", "exhaustive"): SearchService(
+                    session, tokenizers, backend=SqlIndexBackend(session)
+                ),
+                ("sql", "maxscore"): SearchService(
+                    session,
+                    tokenizers,
+                    backend=SqlIndexBackend(session, prune_top_k=True),
+                ),
+                ("memory", "exhaustive"): SearchService(
+                    session, tokenizers, backend=exhaustive_memory
+                ),
+                ("memory", "maxscore"): SearchService(
+                    session, tokenizers, backend=memory
+                ),
+            }
+            for query in queries:
+                token_counts.append(
+                    len(set(services[("sql", "maxscore")].tokenize_query(query)))
+                )
+                results = {}
+                for key, service in services.items():
+                    started = time.perf_counter()
+                    found = service.search(1, query, limit=args.limit)
+                    latencies.setdefault(key, []).append(time.perf_counter() - started)
+                    results[key] = [(r.document_id, r.score) for r in found]
+                for backend in mismatches:
+                    if (
+                        results[(backend, "maxscore")]
+                        != results[(backend, "exhaustive")]
+                    ):
+                        mismatches[backend] += 1
+
+        engine.dispose()
+
+    print(f"mean distinct query tokens: {statistics.fmean(token_counts):.1f}")
+    print(f"{'backend':<8} {'mode':<11} {'p50 ms':>8} {'mean ms':>8}")
+    for (backend, mode), values in latencies.items():
+        print(
+            f"{backend:<8} {mode:<11} {statistics.median(values) * 1000:>8.2f} "
+            f"{statistics.fmean(values) * 1000:>8.2f}"
+        )
+    for backend, count in mismatches.items():
+        print(f"{backend}: queries where pruning changed the top {args.limit}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Typo correction through the trigram side index vs a full dictionary scan.
+
+Queries are single words of random documents with one random edit
+(substitution, deletion, insertion or transposition), like a user typing.
+For every query the word is corrected twice: by `TypoCorrector` (prefix
+filtering on the rarest trigrams, bounded Levenshtein on the best
+candidates) and by scanning every dictionary word with the same bounded
+Levenshtein. Reports correction latency of both, how often the intended
+word is among the corrections, and which share of the top results of a
+search with and without `typo_corrector` contain the intended word. A second pass
+over the same queries measures the correction cache.
+
+    python benchmarks/bench_typo_correction.py --documents 5000 --queries 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from _common import make_zipf_documents
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import models.index_entry  # noqa: F401
+import models.index_token  # noqa: F401
+from backends.token_dictionary import TokenDictionary
+from backends.typo_corrector import TypoCorrector, bounded_levenshtein
+from services.search_indexing_service import SearchIndexingService
+from services.search_service import SearchService
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.word_tokenizer import WordTokenizer
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def build_tokenizers():
+    return [WordTokenizer(weight=1), NGramsTokenizer(ngram_length=3, weight=1)]
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    position = rng.randrange(len(word))
+    edit = rng.choice(("substitute", "delete", "insert", "transpose"))
+    if edit == "substitute":
+        letter = rng.choice(LETTERS.replace(word[position], ""))
+        return word[:position] + letter + word[position + 1 :]
+    if edit == "delete":
+        return word[:position] + word[position + 1 :]
+    if edit == "insert":
+        return word[:position] + rng.choice(LETTERS) + word[position:]
+    position = min(position, len(word) - 2)
+    return word[:position] + word[position + 1] + word[position] + word[position + 2 :]
+
+
+def make_queries(documents, dictionary, count: int, seed: int):
+    """(intended word, misspelled word) pairs."""
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        document = rng.choice(documents)
+        words = [
+            word
+            for word in " ".join(document.indexable_fields.fields.values()).split()
+            if len(word) >= 5
+        ]
+        if not words:
+            continue
+        word = rng.choice(words)
+        typo = misspell(word, rng)
+        if typo not in dictionary:
+            queries.append((word, typo))
+    return queries
+
+
+def scan_dictionary(corrector: TypoCorrector, names, word: str):
+    max_distance = 1 if len(word) < corrector.long_word_length else 2
+    found = []
+    for name in names:
+        distance = bounded_levenshtein(word, name, max_distance)
+        if distance is not None:
+            found.append((distance, name))
+    found.sort()
+    return tuple(name for _, name in found[: corrector.max_corrections])
+
+
+def percentiles(latencies):
+    return (
+        statistics.median(latencies) * 1000,
+        statistics.quantiles(latencies, n=100)[98] * 1000,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--max-candidates", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents, _ = make_zipf_documents(args.documents, seed=args.seed)
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        SearchIndexingService(session, build_tokenizers()).index_documents(documents)
+
+        dictionary = TokenDictionary(weights=(1,), ngram_length=3)
+        dictionary.refresh(session)
+        corrector = TypoCorrector(
+            dictionary, max_candidates=args.max_candidates, time_budget_ms=1000
+        )
+        names = dictionary._snapshot[0]
+        queries = make_queries(documents, dictionary, args.queries, args.seed)
+
+        timings = {"trigram index": [], "full scan": [], "cached": []}
+        found = {"trigram index": 0, "full scan": 0}
+        for word, typo in queries:
+            started = time.perf_counter()
+            corrections = corrector.correct(typo)
+            timings["trigram index"].append(time.perf_counter() - started)
+            found["trigram index"] += word in corrections
+
+            started = time.perf_counter()
+            corrections = scan_dictionary(corrector, names, typo)
+            timings["full scan"].append(time.perf_counter() - started)
+            found["full scan"] += word in corrections
+        for _, typo in queries:
+            started = time.perf_counter()
+            corrector.correct(typo)
+            timings["cached"].append(time.perf_counter() - started)
+
+        print(f"dictionary words: {len(dictionary)}, queries: {len(queries)}")
+        print(f"{'correction':<14} {'p50 ms':>8} {'p99 ms':>8} {'word found':>11}")
+        for mode, latencies in timings.items():
+            p50, p99 = percentiles(latencies)
+            recall = f"{found[mode] / len(queries):.2f}" if mode in found else "-"
+            print(f"{mode:<14} {p50:>8.3f} {p99:>8.3f} {recall:>11}")
+
+        words = {
+            document.document_id: set(
+                " ".join(document.indexable_fields.fields.values()).split()
+            )
+            for document in documents
+        }
+        print(f"\n{'search':<14} {'p50 ms':>8} {'p99 ms':>8} {'with word':>11}")
+        for mode, typo_corrector in (("exact", None), ("fuzzy", corrector)):
+            service = SearchService(
+                session, build_tokenizers(), typo_corrector=typo_corrector
+            )
+            latencies, shares = [], []
+            for word, typo in queries:
+                started = time.perf_counter()
+                results = service.search(1, typo, limit=args.limit)
+                latencies.append(time.perf_counter() - started)
+                shares.append(
+                    sum(word in words[result.document_id] for result in results)
+                    / max(1, len(results))
+                )
+            p50, p99 = percentiles(latencies)
+            share = statistics.fmean(shares)
+            print(f"{mode:<14} {p50:>8.3f} {p99:>8.3f} {share:>11.2f}")
+        print(f"\ncorrector: {corrector.stats()}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Search and index latency of the API server under concurrent load.
+
+Starts `src/main.py` with uvicorn on a temporary database, seeds it through
+`POST /index`, then runs two phases with an async HTTP client:
+
+- `search`: `--search-clients` clients issuing `GET /search` back to back
+- `search+index`: the same, plus `--index-clients` clients posting batches
+
+p50/p99 latencies are reported per endpoint and phase.
+
+    python benchmarks/load_test.py --seconds 15 --search-clients 32 --index-clients 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from _common import SRC_DIR, WORDS, make_documents
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def payload(documents):
+    return [
+        {
+            "document_type": document.get_document_type(),
+            "document_id": document.get_document_id(),
+            "fields": document.get_indexable_fields().fields,
+            "weights": document.get_indexable_fields().weights,
+        }
+        for document in documents
+    ]
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)] * 1000
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def search_client(client, stop, latencies, seed: int) -> None:
+    index = seed
+    while not stop.is_set():
+        query = f"{WORDS[index % len(WORDS)]} {WORDS[(index * 7) % len(WORDS)][:4]}"
+        index += 1
+        started = time.perf_counter()
+        response = await client.get(
+            "/search", params={"document_type": 1, "q": query, "limit": 20}
+        )
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+
+
+async def index_client(client, stop, latencies, batches) -> None:
+    position = 0
+    while not stop.is_set():
+        batch = batches[position % len(batches)]
+        position += 1
+        started = time.perf_counter()
+        response = await client.post("/index", json=batch)
+        if response.status_code == 202:
+            latencies.append(time.perf_counter() - started)
+        else:
+            # Queue full: back off instead of hammering the server
+            await asyncio.sleep(0.05)
+
+
+async def phase(client, args, batches, with_index: bool) -> dict:
+    stop = asyncio.Event()
+    search_latencies, index_latencies = [], []
+    tasks = [
+        asyncio.create_task(search_client(client, stop, search_latencies, i))
+        for i in range(args.search_clients)
+    ]
+    if with_index:
+        tasks += [
+            asyncio.create_task(index_client(client, stop, index_latencies, batches))
+            for _ in range(args.index_clients)
+        ]
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {
+        "phase": "search+index" if with_index else "search",
+        "search_rps": len(search_latencies) / args.seconds,
+        "search_p50_ms": percentile(search_latencies, 0.5),
+        "search_p99_ms": percentile(search_latencies, 0.99),
+        "index_p50_ms": percentile(index_latencies, 0.5),
+        "index_p99_ms": percentile(index_latencies, 0.99),
+    }
+
+
+async def run(args, base_url: str) -> None:
+    documents = payload(make_documents(args.documents, seed=args.seed))
+    batches = [
+        documents[start : start + args.batch_size]
+        for start in range(0, len(documents), args.batch_size)
+    ]
+    limits = httpx.Limits(max_connections=args.search_clients + args.index_clients)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=60.0, limits=limits
+    ) as client:
+        await wait_ready(client)
+        for batch in batches:
+            while (await client.post("/index", json=batch)).status_code != 202:
+                await asyncio.sleep(0.1)
+        while (await client.get("/index/stats")).json()["queued_batches"]:
+            await asyncio.sleep(0.2)
+
+        print(
+            f"{'phase':<14} {'search/s':>9} {'s p50':>8} {'s p99':>8} "
+            f"{'i p50':>8} {'i p99':>8}"
+        )
+        for with_index in (False, True):
+            result = await phase(client, args, batches, with_index)
+            print(
+                f"{result['phase']:<14} {result['search_rps']:>9.1f} "
+                f"{result['search_p50_ms']:>8.1f} {result['search_p99_ms']:>8.1f} "
+                f"{result['index_p50_ms']:>8.1f} {result['index_p99_ms']:>8.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--search-clients", type=int, default=32)
+    parser.add_argument("--index-clients", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            SQLITE_FILE=os.path.join(directory, "load.db"),
+            LOG_LEVEL="WARNING",
+        )
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(SRC_DIR, "main.py")], cwd=SRC_DIR, env=env
+        )
+        try:
+            asyncio.run(run(args, f"http://127.0.0.1:{port}"))
+        finally:
+            # Shutdown drains the accepted index batches first
+            server.terminate()
+            try:
+                server.wait(timeout=120)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
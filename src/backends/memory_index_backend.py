@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backends.numpy_scoring import rank_postings, require_numpy
+from backends.scoring import rank_scores
+from backends.top_k import exhaustive_scores, max_score_top_k
+from interfaces.index_backend_interface import (
+    DocumentKey,
+    EntryRow,
+    IndexBackendInterface,
+)
+from models.index_entry import IndexEntry
+from models.index_token import IndexToken
+from sqlalchemy import func
+from sqlmodel import Session, select
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Sorted document ids, their summed weights and the largest of those weights
+# for one (document_type, token)
+Postings = Tuple[array, array, int]
+
+_EMPTY_POSTINGS: Postings = (array("q"), array("q"), 0)
+
+# Postings lists merged between two MaxScore threshold checks
+MAX_SCORE_GROUP_SIZE = 4
+
+
+class MemoryIndexBackend(IndexBackendInterface):
+    """In-process inverted index used as a read replica of the SQL tables.
+
+    - Postings are kept per document type as token_id -> (document ids,
+      weights), both compact `array`s sorted by document id; the weight of a
+      document is the sum over all fields containing the token
+    - A forward map (document_type, document_id) -> {token_id: weight} makes
+      replacing a document touch only its own postings lists
+    - Writers hold a lock and swap in rebuilt postings tuples, so searches
+      read without locking and never see a half-updated list
+    - Each list carries its maximum weight, so limited searches use MaxScore
+      pruning and look up the low-impact tokens of long queries in the
+      forward map for the remaining candidates only
+    - With `numpy_scoring`, searches instead sum the postings arrays in
+      NumPy without a per-entry Python loop (see `rank_postings`)
+
+    Build it with `load` from the committed tables and keep it current by
+    passing it as a replica to `SearchIndexingService`.
+    """
+
+    def __init__(self, prune_top_k: bool = True, numpy_scoring: bool = False) -> None:
+        if numpy_scoring:
+            require_numpy()
+        self.prune_top_k = prune_top_k
+        self.numpy_scoring = numpy_scoring
+        self._postings: Dict[int, Dict[int, Postings]] = {}
+        self._documents: Dict[DocumentKey, Dict[int, int]] = {}
+        self._token_ids_by_name: Dict[str, Tuple[int, ...]] = {}
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def load(
+        cls, session: Session, prune_top_k: bool = True, numpy_scoring: bool = False
+    ) -> "MemoryIndexBackend":
+        """Build the index from the `index_tokens`/`index_entries` tables."""
+        backend = cls(prune_top_k=prune_top_k, numpy_scoring=numpy_scoring)
+
+        backend.register_tokens(
+            {
+                (name, int(weight)): int(token_id)
+                for token_id, name, weight in session.execute(
+                    select(IndexToken.id, IndexToken.name, IndexToken.weight)
+                )
+            }
+        )
+
+        # Fields are folded together here; one row per (document, token)
+        stmt = select(
+            IndexEntry.document_type,
+            IndexEntry.document_id,
+            IndexEntry.token_id,
+            func.sum(IndexEntry.weight),
+        ).group_by(
+            IndexEntry.document_type, IndexEntry.document_id, IndexEntry.token_id
+        )
+        lists: Dict[Tuple[int, int], Dict[int, int]] = {}
+        for document_type, document_id, token_id, weight in session.execute(stmt):
+            key = (int(document_type), int(document_id))
+            backend._documents.setdefault(key, {})[int(token_id)] = int(weight)
+            lists.setdefault((key[0], int(token_id)), {})[key[1]] = int(weight)
+
+        for (document_type, token_id), weights in lists.items():
+            backend._postings.setdefault(document_type, {})[token_id] = _build(weights)
+
+        logger.info(
+            "Loaded in-memory index: %s documents, %s postings lists",
+            len(backend._documents),
+            len(lists),
+        )
+        return backend
+
+    def resolve_token_ids(self, names: Sequence[str]) -> List[int]:
+        token_ids = self._token_ids_by_name
+        return [token_id for name in set(names) for token_id in token_ids.get(name, ())]
+
+    def resolve_token_ids_by_name(self, names: Sequence[str]) -> Dict[str, List[int]]:
+        token_ids = self._token_ids_by_name
+        # get() once per name: `forget_tokens` may remove names meanwhile
+        found = {name: token_ids.get(name, ()) for name in set(names)}
+        return {name: list(ids) for name, ids in found.items() if ids}
+
+    def register_tokens(self, tokens: Dict[Tuple[str, int], int]) -> None:
+        with self._write_lock:
+            token_ids = self._token_ids_by_name
+            for (name, _), token_id in tokens.items():
+                known = token_ids.get(name, ())
+                if token_id not in known:
+                    token_ids[name] = known + (int(token_id),)
+
+    def forget_tokens(self, tokens: Dict[Tuple[str, int], int]) -> None:
+        """Drop the ids of tokens deleted from the committed tables."""
+        with self._write_lock:
+            token_ids = self._token_ids_by_name
+            for (name, _), token_id in tokens.items():
+                kept = tuple(
+                    known for known in token_ids.get(name, ()) if known != token_id
+                )
+                if kept:
+                    token_ids[name] = kept
+                else:
+                    token_ids.pop(name, None)
+
+    def replace_documents(
+        self, keys: Sequence[DocumentKey], entries: Sequence[EntryRow]
+    ) -> None:
+        # Collapse the new entries to one weight per (document, token)
+        new_documents: Dict[DocumentKey, Dict[int, int]] = {
+            (int(document_type), int(document_id)): {}
+            for document_type, document_id in keys
+        }
+        for document_type, document_id, token_id, _, weight in entries:
+            tokens = new_documents[(int(document_type), int(document_id))]
+            tokens[int(token_id)] = tokens.get(int(token_id), 0) + int(weight)
+
+        with self._write_lock:
+            # 1. Collect the changes per postings list
+            changes: Dict[Tuple[int, int], Dict[int, Optional[int]]] = {}
+            for key, tokens in new_documents.items():
+                document_type, document_id = key
+                for token_id in self._documents.get(key, {}):
+                    changes.setdefault((document_type, token_id), {})[
+                        document_id
+                    ] = None
+                for token_id, weight in tokens.items():
+                    changes.setdefault((document_type, token_id), {})[
+                        document_id
+                    ] = weight
+
+            # 2. Rebuild each touched list once and swap it in
+            for (document_type, token_id), updates in changes.items():
+                lists = self._postings.setdefault(document_type, {})
+                doc_ids, weights, _ = lists.get(token_id, _EMPTY_POSTINGS)
+                merged = dict(zip(doc_ids, weights))
+                for document_id, weight in updates.items():
+                    if weight is None:
+                        merged.pop(document_id, None)
+                    else:
+                        merged[document_id] = weight
+                if merged:
+                    lists[token_id] = _build(merged)
+                else:
+                    lists.pop(token_id, None)
+
+            # 3. Update the forward map
+            for key, tokens in new_documents.items():
+                if tokens:
+                    self._documents[key] = tokens
+                else:
+                    self._documents.pop(key, None)
+
+    def search(
+        self,
+        document_type: int,
+        token_ids: Sequence[int],
+        limit: Optional[int],
+        min_score: float,
+    ) -> List[Tuple[int, int]]:
+        lists = self._postings.get(int(document_type))
+        if not lists or not token_ids:
+            return []
+
+        if self.numpy_scoring:
+            return rank_postings(
+                (
+                    lists.get(int(token_id), _EMPTY_POSTINGS)[:2]
+                    for token_id in set(token_ids)
+                ),
+                limit,
+                min_score,
+            )
+
+        document_type = int(document_type)
+        documents = self._documents
+
+        def score_lists(group: Sequence[int]):
+            for token_id in group:
+                doc_ids, weights, _ = lists.get(token_id, _EMPTY_POSTINGS)
+                yield from zip(doc_ids, weights)
+
+        def score_candidates(group: Sequence[int], candidates: Sequence[int]):
+            # Walk whichever is shorter: the postings list or the candidates
+            wanted = set(candidates)
+            for token_id in group:
+                doc_ids, weights, _ = lists.get(token_id, _EMPTY_POSTINGS)
+                if len(doc_ids) <= len(wanted):
+                    for document_id, weight in zip(doc_ids, weights):
+                        if document_id in wanted:
+                            yield document_id, weight
+                    continue
+                for document_id in wanted:
+                    weight = documents.get((document_type, document_id), {}).get(
+                        token_id
+                    )
+                    if weight is not None:
+                        yield document_id, weight
+
+        token_ids = [int(token_id) for token_id in token_ids]
+        if self.prune_top_k and limit is not None:
+            bounds = {
+                token_id: lists.get(token_id, _EMPTY_POSTINGS)[2]
+                for token_id in token_ids
+            }
+            scores = max_score_top_k(
+                token_ids,
+                bounds,
+                int(limit),
+                score_lists,
+                score_candidates,
+                group_size=MAX_SCORE_GROUP_SIZE,
+            )
+        else:
+            scores = exhaustive_scores(score_lists, token_ids)
+
+        return rank_scores(scores, limit, min_score)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "documents": len(self._documents),
+            "tokens": len(self._token_ids_by_name),
+            "postings_lists": sum(len(lists) for lists in self._postings.values()),
+        }
+
+
+def _build(weights: Dict[int, int]) -> Postings:
+    document_ids = sorted(weights)
+    return (
+        array("q", document_ids),
+        array("q", [weights[document_id] for document_id in document_ids]),
+        max(weights.values()),
+    )
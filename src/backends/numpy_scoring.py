@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Optional dependency, only needed for NUMPY_SCORING. Imported on first use:
+# loading numpy costs more than the rest of the backend modules together
+np = None
+
+
+def numpy_available() -> bool:
+    return np is not None or importlib.util.find_spec("numpy") is not None
+
+
+def require_numpy():
+    """Import numpy on first use; raise RuntimeError when it is missing."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("NumPy scoring needs numpy: pip install numpy") from None
+        np = numpy
+    return np
+
+
+def rank_postings(
+    postings: Iterable[Tuple[Sequence[int], Sequence[int]]],
+    limit: Optional[int],
+    min_score: float,
+) -> List[Tuple[int, int]]:
+    """Sum, threshold and rank postings lists in NumPy.
+
+    Same result as accumulating the (document ids, weights) lists into a
+    dict and calling `rank_scores`: the lists are concatenated into two
+    int64 arrays (zero-copy for `array("q")` buffers), sorted by document
+    and summed per document with `np.add.reduceat`, filtered with a mask
+    and cut to the top `limit` with `np.argpartition`, ties by document id.
+    """
+    np = require_numpy()
+    document_lists = []
+    weight_lists = []
+    for document_ids, weights in postings:
+        if len(document_ids):
+            document_lists.append(np.frombuffer(document_ids, dtype=np.int64))
+            weight_lists.append(np.frombuffer(weights, dtype=np.int64))
+    if not document_lists:
+        return []
+
+    document_ids = np.concatenate(document_lists)
+    weights = np.concatenate(weight_lists)
+    if len(document_lists) > 1:
+        order = np.argsort(document_ids, kind="stable")
+        document_ids = document_ids[order]
+        weights = weights[order]
+        starts = np.flatnonzero(
+            np.concatenate(([True], document_ids[1:] != document_ids[:-1]))
+        )
+        document_ids = document_ids[starts]
+        weights = np.add.reduceat(weights, starts)
+
+    keep = weights >= weights.max() * min_score
+    document_ids = document_ids[keep]
+    weights = weights[keep]
+
+    if limit is not None and limit < len(weights):
+        limit = int(limit)
+        if limit <= 0:
+            return []
+        # Everything above the limit-th best score, then ties by document id
+        cutoff = weights[np.argpartition(-weights, limit - 1)[limit - 1]]
+        above = weights > cutoff
+        ties = np.flatnonzero(weights == cutoff)[: limit - int(above.sum())]
+        selected = np.concatenate((np.flatnonzero(above), ties))
+        document_ids = document_ids[selected]
+        weights = weights[selected]
+
+    order = np.lexsort((document_ids, -weights))
+    return list(zip(document_ids[order].tolist(), weights[order].tolist()))
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+
+def _rank_key(item: Tuple[int, int]) -> Tuple[int, int]:
+    return -item[1], item[0]
+
+
+def rank_scores(
+    scores: Dict[int, int], limit: Optional[int], min_score: float
+) -> List[Tuple[int, int]]:
+    """Order accumulated document scores the way `SqlIndexBackend` does.
+
+    Keeps scores of at least `min_score` times the best one and returns at
+    most `limit` (document_id, score) pairs, best first and ties by id.
+    """
+    if not scores:
+        return []
+
+    threshold = max(scores.values()) * min_score
+    candidates = [item for item in scores.items() if item[1] >= threshold]
+    if limit is not None and limit < len(candidates):
+        return heapq.nsmallest(int(limit), candidates, key=_rank_key)
+    return sorted(candidates, key=_rank_key)
@@ -0,0 +1,307 @@
+"""
+Immutable index segments read through `mmap`.
+
+A segment holds the postings of one document type, compiled from the
+`index_tokens`/`index_entries` tables. Several worker processes can map the
+same file, so they share one copy in the OS page cache and opening a
+segment costs a header read instead of a rebuild.
+
+Layout (little-endian):
+
+- header: magic, format version, flags, document type, document count and
+  the counts/offsets of the sections below
+- postings: one list per token, sorted by document id; each posting is the
+  varint-encoded gap to the previous document id followed by its weight,
+  either one byte quantized against the list's maximum weight or, for
+  segments written with `quantize=False`, an exact varint
+- terms: fixed-width records (token_id, offset, count, length, max_weight)
+  sorted by token id, searched with bisection
+- names: fixed-width records (token_id, blob offset, length) sorted by
+  token name, plus the blob of UTF-8 names they point into
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b"LSSEGMT1"
+FORMAT_VERSION = 1
+FLAG_QUANTIZED = 1
+
+# Largest quantized weight; zero stays reserved for zero weights
+QUANTIZATION_LEVELS = 255
+
+SEGMENT_SUFFIX = ".lss"
+
+# magic, version, flags, document_type, document_count, term_count,
+# term_offset, name_count, name_offset, blob_offset
+_HEADER = struct.Struct("<8sIIqQQQQQQ")
+# token_id, postings offset, document count, postings byte length, max weight
+_TERM = struct.Struct("<QQIII")
+# token_id, blob offset, name byte length
+_NAME = struct.Struct("<QII")
+_TOKEN_ID = struct.Struct("<Q")
+
+
+class SegmentFormatError(Exception):
+    """Raised when a file is not a segment this version can read."""
+
+
+class TermInfo(NamedTuple):
+    token_id: int
+    offset: int
+    count: int
+    length: int
+    max_weight: int
+
+
+class SegmentWriter:
+    """Write one segment file; postings must be added in token id order.
+
+    The file is written next to `path` and renamed into place by `close`, so
+    readers never observe a partial segment.
+    """
+
+    def __init__(self, path: str, document_type: int, quantize: bool = True):
+        self.path = path
+        self.document_type = int(document_type)
+        self.quantize = quantize
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(bytes(_HEADER.size))
+        self._offset = _HEADER.size
+        self._terms: List[TermInfo] = []
+        self._names: Dict[int, bytes] = {}
+        self._documents: set = set()
+
+    def __enter__(self) -> "SegmentWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_postings(
+        self, token_id: int, document_ids: Sequence[int], weights: Sequence[int]
+    ) -> None:
+        """Append the postings list of `token_id` (document ids ascending)."""
+        token_id = int(token_id)
+        if self._terms and token_id <= self._terms[-1].token_id:
+            raise ValueError("Postings must be added in increasing token id order")
+        if not document_ids:
+            return
+
+        max_weight = max(weights)
+        encoded = bytearray()
+        previous = -1
+        for document_id, weight in zip(document_ids, weights):
+            if document_id <= previous:
+                raise ValueError("Document ids must be strictly increasing")
+            _encode_varint(document_id - previous - 1, encoded)
+            previous = document_id
+            if self.quantize:
+                encoded.append(_quantize(weight, max_weight))
+            else:
+                _encode_varint(weight, encoded)
+
+        self._file.write(encoded)
+        self._terms.append(
+            TermInfo(
+                token_id, self._offset, len(document_ids), len(encoded), max_weight
+            )
+        )
+        self._offset += len(encoded)
+        self._documents.update(document_ids)
+
+    def add_token_name(self, token_id: int, name: str) -> None:
+        self._names[int(token_id)] = name.encode("utf-8")
+
+    def close(self) -> None:
+        # 1. Term dictionary, already in token id order
+        term_offset = self._offset
+        for term in self._terms:
+            self._file.write(_TERM.pack(*term))
+
+        # 2. Names of the tokens that have postings here, in name order
+        present = {term.token_id for term in self._terms}
+        names = sorted(
+            (name, token_id)
+            for token_id, name in self._names.items()
+            if token_id in present
+        )
+        name_offset = term_offset + len(self._terms) * _TERM.size
+        blob = bytearray()
+        for name, token_id in names:
+            self._file.write(_NAME.pack(token_id, len(blob), len(name)))
+            blob += name
+        blob_offset = name_offset + len(names) * _NAME.size
+        self._file.write(blob)
+
+        # 3. Header last, once all offsets are known
+        self._file.seek(0)
+        self._file.write(
+            _HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                FLAG_QUANTIZED if self.quantize else 0,
+                self.document_type,
+                len(self._documents),
+                len(self._terms),
+                term_offset,
+                len(names),
+                name_offset,
+                blob_offset,
+            )
+        )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class Segment:
+    """Read-only view of a segment file.
+
+    Nothing is deserialized up front: term and name lookups bisect the
+    fixed-width records and postings are decoded straight from the map.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER.size:
+            self._map.close()
+            raise SegmentFormatError(f"{path}: file too short")
+        (
+            magic,
+            version,
+            flags,
+            self.document_type,
+            self.document_count,
+            self.term_count,
+            self._term_offset,
+            self.name_count,
+            self._name_offset,
+            self._blob_offset,
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._map.close()
+            raise SegmentFormatError(f"{path}: not a version {FORMAT_VERSION} segment")
+        self.quantized = bool(flags & FLAG_QUANTIZED)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def find(self, token_id: int) -> Optional[TermInfo]:
+        """Return the dictionary record of `token_id`, if it has postings."""
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            (current,) = _TOKEN_ID.unpack_from(
+                self._map, self._term_offset + middle * _TERM.size
+            )
+            if current < token_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.term_count:
+            return None
+        term = TermInfo(
+            *_TERM.unpack_from(self._map, self._term_offset + low * _TERM.size)
+        )
+        return term if term.token_id == token_id else None
+
+    def postings(self, token_id: int) -> Iterator[Tuple[int, int]]:
+        """Yield (document_id, weight) pairs of `token_id` in id order."""
+        term = self.find(int(token_id))
+        if term is None:
+            return iter(())
+        return self.iter_term(term)
+
+    def iter_term(self, term: TermInfo) -> Iterator[Tuple[int, int]]:
+        data = self._map
+        position = term.offset
+        document_id = -1
+        quantized = self.quantized
+        scale = term.max_weight / QUANTIZATION_LEVELS
+        for _ in range(term.count):
+            # Document id gap, then the weight
+            gap = shift = 0
+            while True:
+                byte = data[position]
+                position += 1
+                gap |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            document_id += gap + 1
+
+            if quantized:
+                weight = round(data[position] * scale)
+                position += 1
+            else:
+                weight = shift = 0
+                while True:
+                    byte = data[position]
+                    position += 1
+                    weight |= (byte & 0x7F) << shift
+                    if byte < 0x80:
+                        break
+                    shift += 7
+            yield document_id, weight
+
+    def token_ids(self, name: str) -> List[int]:
+        """Return the ids of the tokens called `name` that occur here."""
+        target = name.encode("utf-8")
+        low, high = 0, self.name_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        token_ids = []
+        while low < self.name_count and self._name_at(low) == target:
+            (token_id,) = _TOKEN_ID.unpack_from(
+                self._map, self._name_offset + low * _NAME.size
+            )
+            token_ids.append(token_id)
+            low += 1
+        return token_ids
+
+    def _name_at(self, index: int) -> bytes:
+        _, offset, length = _NAME.unpack_from(
+            self._map, self._name_offset + index * _NAME.size
+        )
+        start = self._blob_offset + offset
+        return self._map[start : start + length]
+
+
+def segment_path(directory: str, document_type: int) -> str:
+    return os.path.join(directory, f"segment-{int(document_type)}{SEGMENT_SUFFIX}")
+
+
+def _quantize(weight: int, max_weight: int) -> int:
+    if weight <= 0 or max_weight <= 0:
+        return 0
+    return max(1, round(weight * QUANTIZATION_LEVELS / max_weight))
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import glob
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backends.scoring import rank_scores
+from backends.segment import SEGMENT_SUFFIX, Segment
+from interfaces.index_backend_interface import (
+    DocumentKey,
+    EntryRow,
+    IndexBackendInterface,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SegmentIndexBackend(IndexBackendInterface):
+    """Search over memory-mapped segments compiled from the SQL tables.
+
+    Segments are immutable: writes still go to SQLite and become visible
+    here after the next `python src/cli.py compile-segments`.
+    """
+
+    def __init__(self, segments: Iterable[Segment]):
+        self._segments: Dict[int, Segment] = {}
+        for segment in segments:
+            if segment.document_type in self._segments:
+                raise ValueError(
+                    f"More than one segment for document type {segment.document_type}"
+                )
+            self._segments[segment.document_type] = segment
+
+    @classmethod
+    def open(cls, directory: str) -> "SegmentIndexBackend":
+        """Map every segment file in `directory`."""
+        paths = sorted(glob.glob(os.path.join(directory, f"*{SEGMENT_SUFFIX}")))
+        backend = cls(Segment(path) for path in paths)
+        logger.info("Opened %s index segments from %s", len(paths), directory)
+        return backend
+
+    def close(self) -> None:
+        for segment in self._segments.values():
+            segment.close()
+        self._segments = {}
+
+    def resolve_token_ids(self, names: Sequence[str]) -> List[int]:
+        token_ids = set()
+        for name in set(names):
+            for segment in self._segments.values():
+                token_ids.update(segment.token_ids(name))
+        return list(token_ids)
+
+    def replace_documents(
+        self, keys: Sequence[DocumentKey], entries: Sequence[EntryRow]
+    ) -> None:
+        raise NotImplementedError(
+            "Segments are read-only; recompile them from the database instead"
+        )
+
+    def search(
+        self,
+        document_type: int,
+        token_ids: Sequence[int],
+        limit: Optional[int],
+        min_score: float,
+    ) -> List[Tuple[int, int]]:
+        segment = self._segments.get(int(document_type))
+        if segment is None or not token_ids:
+            return []
+
+        scores: Dict[int, int] = {}
+        get = scores.get
+        for token_id in set(token_ids):
+            for document_id, weight in segment.postings(token_id):
+                scores[document_id] = get(document_id, 0) + weight
+
+        return rank_scores(scores, limit, min_score)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self._segments),
+            "documents": sum(s.document_count for s in self._segments.values()),
+            "postings_lists": sum(s.term_count for s in self._segments.values()),
+        }
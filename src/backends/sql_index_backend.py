@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backends.scoring import rank_scores
+from backends.top_k import max_score_top_k
+from interfaces.index_backend_interface import (
+    DocumentKey,
+    EntryRow,
+    IndexBackendInterface,
+)
+from models.index_entry import IndexEntry
+from models.index_field_hash import IndexFieldHash
+from models.index_token import IndexToken
+from sqlalchemy import bindparam
+from sqlalchemy import delete as sa_delete
+from sqlalchemy import func
+from sqlalchemy import insert as sa_insert
+from sqlalchemy import tuple_
+from sqlalchemy import update as sa_update
+from sqlmodel import Session, select
+
+# SQLite builds before 3.32 cap bound parameters at 999 per statement.
+SQLITE_MAX_VARIABLES = 900
+
+# Queries with fewer tokens are scored by one aggregate query; MaxScore only
+# pays off once prefix and n-gram tokens make the token list long
+MAX_SCORE_MIN_TOKENS = 8
+
+# Tokens scored per query during MaxScore evaluation
+MAX_SCORE_GROUP_SIZE = 8
+
+
+class SqlIndexBackend(IndexBackendInterface):
+    """Index stored in the `index_tokens`/`index_entries` tables.
+
+    This is the durable source of truth. It never commits; the session owner
+    decides the transaction boundaries.
+
+    With `prune_top_k`, limited searches over many tokens use MaxScore
+    pruning with the `index_tokens.max_weight` bounds kept up to date by the
+    indexer. It is off by default: the single aggregate query is already
+    evaluated inside SQLite, and the extra round trips only pay off once the
+    postings lists grow long.
+    """
+
+    def __init__(self, session: Session, prune_top_k: bool = False):
+        self.session = session
+        self.prune_top_k = prune_top_k
+
+    def resolve_token_ids(self, names: Sequence[str]) -> List[int]:
+        if not names:
+            return []
+        stmt = select(IndexToken.id).where(IndexToken.name.in_(list(names)))
+        return [int(token_id) for token_id in self.session.exec(stmt).all()]
+
+    def resolve_token_ids_by_name(self, names: Sequence[str]) -> Dict[str, List[int]]:
+        resolved: Dict[str, List[int]] = {}
+        for chunk in chunks(sorted(set(names)), SQLITE_MAX_VARIABLES):
+            stmt = select(IndexToken.name, IndexToken.id).where(
+                IndexToken.name.in_(chunk)
+            )
+            for name, token_id in self.session.execute(stmt):
+                resolved.setdefault(name, []).append(int(token_id))
+        return resolved
+
+    def replace_documents(
+        self, keys: Sequence[DocumentKey], entries: Sequence[EntryRow]
+    ) -> None:
+        # Stored field hashes describe the old entries and go with them
+        self._delete_by_document(IndexFieldHash, keys)
+        self._delete_by_document(IndexEntry, keys)
+        self.insert_entries(entries)
+
+    def document_entries(
+        self, keys: Sequence[DocumentKey]
+    ) -> List[Tuple[int, EntryRow]]:
+        """Return (entry id, entry) for every entry of the given documents."""
+        rows: List[Tuple[int, EntryRow]] = []
+        for chunk in chunks(list(keys), SQLITE_MAX_VARIABLES // 2):
+            stmt = select(
+                IndexEntry.id,
+                IndexEntry.document_type,
+                IndexEntry.document_id,
+                IndexEntry.token_id,
+                IndexEntry.field_id,
+                IndexEntry.weight,
+            ).where(
+                tuple_(IndexEntry.document_type, IndexEntry.document_id).in_(
+                    [(int(doc_type), int(doc_id)) for doc_type, doc_id in chunk]
+                )
+            )
+            for entry_id, *entry in self.session.execute(stmt):
+                rows.append((int(entry_id), tuple(int(value) for value in entry)))
+        return rows
+
+    def insert_entries(self, entries: Sequence[EntryRow]) -> None:
+        if not entries:
+            return
+        # Core executemany skips ORM object construction and flushes
+        self.session.execute(
+            sa_insert(IndexEntry),
+            [
+                {
+                    "document_type": document_type,
+                    "document_id": document_id,
+                    "token_id": token_id,
+                    "field_id": field_id,
+                    "weight": weight,
+                }
+                for document_type, document_id, token_id, field_id, weight in entries
+            ],
+        )
+
+    def update_entry_weights(self, weights: Sequence[Tuple[int, int]]) -> None:
+        """Set the weight of existing entries from (entry id, weight) pairs."""
+        if not weights:
+            return
+        table = IndexEntry.__table__
+        self.session.execute(
+            sa_update(table)
+            .where(table.c.id == bindparam("entry_id"))
+            .values(weight=bindparam("new_weight")),
+            [
+                {"entry_id": entry_id, "new_weight": weight}
+                for entry_id, weight in weights
+            ],
+        )
+
+    def delete_entries(self, entry_ids: Sequence[int]) -> None:
+        for chunk in chunks(list(entry_ids), SQLITE_MAX_VARIABLES):
+            self.session.execute(sa_delete(IndexEntry).where(IndexEntry.id.in_(chunk)))
+
+    def field_hashes(
+        self, keys: Sequence[DocumentKey]
+    ) -> Dict[DocumentKey, Dict[int, str]]:
+        """Return the stored field_id -> content hash map of each document."""
+        hashes: Dict[DocumentKey, Dict[int, str]] = {}
+        for chunk in chunks(list(keys), SQLITE_MAX_VARIABLES // 2):
+            stmt = select(
+                IndexFieldHash.document_type,
+                IndexFieldHash.document_id,
+                IndexFieldHash.field_id,
+                IndexFieldHash.content_hash,
+            ).where(
+                tuple_(IndexFieldHash.document_type, IndexFieldHash.document_id).in_(
+                    [(int(doc_type), int(doc_id)) for doc_type, doc_id in chunk]
+                )
+            )
+            for (
+                document_type,
+                document_id,
+                field_id,
+                content_hash,
+            ) in self.session.execute(stmt):
+                hashes.setdefault((int(document_type), int(document_id)), {})[
+                    int(field_id)
+                ] = content_hash
+        return hashes
+
+    def replace_field_hashes(self, hashes: Dict[DocumentKey, Dict[int, str]]) -> None:
+        """Store the field hashes of the given documents, dropping old ones."""
+        self._delete_by_document(IndexFieldHash, list(hashes))
+        rows = [
+            {
+                "document_type": document_type,
+                "document_id": document_id,
+                "field_id": field_id,
+                "content_hash": content_hash,
+            }
+            for (document_type, document_id), fields in hashes.items()
+            for field_id, content_hash in fields.items()
+        ]
+        if rows:
+            self.session.execute(sa_insert(IndexFieldHash), rows)
+
+    def raise_token_bounds(self, bounds: Dict[int, int]) -> None:
+        """Raise `index_tokens.max_weight` to at least the given values."""
+        if not bounds:
+            return
+        table = IndexToken.__table__
+        self.session.execute(
+            sa_update(table)
+            .where(
+                table.c.id == bindparam("token_id"),
+                table.c.max_weight < bindparam("bound"),
+            )
+            .values(max_weight=bindparam("bound")),
+            [
+                {"token_id": token_id, "bound": bound}
+                for token_id, bound in bounds.items()
+            ],
+        )
+
+    def search(
+        self,
+        document_type: int,
+        token_ids: Sequence[int],
+        limit: Optional[int],
+        min_score: float,
+    ) -> List[Tuple[int, int]]:
+        if not token_ids:
+            return []
+
+        if (
+            self.prune_top_k
+            and limit is not None
+            and len(set(token_ids)) >= MAX_SCORE_MIN_TOKENS
+        ):
+            return self._search_max_score(
+                int(document_type), token_ids, int(limit), min_score
+            )
+
+        # Grouping by an expression keeps SQLite from reading every entry of
+        # the type through the (document_type, document_id) index just to get
+        # the groups in order; the covering search index is far more selective
+        scores = (
+            select(
+                IndexEntry.document_id.label("document_id"),
+                func.sum(IndexEntry.weight).label("score"),
+            )
+            .where(
+                IndexEntry.document_type == int(document_type),
+                IndexEntry.token_id.in_(list(token_ids)),
+            )
+            .group_by(IndexEntry.document_id + 0)
+            .cte("scores")
+        )
+        max_score = select(func.max(scores.c.score)).scalar_subquery()
+
+        stmt = (
+            select(scores.c.document_id, scores.c.score)
+            .where(scores.c.score >= max_score * min_score)
+            .order_by(scores.c.score.desc(), scores.c.document_id)
+        )
+        if limit is not None:
+            stmt = stmt.limit(int(limit))
+
+        return [(int(row[0]), int(row[1])) for row in self.session.exec(stmt).all()]
+
+    def search_many(
+        self,
+        document_type: int,
+        token_id_lists: Sequence[Sequence[int]],
+        limit: Optional[int],
+        min_score: float,
+    ) -> List[List[Tuple[int, int]]]:
+        """Score several searches, reading the postings they share only once.
+
+        Tokens are grouped by the set of searches containing them. Each group
+        is summed per document by one aggregate query, and its sums are added
+        to every search of the set, so a shared token is read once and its
+        weights are still summed inside SQLite. A search sharing no token
+        with the others is run by `search` as usual.
+        """
+        document_type = int(document_type)
+        searches_of: Dict[int, List[int]] = {}
+        for position, token_ids in enumerate(token_id_lists):
+            for token_id in set(token_ids):
+                searches_of.setdefault(int(token_id), []).append(position)
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for token_id, positions in searches_of.items():
+            groups.setdefault(tuple(positions), []).append(token_id)
+
+        results: List[Optional[List[Tuple[int, int]]]] = [None] * len(token_id_lists)
+        scores: List[Dict[int, int]] = [{} for _ in token_id_lists]
+        for positions, group in groups.items():
+            if len(positions) == 1 and len(group) == len(
+                set(token_id_lists[positions[0]])
+            ):
+                results[positions[0]] = self.search(
+                    document_type, group, limit, min_score
+                )
+                continue
+            targets = [scores[position] for position in positions]
+            for chunk in chunks(group, SQLITE_MAX_VARIABLES):
+                for document_id, weight in self._sum_weights(document_type, chunk):
+                    for search_scores in targets:
+                        search_scores[document_id] = (
+                            search_scores.get(document_id, 0) + weight
+                        )
+
+        return [
+            (
+                result
+                if result is not None
+                else rank_scores(search_scores, limit, min_score)
+            )
+            for result, search_scores in zip(results, scores)
+        ]
+
+    def _search_max_score(
+        self,
+        document_type: int,
+        token_ids: Sequence[int],
+        limit: int,
+        min_score: float,
+    ) -> List[Tuple[int, int]]:
+        bounds = {int(token_id): 0 for token_id in token_ids}
+        for chunk in chunks(list(bounds), SQLITE_MAX_VARIABLES):
+            stmt = select(IndexToken.id, IndexToken.max_weight).where(
+                IndexToken.id.in_(chunk)
+            )
+            for token_id, max_weight in self.session.execute(stmt):
+                bounds[int(token_id)] = int(max_weight)
+
+        def score_lists(group: Sequence[int]):
+            return self._sum_weights(document_type, group)
+
+        def score_candidates(group: Sequence[int], candidates: Sequence[int]):
+            size = max(1, SQLITE_MAX_VARIABLES - len(group) - 1)
+            for chunk in chunks(candidates, size):
+                yield from self._sum_weights(document_type, group, chunk)
+
+        scores = max_score_top_k(
+            bounds,
+            bounds,
+            limit,
+            score_lists,
+            score_candidates,
+            group_size=MAX_SCORE_GROUP_SIZE,
+        )
+        return rank_scores(scores, limit, min_score)
+
+    def _sum_weights(
+        self,
+        document_type: int,
+        token_ids: Sequence[int],
+        document_ids: Optional[Sequence[int]] = None,
+    ) -> Iterable[Tuple[int, int]]:
+        stmt = select(IndexEntry.document_id, func.sum(IndexEntry.weight)).where(
+            IndexEntry.document_type == document_type,
+            IndexEntry.token_id.in_(list(token_ids)),
+        )
+        if document_ids is not None:
+            stmt = stmt.where(IndexEntry.document_id.in_(list(document_ids)))
+        stmt = stmt.group_by(IndexEntry.document_id + 0)
+        return [(int(row[0]), int(row[1])) for row in self.session.execute(stmt)]
+
+    def _delete_by_document(self, model, keys: Sequence[DocumentKey]) -> None:
+        # Row-value IN keeps this to one DELETE per chunk of documents
+        for chunk in chunks(list(keys), SQLITE_MAX_VARIABLES // 2):
+            self.session.execute(
+                sa_delete(model).where(
+                    tuple_(model.document_type, model.document_id).in_(
+                        [(int(doc_type), int(doc_id)) for doc_type, doc_id in chunk]
+                    )
+                )
+            )
+
+
+def chunks(items: Sequence, size: int) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
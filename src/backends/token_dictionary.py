@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from models.index_token import IndexToken
+from sqlmodel import Session, select
+from utils.text_normalizer import extract_words
+
+# Sorted unique token names and the ids of each name, index-aligned
+_Snapshot = Tuple[List[str], List[Tuple[int, ...]]]
+
+# Sorts after every character the normalizer keeps (a-z0-9)
+_PREFIX_END = "\uffff"
+
+
+class TokenDictionary:
+    """Sorted dictionary of whole-word tokens for query-time prefix expansion.
+
+    Replaces indexing every prefix of every word (`PrefixTokenizer`): a query
+    word of at least `min_prefix_length` characters is expanded to the ids of
+    the indexed tokens it is a prefix of, found by binary search in the
+    sorted names. At most `max_expansions` tokens are used per word, the
+    shortest (closest) completions first.
+
+    Only tokens whose weight is in `weights` (the word tokenizer's weight)
+    are kept. `refresh` just reads the rows added since the last load and
+    `remove` drops the tokens garbage-collected by `IndexMaintenanceService`;
+    writers swap in a new snapshot and searches read without locking.
+    `version` counts the refreshes and removals that changed the names.
+
+    With `ngram_length`, a side index maps each n-gram of the names (padded
+    with `$` at both ends) to the names containing it, for typo correction
+    (see `TypoCorrector`). Writers only append to its lists.
+    """
+
+    def __init__(
+        self,
+        weights: Iterable[int] = (1,),
+        min_prefix_length: int = 4,
+        max_expansions: int = 50,
+        ngram_length: int = 0,
+    ) -> None:
+        self.weights = tuple(sorted({int(weight) for weight in weights}))
+        self.min_prefix_length = max(1, int(min_prefix_length))
+        self.max_expansions = max(0, int(max_expansions))
+        self.ngram_length = max(0, int(ngram_length))
+        self.version = 0
+        self._snapshot: _Snapshot = ([], [])
+        self._grams: Dict[str, List[str]] = {}
+        self._last_token_id = 0
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def from_env(
+        cls, weights: Iterable[int] = (1,), ngram_length: int = 0
+    ) -> "TokenDictionary":
+        return cls(
+            weights,
+            min_prefix_length=int(os.getenv("PREFIX_MIN_LENGTH", "4")),
+            max_expansions=int(os.getenv("PREFIX_MAX_EXPANSIONS", "50")),
+            ngram_length=ngram_length,
+        )
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0])
+
+    def __contains__(self, name: str) -> bool:
+        return bool(self.ids_of(name))
+
+    def ids_of(self, name: str) -> Tuple[int, ...]:
+        names, ids = self._snapshot
+        position = bisect_left(names, name)
+        if position < len(names) and names[position] == name:
+            return ids[position]
+        return ()
+
+    def names_with_gram(self, gram: str) -> List[str]:
+        """Names containing the padded n-gram `gram` (empty without a side index)."""
+        return self._grams.get(gram, [])
+
+    def refresh(self, session: Session) -> int:
+        """Add tokens created since the last refresh; return how many."""
+        with self._write_lock:
+            stmt = (
+                select(IndexToken.id, IndexToken.name)
+                .where(
+                    IndexToken.id > self._last_token_id,
+                    IndexToken.weight.in_(self.weights),
+                )
+                .order_by(IndexToken.id)
+            )
+            rows = session.execute(stmt).all()
+            if not rows:
+                return 0
+
+            self._last_token_id = int(rows[-1][0])
+            self._add((name, int(token_id)) for token_id, name in rows)
+            return len(rows)
+
+    def remove(self, tokens: Dict[Tuple[str, int], int]) -> int:
+        """Drop deleted tokens, keyed by (name, weight); return how many."""
+        with self._write_lock:
+            removed: Dict[str, Set[int]] = {}
+            for (name, weight), token_id in tokens.items():
+                if weight in self.weights:
+                    removed.setdefault(name, set()).add(int(token_id))
+            if not removed:
+                return 0
+
+            names, ids = self._snapshot
+            ids = list(ids)
+            count = 0
+            gone = set()
+            for name, token_ids in removed.items():
+                position = bisect_left(names, name)
+                if position == len(names) or names[position] != name:
+                    continue
+                kept = tuple(t for t in ids[position] if t not in token_ids)
+                count += len(ids[position]) - len(kept)
+                ids[position] = kept
+                if not kept:
+                    gone.add(name)
+            if gone:
+                pairs = [pair for pair in zip(names, ids) if pair[1]]
+                names = [name for name, _ in pairs]
+                ids = [token_ids for _, token_ids in pairs]
+            self._snapshot = (names, ids)
+
+            if self.ngram_length:
+                grams = {
+                    gram
+                    for name in gone
+                    for gram in padded_ngrams(name, self.ngram_length)
+                }
+                for gram in grams & self._grams.keys():
+                    # Replaced, not edited: readers may be iterating it
+                    self._grams[gram] = [
+                        name for name in self._grams[gram] if name not in gone
+                    ]
+            if gone:
+                self.version += 1
+            return count
+
+    def expand(self, prefix: str) -> List[int]:
+        """Return the ids of at most `max_expansions` tokens starting with `prefix`."""
+        if len(prefix) < self.min_prefix_length or not self.max_expansions:
+            return []
+
+        names, ids = self._snapshot
+        start = bisect_left(names, prefix)
+        end = bisect_left(names, prefix + _PREFIX_END, start)
+        positions: Sequence[int] = range(start, end)
+        if len(positions) > self.max_expansions:
+            positions = heapq.nsmallest(
+                self.max_expansions,
+                positions,
+                key=lambda position: (len(names[position]), names[position]),
+            )
+        return [token_id for position in positions for token_id in ids[position]]
+
+    def expand_query(self, query: str) -> List[int]:
+        """Expand every long enough word of `query`; ids are unique."""
+        expanded: Dict[int, None] = {}
+        for word in dict.fromkeys(extract_words(query or "")):
+            expanded.update(dict.fromkeys(self.expand(word)))
+        return list(expanded)
+
+    def _add(self, tokens: Iterable[Tuple[str, int]]) -> None:
+        names, ids = self._snapshot
+        ids = list(ids)
+        added: Dict[str, Tuple[int, ...]] = {}
+        for name, token_id in tokens:
+            position = bisect_left(names, name)
+            if position < len(names) and names[position] == name:
+                if token_id not in ids[position]:
+                    ids[position] += (token_id,)
+            elif token_id not in added.get(name, ()):
+                added[name] = added.get(name, ()) + (token_id,)
+
+        if added:
+            # Linear merge of two sorted runs instead of re-sorting everything
+            merged = list(heapq.merge(zip(names, ids), sorted(added.items())))
+            names = [name for name, _ in merged]
+            ids = [token_ids for _, token_ids in merged]
+        self._snapshot = (names, ids)
+
+        if self.ngram_length:
+            for name in added:
+                for gram in padded_ngrams(name, self.ngram_length):
+                    self._grams.setdefault(gram, []).append(name)
+        self.version += 1
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            "tokens": len(self),
+            "last_token_id": self._last_token_id or None,
+            "min_prefix_length": self.min_prefix_length,
+            "max_expansions": self.max_expansions,
+        }
+
+
+def padded_ngrams(word: str, length: int) -> List[str]:
+    """Distinct n-grams of `word` padded with one `$` at both ends."""
+    padded = f"${word}$"
+    return list(
+        dict.fromkeys(padded[i : i + length] for i in range(len(padded) - length + 1))
+    )
@@ -0,0 +1,118 @@
+"""
+Top-k evaluation with MaxScore pruning.
+
+Scores are sums of per-token weights, and every token has an upper bound on
+the weight it can add to one document. Postings lists are scored
+term-at-a-time, highest bound first. Once the bounds of the lists still
+unscored add up to less than the current k-th best score, a document that
+has not been seen yet cannot make the top k anymore. From then on the
+remaining tokens are only looked up for the candidates that can still
+reach that score, instead of scanning their (usually long) lists, and the
+candidate set shrinks as the threshold rises and the remaining bounds fall.
+
+The result equals exhaustive scoring for the top k, so the normalization
+threshold applied afterwards by `rank_scores` is unaffected.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Callable, Dict, Iterable, Sequence, Tuple
+
+# Scores every posting of the given tokens: yields (document_id, weight)
+ScoreLists = Callable[[Sequence[int]], Iterable[Tuple[int, int]]]
+
+# Scores the given tokens for the given documents only
+ScoreCandidates = Callable[[Sequence[int], Sequence[int]], Iterable[Tuple[int, int]]]
+
+
+def max_score_top_k(
+    token_ids: Iterable[int],
+    bounds: Dict[int, int],
+    k: int,
+    score_lists: ScoreLists,
+    score_candidates: ScoreCandidates,
+    group_size: int = 1,
+) -> Dict[int, int]:
+    """Return final scores of a document set that contains the exact top `k`.
+
+    - `bounds` maps each token to an upper bound of its weight in a document
+    - `group_size` tokens are scored per `score_lists` call, trading a
+      little pruning for fewer round trips to the storage
+    """
+    if k < 1:
+        return {}
+
+    order = sorted(set(token_ids), key=lambda token_id: (-bounds[token_id], token_id))
+    remaining = sum(bounds[token_id] for token_id in order)
+    scores: Dict[int, int] = {}
+    threshold = 0
+    position = 0
+
+    # 1. Score whole lists while unseen documents could still enter the top k
+    while position < len(order):
+        group = order[position : position + max(1, group_size)]
+        position += len(group)
+        remaining -= sum(bounds[token_id] for token_id in group)
+
+        get = scores.get
+        for document_id, weight in score_lists(group):
+            scores[document_id] = get(document_id, 0) + weight
+
+        if len(scores) >= k:
+            threshold = heapq.nlargest(k, scores.values())[-1]
+            if remaining < threshold:
+                break
+
+    if position == len(order):
+        return scores
+
+    # 2. Finish the k best documents first: their final scores raise the
+    #    threshold far above what partial scores give
+    leaders = dict(heapq.nlargest(k, scores.items(), key=_score))
+    for document_id, weight in score_candidates(order[position:], sorted(leaders)):
+        leaders[document_id] += weight
+    threshold = max(threshold, min(leaders.values()))
+
+    # 3. Complete only the other documents that can still reach the k-th
+    #    score, dropping the ones that fall behind after every group
+    candidates = {
+        document_id: score
+        for document_id, score in scores.items()
+        if document_id not in leaders
+    }
+    while position < len(order) and candidates:
+        candidates = {
+            document_id: score
+            for document_id, score in candidates.items()
+            if score + remaining >= threshold
+        }
+        group = order[position : position + max(1, group_size)]
+        position += len(group)
+        remaining -= sum(bounds[token_id] for token_id in group)
+
+        for document_id, weight in score_candidates(group, sorted(candidates)):
+            candidates[document_id] += weight
+        # Leaders are final and candidates only grow, so the k-th best of
+        # both is still a lower bound of the k-th final score
+        scored = itertools.chain(leaders.values(), candidates.values())
+        threshold = max(threshold, heapq.nlargest(k, scored)[-1])
+
+    candidates.update(leaders)
+    return candidates
+
+
+def _score(item: Tuple[int, int]) -> int:
+    return item[1]
+
+
+def exhaustive_scores(
+    score_lists: ScoreLists, token_ids: Iterable[int]
+) -> Dict[int, int]:
+    """Score every document of every list; the reference for `max_score_top_k`."""
+    scores: Dict[int, int] = {}
+    get = scores.get
+    for document_id, weight in score_lists(sorted(set(token_ids))):
+        scores[document_id] = get(document_id, 0) + weight
+    return scores
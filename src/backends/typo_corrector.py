@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import heapq
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from backends.token_dictionary import TokenDictionary, padded_ngrams
+from utils.lru_cache import LRUCache
+from utils.text_normalizer import extract_words
+
+
+class TypoCorrector:
+    """Correct misspelled query words against the indexed words.
+
+    A query word that is not indexed is looked up through the n-gram side
+    index of a `TokenDictionary` (built with `ngram_length`):
+    - Two words within edit distance k share at least `grams - n * k` of
+      their padded n-grams, so only the least common `k * n + 1` grams of the
+      query word are probed for candidates (prefix filtering)
+    - Candidates with a length difference above k or too few shared grams
+      are dropped; the `max_candidates` sharing the most grams are verified
+      with a Levenshtein distance that gives up beyond k
+    - The closest `max_corrections` words are used, fewest edits first
+
+    k is 1 for words shorter than `long_word_length` and 2 from there on;
+    words shorter than `min_word_length` are left alone. Correcting a query
+    stops once `time_budget_ms` is spent. Corrections are cached per word
+    and dropped whenever the dictionary gains tokens.
+    """
+
+    def __init__(
+        self,
+        dictionary: TokenDictionary,
+        min_word_length: int = 4,
+        long_word_length: int = 8,
+        max_candidates: int = 200,
+        max_corrections: int = 3,
+        time_budget_ms: float = 5.0,
+        cache_size: int = 10000,
+    ) -> None:
+        if not dictionary.ngram_length:
+            raise ValueError("TypoCorrector needs a TokenDictionary with ngram_length")
+        self.dictionary = dictionary
+        self.min_word_length = max(1, int(min_word_length))
+        self.long_word_length = int(long_word_length)
+        self.max_candidates = max(1, int(max_candidates))
+        self.max_corrections = max(1, int(max_corrections))
+        self.time_budget_ms = float(time_budget_ms)
+        # word -> (dictionary version, corrected names)
+        self.cache: LRUCache[str, Tuple[int, Tuple[str, ...]]] = LRUCache(cache_size)
+        self.budget_exhausted = 0
+
+    @classmethod
+    def from_env(cls, dictionary: TokenDictionary) -> "TypoCorrector":
+        return cls(
+            dictionary,
+            max_candidates=int(os.getenv("FUZZY_MAX_CANDIDATES", "200")),
+            max_corrections=int(os.getenv("FUZZY_MAX_CORRECTIONS", "3")),
+            time_budget_ms=float(os.getenv("FUZZY_BUDGET_MS", "5")),
+            cache_size=int(os.getenv("FUZZY_CACHE_SIZE", "10000")),
+        )
+
+    def correct_query(self, query: str) -> List[int]:
+        """Return the token ids of the corrections of every misspelled word."""
+        deadline = time.perf_counter() + self.time_budget_ms / 1000.0
+        corrected: Dict[int, None] = {}
+        for word in dict.fromkeys(extract_words(query or "")):
+            if time.perf_counter() > deadline:
+                self.budget_exhausted += 1
+                break
+            for name in self.correct(word):
+                corrected.update(dict.fromkeys(self.dictionary.ids_of(name)))
+        return list(corrected)
+
+    def correct(self, word: str) -> Tuple[str, ...]:
+        """Indexed words within the allowed edit distance of a misspelled `word`."""
+        if len(word) < self.min_word_length or word in self.dictionary:
+            return ()
+
+        version = self.dictionary.version
+        cached = self.cache.get(word)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        corrections = self._find(word)
+        self.cache.put(word, (version, corrections))
+        return corrections
+
+    def stats(self) -> Dict[str, object]:
+        return {"budget_exhausted": self.budget_exhausted, **self.cache.stats()}
+
+    def _find(self, word: str) -> Tuple[str, ...]:
+        max_distance = 1 if len(word) < self.long_word_length else 2
+        length = self.dictionary.ngram_length
+        grams = padded_ngrams(word, length)
+        min_shared = max(1, len(grams) - length * max_distance)
+
+        # 1. Probe the rarest grams; a match must contain at least one of them
+        lists = sorted(
+            (self.dictionary.names_with_gram(gram) for gram in grams), key=len
+        )
+        candidates = {
+            name
+            for names in lists[: len(grams) - min_shared + 1]
+            for name in names
+            if abs(len(name) - len(word)) <= max_distance
+        }
+
+        # 2. Keep the candidates sharing the most grams
+        gram_set = set(grams)
+        shared = {}
+        for name in candidates:
+            count = len(gram_set.intersection(padded_ngrams(name, length)))
+            if count >= min_shared:
+                shared[name] = count
+        ranked = heapq.nlargest(
+            self.max_candidates, shared, key=lambda name: (shared[name], name)
+        )
+
+        # 3. Verify with a bounded edit distance
+        verified = []
+        for name in ranked:
+            distance = bounded_levenshtein(word, name, max_distance)
+            if distance is not None:
+                verified.append((distance, -shared[name], name))
+        verified.sort()
+        return tuple(name for _, _, name in verified[: self.max_corrections])
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Edit distance of `a` and `b`, or None once it must exceed `max_distance`."""
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
@@ -0,0 +1,276 @@
+"""
+Command line maintenance tools.
+
+    python src/cli.py compile-segments --output segments
+    python src/cli.py reshard --to-count 4 --to-path "shards/shard-{shard}.db"
+    python src/cli.py maintain --tasks gc,vacuum,analyze
+    python src/cli.py snapshot --output backups
+
+The database is configured through the same `SQLITE_*` variables as the
+web application; `maintain` and `snapshot` cover every shard when
+`SHARD_COUNT` is set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from sqlmodel import Session
+
+from services.index_maintenance_service import (
+    MAINTENANCE_TASKS,
+    IndexMaintenanceService,
+    MaintenanceSettings,
+)
+from services.segment_compiler_service import SegmentCompilerService
+from services.sharded_index_service import IndexShards, ShardSettings, reshard
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.logger import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+
+def compile_segments(args: argparse.Namespace) -> int:
+    engine = create_sqlite_engine(SqliteSettings.from_env())
+    with Session(engine) as session:
+        paths = SegmentCompilerService(session).compile(
+            args.output, quantize=not args.exact_weights
+        )
+    for path in paths:
+        print(f"{path}\t{os.path.getsize(path)} bytes")
+    return 0
+
+
+def reshard_index(args: argparse.Namespace) -> int:
+    sqlite_settings = SqliteSettings.from_env()
+    if args.from_count:
+        source_settings = ShardSettings(args.from_count, args.from_path)
+    else:
+        # The unsharded database is a source of a single shard
+        source_settings = ShardSettings(1, sqlite_settings.database_file)
+    target_settings = ShardSettings(args.to_count, args.to_path)
+    if args.to_count < 1 or (args.to_count > 1 and "{shard}" not in args.to_path):
+        print("--to-path needs a {shard} placeholder", file=sys.stderr)
+        return 1
+
+    source_paths = [os.path.abspath(path) for path in source_settings.paths()]
+    target_paths = [os.path.abspath(path) for path in target_settings.paths()]
+    missing = [path for path in source_paths if not os.path.exists(path)]
+    if missing:
+        print(f"Source database not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    if set(source_paths) & set(target_paths):
+        print("Target shards must not overwrite the source", file=sys.stderr)
+        return 1
+
+    source = IndexShards.open(source_settings, sqlite_settings)
+    target = IndexShards.open(target_settings, sqlite_settings)
+    try:
+        target.migrate()
+        stats = reshard(source, target, batch_size=args.batch_size)
+    finally:
+        source.dispose()
+        target.dispose()
+    print(
+        f"{stats.documents} documents, {stats.entries} entries "
+        f"-> {target.count} shards in {stats.elapsed_seconds:.1f}s"
+    )
+    for path in target_settings.paths():
+        print(f"{path}\t{os.path.getsize(path)} bytes")
+    return 0
+
+
+def open_index_databases() -> IndexShards:
+    """The shards configured by SHARD_*, or the unsharded database as one shard."""
+    sqlite_settings = SqliteSettings.from_env()
+    shard_settings = ShardSettings.from_env()
+    if not shard_settings.count:
+        shard_settings = ShardSettings(1, sqlite_settings.database_file)
+    return IndexShards.open(shard_settings, sqlite_settings)
+
+
+def find_missing_databases(databases: IndexShards) -> bool:
+    """Print the database files that do not exist; True if there are any."""
+    missing = [
+        engine.url.database
+        for engine in databases.engines
+        if not os.path.exists(engine.url.database)
+    ]
+    if missing:
+        print(f"Database not found: {', '.join(missing)}", file=sys.stderr)
+    return bool(missing)
+
+
+def maintenance_settings(args: argparse.Namespace) -> MaintenanceSettings:
+    settings = MaintenanceSettings.from_env()
+    if args.pause_ms is not None:
+        settings.pause_seconds = args.pause_ms / 1000
+    if getattr(args, "batch_size", None) is not None:
+        settings.batch_size = args.batch_size
+    return settings
+
+
+def maintain_index(args: argparse.Namespace) -> int:
+    tasks = [task.strip() for task in args.tasks.split(",") if task.strip()]
+    unknown = set(tasks) - set(MAINTENANCE_TASKS)
+    if unknown or not tasks:
+        print(
+            f"--tasks takes a comma-separated subset of {','.join(MAINTENANCE_TASKS)}",
+            file=sys.stderr,
+        )
+        return 1
+
+    databases = open_index_databases()
+    try:
+        if find_missing_databases(databases):
+            return 1
+        for engine in databases.engines:
+            report = IndexMaintenanceService(engine, maintenance_settings(args)).run(
+                tasks
+            )
+            print(
+                f"{report.database_file}\t{','.join(report.tasks)}\t"
+                f"{report.removed_tokens} orphan tokens removed\t"
+                f"{report.bytes_before} -> {report.bytes_after} bytes\t"
+                f"{report.free_pages_before} -> {report.free_pages_after} free pages\t"
+                f"{report.elapsed_seconds:.1f}s"
+            )
+    finally:
+        databases.dispose()
+    return 0
+
+
+def snapshot_index(args: argparse.Namespace) -> int:
+    databases = open_index_databases()
+    try:
+        if find_missing_databases(databases):
+            return 1
+        services = [
+            IndexMaintenanceService(engine, maintenance_settings(args))
+            for engine in databases.engines
+        ]
+        targets = [
+            os.path.join(args.output, os.path.basename(service.database_file))
+            for service in services
+        ]
+        if len(set(targets)) < len(targets):
+            print("Database file names must differ to share --output", file=sys.stderr)
+            return 1
+        for service, target in zip(services, targets):
+            if os.path.abspath(target) == os.path.abspath(service.database_file):
+                print("Snapshots must not overwrite the database", file=sys.stderr)
+                return 1
+        for service, target in zip(services, targets):
+            print(f"{target}\t{service.snapshot(target)} bytes")
+    finally:
+        databases.dispose()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="LittleSearch maintenance tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser(
+        "compile-segments",
+        help="Compile the SQL index into memory-mapped segment files",
+    )
+    compile_parser.add_argument(
+        "--output",
+        default=os.getenv("SEGMENT_DIR", "segments"),
+        help="Segment directory (default: $SEGMENT_DIR or ./segments)",
+    )
+    compile_parser.add_argument(
+        "--exact-weights",
+        action="store_true",
+        help="Store exact weights instead of 8-bit quantized ones",
+    )
+    compile_parser.set_defaults(handler=compile_segments)
+
+    shard_settings = ShardSettings.from_env()
+    reshard_parser = commands.add_parser(
+        "reshard",
+        help="Copy the index into a new set of shards",
+        description="Copy the index into a new set of shards. Point "
+        "SHARD_COUNT and SHARD_PATH at the new shards afterwards.",
+    )
+    reshard_parser.add_argument(
+        "--from-count",
+        type=int,
+        default=shard_settings.count,
+        help="Current shard count, 0 for the unsharded database "
+        "(default: $SHARD_COUNT or 0)",
+    )
+    reshard_parser.add_argument(
+        "--from-path",
+        default=shard_settings.path_template,
+        help="Current shard path template (default: $SHARD_PATH)",
+    )
+    reshard_parser.add_argument(
+        "--to-count", type=int, required=True, help="New shard count"
+    )
+    reshard_parser.add_argument(
+        "--to-path",
+        required=True,
+        help="New shard path template with a {shard} placeholder",
+    )
+    reshard_parser.add_argument("--batch-size", type=int, default=500)
+    reshard_parser.set_defaults(handler=reshard_index)
+
+    maintain_parser = commands.add_parser(
+        "maintain",
+        help="Collect orphan tokens, rebuild indexes, VACUUM and ANALYZE",
+        description="Collect orphan tokens, rebuild indexes, VACUUM and "
+        "ANALYZE the index. Garbage collection must not run while another "
+        "process indexes into the database; use MAINTENANCE_INTERVAL to run "
+        "it inside the web application instead.",
+    )
+    maintain_parser.add_argument(
+        "--tasks",
+        default=",".join(MAINTENANCE_TASKS),
+        help=f"Comma-separated tasks (default: {','.join(MAINTENANCE_TASKS)})",
+    )
+    maintain_parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Token ids per garbage collection transaction "
+        "(default: $MAINTENANCE_BATCH_SIZE or 1000)",
+    )
+    maintain_parser.add_argument(
+        "--pause-ms",
+        type=float,
+        help="Pause between transactions (default: $MAINTENANCE_PAUSE_MS or 50)",
+    )
+    maintain_parser.set_defaults(handler=maintain_index)
+
+    snapshot_parser = commands.add_parser(
+        "snapshot",
+        help="Copy a consistent snapshot of the index while it is in use",
+    )
+    snapshot_parser.add_argument(
+        "--output",
+        required=True,
+        help="Directory receiving a copy of each database under its file name",
+    )
+    snapshot_parser.add_argument(
+        "--pause-ms",
+        type=float,
+        help="Pause between backup steps of $SNAPSHOT_PAGES pages "
+        "(default: $MAINTENANCE_PAUSE_MS or 50)",
+    )
+    snapshot_parser.set_defaults(handler=snapshot_index)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    setup_logging()
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (document_type, document_id, token_id, field_id, weight)
+EntryRow = Tuple[int, int, int, int, int]
+
+# (document_type, document_id)
+DocumentKey = Tuple[int, int]
+
+
+class IndexBackendInterface(ABC):
+    """Storage of index entries that search can be scored against.
+
+    `SearchIndexingService` writes through one durable backend (the SQL
+    tables) and mirrors committed changes to any number of replica backends;
+    `SearchService` scores queries against a single backend.
+    """
+
+    @abstractmethod
+    def resolve_token_ids(self, names: Sequence[str]) -> List[int]:
+        """Return the ids of all tokens whose name is in `names`.
+
+        A name can map to several ids (one per tokenizer weight).
+        """
+        raise NotImplementedError
+
+    def resolve_token_ids_by_name(self, names: Sequence[str]) -> Dict[str, List[int]]:
+        """Return the token ids of each name in `names` that is indexed.
+
+        Backends with a round trip per lookup should do it in one go.
+        """
+        resolved = {}
+        for name in set(names):
+            token_ids = self.resolve_token_ids([name])
+            if token_ids:
+                resolved[name] = token_ids
+        return resolved
+
+    def register_tokens(self, tokens: Dict[Tuple[str, int], int]) -> None:
+        """Learn newly created (name, weight) -> id tokens.
+
+        Backends that read `index_tokens` directly can ignore this.
+        """
+
+    @abstractmethod
+    def replace_documents(
+        self, keys: Sequence[DocumentKey], entries: Sequence[EntryRow]
+    ) -> None:
+        """Drop every entry of the documents in `keys`, then add `entries`.
+
+        `entries` may only belong to documents listed in `keys`.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(
+        self,
+        document_type: int,
+        token_ids: Sequence[int],
+        limit: Optional[int],
+        min_score: float,
+    ) -> List[Tuple[int, int]]:
+        """Score documents by the summed weight of their matching entries.
+
+        Returns (document_id, raw_score) pairs ordered by score descending,
+        then document id ascending, keeping only scores of at least
+        `min_score` times the best score and at most `limit` rows.
+        """
+        raise NotImplementedError
+
+    def search_many(
+        self,
+        document_type: int,
+        token_id_lists: Sequence[Sequence[int]],
+        limit: Optional[int],
+        min_score: float,
+    ) -> List[List[Tuple[int, int]]]:
+        """Run `search` for each list of token ids, in order.
+
+        Backends with a round trip per search should share one pass over
+        the postings of all lists instead.
+        """
+        return [
+            self.search(document_type, token_ids, limit, min_score)
+            for token_ids in token_id_lists
+        ]
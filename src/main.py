@@ -1,25 +1,66 @@
+import asyncio
+import contextlib
+import functools
 import os
-import uvicorn
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional
 
 from typing import Union
 from fastapi import FastAPI
 from typing import Annotated
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
+from backends.numpy_scoring import numpy_available
+from backends.sql_index_backend import SqlIndexBackend
+from interfaces.index_backend_interface import IndexBackendInterface
+from models.indexable_document import IndexableDocument
+from models.search_batch_request import SearchBatchRequest
+from services.background_indexer import BackgroundIndexer, IndexQueueFull
+from services.schema_migration_service import SchemaMigrationService
+from services.search_indexing_service import (
+    AGGREGATED_TOKEN_WEIGHT,
+    IndexingMetrics,
+    DEFAULT_TOKEN_CACHE_SIZE,
+    SearchIndexingService,
+)
+from services.search_result_cache import SearchResultCache
+from services.search_service import SearchMetrics, SearchService
+from services.sharded_index_service import (
+    IndexShards,
+    ShardedIndexingService,
+    ShardedSearchService,
+    ShardSettings,
+)
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.index_generation import IndexGeneration
+from utils.lru_cache import LRUCache
 from utils.logger import get_logger, setup_logging
+from utils.metrics import MetricsRegistry
 from utils.ngrams_tokenizer import NGramsTokenizer
 from utils.prefix_tokenizer import PrefixTokenizer
 from utils.word_tokenizer import WordTokenizer
 import models.index_entry  # noqa: F401
 import models.index_token  # noqa: F401
 
+# Optional subsystems (memory and segment backends, word dictionary, ingest
+# buffer, maintenance, NumPy, uvicorn) are imported where they are enabled,
+# so a default configuration does not pay for loading them at startup
+if TYPE_CHECKING:
+    from backends.token_dictionary import TokenDictionary
+    from services.index_maintenance_service import (
+        IndexMaintenanceService,
+        MaintenanceScheduler,
+    )
+    from services.ingest_buffer import IngestBuffer
 
-sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
-
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+# Storage profile (WAL, pragmas, pool size) from SQLITE_* / DB_* variables
+sqlite_settings = SqliteSettings.from_env()
+engine = create_sqlite_engine(sqlite_settings)
 
 # Setup logging before creating the app
 setup_logging()
@@ -30,7 +71,8 @@ logger = get_logger(__name__)
 
 def create_db_and_tables():
     logger.info("Creating database and tables...")
-    SQLModel.metadata.create_all(engine)
+    version = SchemaMigrationService(engine).migrate()
+    logger.info("Index schema is at version %s", version)
 
 
 def get_session():
@@ -40,12 +82,419 @@ def get_session():
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
+# Process-wide: bumped by indexing, checked by the search result cache
+index_generation = IndexGeneration()
+search_result_cache = SearchResultCache.from_env(index_generation)
+token_cache = LRUCache(int(os.getenv("TOKEN_CACHE_SIZE", DEFAULT_TOKEN_CACHE_SIZE)))
+
+# Stage timings served at GET /metrics; METRICS_ENABLED=0 skips the hooks
+metrics_registry = MetricsRegistry.from_env()
+indexing_metrics = IndexingMetrics(metrics_registry) if metrics_registry else None
+search_metrics = SearchMetrics(metrics_registry) if metrics_registry else None
+
+# Search runs on its own bounded pool so DB-bound queries never block the
+# event loop and cannot starve Starlette's shared threadpool
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "8"))
+search_executor = ThreadPoolExecutor(
+    max_workers=SEARCH_WORKERS,
+    thread_name_prefix="search",
+)
+
+# Largest number of documents accepted by one POST /index request
+MAX_INDEX_BATCH = 1000
+
+# "sql" scores searches in SQLite; "memory" loads an inverted index at startup
+# and keeps it in sync with every committed indexing batch; "segment" maps the
+# read-only segments compiled into SEGMENT_DIR by `python src/cli.py`
+INDEX_BACKEND = os.getenv("INDEX_BACKEND", "sql").lower()
+if INDEX_BACKEND not in ("sql", "memory", "segment"):
+    raise ValueError(f"Unsupported INDEX_BACKEND: {INDEX_BACKEND}")
+SEGMENT_DIR = os.getenv("SEGMENT_DIR", "segments")
+
+# SQL_PRUNE_TOP_K=1 evaluates limited searches of many tokens in SQLite with
+# MaxScore pruning, which pays off once postings lists grow long. It applies
+# wherever SQLite scores searches: the sql backend, every shard, and the
+# memory backend's SQL fallback while FAST_STARTUP warms it up
+SQL_PRUNE_TOP_K = os.getenv("SQL_PRUNE_TOP_K", "0").lower() in ("1", "true", "yes")
+
+# NUMPY_SCORING=1 sums the memory backend's postings arrays in NumPy (an
+# optional dependency) instead of looping over them in Python
+NUMPY_SCORING = os.getenv("NUMPY_SCORING", "0").lower() in ("1", "true", "yes")
+if NUMPY_SCORING and INDEX_BACKEND != "memory":
+    raise ValueError("NUMPY_SCORING requires INDEX_BACKEND=memory")
+if NUMPY_SCORING and not numpy_available():
+    raise RuntimeError("NUMPY_SCORING needs numpy: pip install numpy")
+
+# SHARD_COUNT > 0 partitions documents by (document_type, document_id) over
+# that many SQLite files named by SHARD_PATH, which are written in parallel
+# and searched concurrently. Move an existing index with `python src/cli.py
+# reshard`; SQLITE_FILE is then no longer read
+shard_settings = ShardSettings.from_env()
+if shard_settings.count and INDEX_BACKEND != "sql":
+    raise ValueError("SHARD_COUNT requires INDEX_BACKEND=sql")
+index_shards: Optional[IndexShards] = (
+    IndexShards.open(shard_settings, sqlite_settings) if shard_settings.count else None
+)
+
+# "tokens" indexes every word prefix through PrefixTokenizer; "dictionary"
+# drops it and expands query words against a sorted word dictionary instead.
+# Switching modes changes the tokenizers, so reindex the documents afterwards
+PREFIX_MODE = os.getenv("PREFIX_MODE", "tokens").lower()
+if PREFIX_MODE not in ("tokens", "dictionary"):
+    raise ValueError(f"Unsupported PREFIX_MODE: {PREFIX_MODE}")
+
+# "fields" writes one entry per (token, field, tokenizer weight); "aggregated"
+# folds them into one entry per (token name, document), dropping field-level
+# detail for fewer rows and cheaper scoring. Documents are rewritten in the
+# new layout as they are reindexed
+ENTRY_LAYOUT = os.getenv("ENTRY_LAYOUT", "fields").lower()
+if ENTRY_LAYOUT not in ("fields", "aggregated"):
+    raise ValueError(f"Unsupported ENTRY_LAYOUT: {ENTRY_LAYOUT}")
+
+# Weights of the tokens the word dictionary is built from. Aggregated tokens
+# all share one weight, so there it also holds prefix and n-gram names
+WORD_TOKEN_WEIGHT = 1
+DICTIONARY_TOKEN_WEIGHTS = (
+    (WORD_TOKEN_WEIGHT, AGGREGATED_TOKEN_WEIGHT)
+    if ENTRY_LAYOUT == "aggregated"
+    else (WORD_TOKEN_WEIGHT,)
+)
+
+# Typo-tolerant search: misspelled query words also match the closest
+# indexed words, found through a trigram side index of the word dictionary
+FUZZY_SEARCH = os.getenv("FUZZY_SEARCH", "0").lower() in ("1", "true", "yes")
+
+
+def create_word_dictionary() -> Optional["TokenDictionary"]:
+    """One dictionary of indexed words serves prefix expansion and fuzzy search."""
+    if PREFIX_MODE != "dictionary" and not FUZZY_SEARCH:
+        return None
+    from backends.token_dictionary import TokenDictionary
+
+    return TokenDictionary.from_env(
+        weights=DICTIONARY_TOKEN_WEIGHTS, ngram_length=3 if FUZZY_SEARCH else 0
+    )
+
+
+# Token ids differ between shards, so each shard has its own token cache and
+# word dictionary; index None is the unsharded database
+shard_numbers = list(range(shard_settings.count)) or [None]
+token_caches = {
+    shard: token_cache if shard is None else LRUCache(token_cache.max_size)
+    for shard in shard_numbers
+}
+word_dictionaries = {shard: create_word_dictionary() for shard in shard_numbers}
+typo_correctors = {shard: None for shard in shard_numbers}
+if FUZZY_SEARCH:
+    from backends.typo_corrector import TypoCorrector
+
+    typo_correctors = {
+        shard: TypoCorrector.from_env(dictionary)
+        for shard, dictionary in word_dictionaries.items()
+    }
+
+# Set by on_startup once migrations have run
+search_backend: Optional[IndexBackendInterface] = None
+index_replicas: List[IndexBackendInterface] = []
+
+
+def get_tokenizers():
+    """Tokenizers shared by indexing and search; both must use the same set."""
+    tokenizers = [
+        WordTokenizer(weight=WORD_TOKEN_WEIGHT),
+        NGramsTokenizer(ngram_length=3, weight=1),
+    ]
+    if PREFIX_MODE == "tokens":
+        tokenizers.insert(1, PrefixTokenizer(min_prefix_length=4, weight=5))
+    return tokenizers
+
+
+def create_indexing_service(
+    session: Session, shard: Optional[int] = None
+) -> SearchIndexingService:
+    return SearchIndexingService(
+        session,
+        get_tokenizers(),
+        token_cache=token_caches[shard],
+        generation=index_generation,
+        replicas=index_replicas,
+        metrics=indexing_metrics,
+        aggregate_entries=ENTRY_LAYOUT == "aggregated",
+    )
+
+
+def create_search_service(
+    session: Session, shard: Optional[int] = None
+) -> SearchService:
+    return SearchService(
+        session,
+        get_tokenizers(),
+        result_cache=search_result_cache,
+        backend=(
+            search_backend
+            if search_backend is not None
+            else SqlIndexBackend(session, prune_top_k=SQL_PRUNE_TOP_K)
+        ),
+        token_dictionary=(
+            word_dictionaries[shard] if PREFIX_MODE == "dictionary" else None
+        ),
+        typo_corrector=typo_correctors[shard],
+        metrics=search_metrics,
+    )
+
+
+if index_shards is not None:
+    # Every shard has its own writer; one thread per shard and search worker
+    sharded_indexer = ShardedIndexingService(index_shards, create_indexing_service)
+    sharded_search = ShardedSearchService(
+        index_shards,
+        get_tokenizers(),
+        create_search_service,
+        executor=ThreadPoolExecutor(
+            max_workers=index_shards.count * SEARCH_WORKERS,
+            thread_name_prefix="shard-search",
+        ),
+        result_cache=search_result_cache,
+        metrics=search_metrics,
+    )
+    indexing_factories = (lambda _: sharded_indexer, contextlib.nullcontext)
+else:
+    indexing_factories = (create_indexing_service, lambda: Session(engine))
+
+# Held by the indexing worker while it writes a batch and by maintenance
+# while it deletes tokens or rewrites a database file
+index_write_lock = threading.Lock()
+
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "500"))
+background_indexer = BackgroundIndexer(
+    *indexing_factories,
+    max_queued_batches=int(os.getenv("INDEX_QUEUE_SIZE", "100")),
+    batch_size=INDEX_BATCH_SIZE,
+    write_lock=index_write_lock,
+)
+
+# With INGEST_JOURNAL, POST /index journals updates and group-commits them
+# (keeping the latest version of each document) instead of queueing batches
+INGEST_JOURNAL = os.getenv("INGEST_JOURNAL", "")
+INGEST_WAIT_TIMEOUT = float(os.getenv("INGEST_WAIT_TIMEOUT", "30"))
+
+
+def create_ingest_buffer() -> "IngestBuffer":
+    from services.ingest_buffer import IngestBuffer
+
+    return IngestBuffer(
+        *indexing_factories,
+        journal_path=INGEST_JOURNAL,
+        max_documents=INDEX_BATCH_SIZE,
+        max_delay_seconds=float(os.getenv("INGEST_MAX_DELAY_MS", "50")) / 1000,
+        max_pending_documents=int(os.getenv("INGEST_MAX_PENDING", "100000")),
+        fsync=os.getenv("INGEST_FSYNC", "1").lower() in ("1", "true", "yes"),
+        write_lock=index_write_lock,
+    )
+
+
+ingest_buffer: Optional["IngestBuffer"] = (
+    create_ingest_buffer() if INGEST_JOURNAL else None
+)
+
+
+def forget_tokens(shard: Optional[int], removed) -> None:
+    """Drop tokens deleted by maintenance from the caches of their database."""
+    tokens = {(name, weight): token_id for token_id, name, weight in removed}
+    for key in tokens:
+        token_caches[shard].discard(key)
+    if word_dictionaries[shard] is not None:
+        word_dictionaries[shard].remove(tokens)
+    if INDEX_BACKEND == "memory" and search_backend is not None:
+        search_backend.forget_tokens(tokens)
+    # Prefix expansion and typo correction may now pick other words
+    index_generation.bump_all()
+
+
+def create_maintenance_service(
+    shard: Optional[int] = None,
+) -> "IndexMaintenanceService":
+    from services.index_maintenance_service import (
+        IndexMaintenanceService,
+        MaintenanceSettings,
+    )
+
+    return IndexMaintenanceService(
+        engine if shard is None else index_shards.engines[shard],
+        MaintenanceSettings.from_env(),
+        write_lock=index_write_lock,
+        on_tokens_removed=functools.partial(forget_tokens, shard),
+    )
+
+
+# MAINTENANCE_INTERVAL > 0 runs MAINTENANCE_TASKS (default "gc,analyze"; also
+# "reindex" and "vacuum") on every database that many seconds apart, throttled
+# by MAINTENANCE_BATCH_SIZE and MAINTENANCE_PAUSE_MS. With SNAPSHOT_DIR every
+# run also writes a snapshot of each database there
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", "0"))
+
+
+def create_maintenance_scheduler() -> "MaintenanceScheduler":
+    from services.index_maintenance_service import (
+        MAINTENANCE_TASKS,
+        MaintenanceScheduler,
+    )
+
+    tasks = [
+        task.strip()
+        for task in os.getenv("MAINTENANCE_TASKS", "gc,analyze").split(",")
+        if task.strip()
+    ]
+    unknown_tasks = set(tasks) - set(MAINTENANCE_TASKS)
+    if unknown_tasks:
+        raise ValueError(
+            f"Unsupported MAINTENANCE_TASKS: {', '.join(sorted(unknown_tasks))}"
+        )
+    return MaintenanceScheduler(
+        [create_maintenance_service(shard) for shard in shard_numbers],
+        MAINTENANCE_INTERVAL,
+        tasks=tasks,
+        snapshot_dir=os.getenv("SNAPSHOT_DIR") or None,
+    )
+
+
+maintenance_scheduler: Optional["MaintenanceScheduler"] = (
+    create_maintenance_scheduler() if MAINTENANCE_INTERVAL > 0 else None
+)
+
+# FAST_STARTUP=1 starts serving before the caches are warm: the memory index,
+# word dictionaries and token cache (TOKEN_CACHE_WARMUP most used tokens) are
+# loaded on a background thread. Searches score in SQLite until the memory
+# index is loaded, and GET /ready answers 503 until warm-up has finished
+FAST_STARTUP = os.getenv("FAST_STARTUP", "0").lower() in ("1", "true", "yes")
+TOKEN_CACHE_WARMUP = int(os.getenv("TOKEN_CACHE_WARMUP", "0"))
+warmed_up = threading.Event()
+warm_up_error: Optional[str] = None
+
+if metrics_registry is not None:
+    metrics_registry.gauge(
+        "index_queued_batches",
+        "Batches waiting in the background indexing queue",
+        lambda: background_indexer.stats()["queued_batches"],
+    )
+    if ingest_buffer is not None:
+        metrics_registry.gauge(
+            "ingest_pending_documents",
+            "Documents waiting in the ingest buffer for the next group commit",
+            lambda: ingest_buffer.stats()["pending_documents"],
+        )
+    metrics_registry.gauge(
+        "search_cache_entries",
+        "Entries in the search result cache",
+        lambda: search_result_cache.stats()["entries"],
+    )
+    metrics_registry.gauge(
+        "search_cache_hit_rate",
+        "Hit rate of the search result cache",
+        lambda: search_result_cache.stats()["hit_rate"],
+    )
+
+
+def run_search(document_type: int, query: str, limit: int):
+    if index_shards is not None:
+        return sharded_search.search(document_type, query, limit=limit)
+    with Session(engine) as session:
+        service = create_search_service(session)
+        return service.search(document_type, query, limit=limit)
+
+
+def run_search_many(document_type: int, queries: List[str], limit: int):
+    if index_shards is not None:
+        return sharded_search.search_many(document_type, queries, limit=limit)
+    with Session(engine) as session:
+        service = create_search_service(session)
+        return service.search_many(document_type, queries, limit=limit)
+
+
 app = FastAPI()
 
 
+def warm_up() -> None:
+    """Load the caches searches and indexing rely on, then mark the app ready."""
+    global search_backend
+    started = time.perf_counter()
+    if INDEX_BACKEND == "memory":
+        from backends.memory_index_backend import MemoryIndexBackend
+
+        # Writers wait on the lock, so no batch commits between reading the
+        # tables and registering the replica that receives later batches
+        with index_write_lock, Session(engine) as session:
+            backend = MemoryIndexBackend.load(session, numpy_scoring=NUMPY_SCORING)
+            index_replicas.append(backend)
+        search_backend = backend
+    for shard in shard_numbers:
+        shard_engine = engine if shard is None else index_shards.engines[shard]
+        if word_dictionaries[shard] is not None:
+            with Session(shard_engine) as session:
+                word_dictionaries[shard].refresh(session)
+        if TOKEN_CACHE_WARMUP > 0:
+            # Under the lock: maintenance must not delete a token between
+            # reading it and caching it
+            with index_write_lock, Session(shard_engine) as session:
+                create_indexing_service(session, shard).warm_up_token_cache(
+                    TOKEN_CACHE_WARMUP
+                )
+    warmed_up.set()
+    logger.info("Caches warmed up in %.2fs", time.perf_counter() - started)
+
+
+def warm_up_in_background() -> None:
+    global warm_up_error
+    try:
+        warm_up()
+    except Exception as exc:
+        # Stays unready, so the orchestrator replaces the instance
+        logger.exception("Warming up caches failed")
+        warm_up_error = str(exc)
+
+
 @app.on_event("startup")
 def on_startup():
+    global search_backend
     create_db_and_tables()
+    if INDEX_BACKEND == "segment":
+        from backends.segment_index_backend import SegmentIndexBackend
+
+        search_backend = SegmentIndexBackend.open(SEGMENT_DIR)
+    if index_shards is not None:
+        versions = index_shards.migrate()
+        logger.info("Index shards are at schema versions %s", versions)
+    if not FAST_STARTUP:
+        # Loaded before the indexer starts so no committed batch is missed
+        warm_up()
+    if ingest_buffer is not None:
+        # Replays updates journaled but not committed before the last exit
+        ingest_buffer.start()
+    else:
+        background_indexer.start()
+    if maintenance_scheduler is not None:
+        maintenance_scheduler.start()
+    if FAST_STARTUP:
+        threading.Thread(
+            target=warm_up_in_background, name="warm-up", daemon=True
+        ).start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    if maintenance_scheduler is not None:
+        maintenance_scheduler.stop()
+    # Apply what was already accepted before the process exits
+    if ingest_buffer is not None:
+        ingest_buffer.stop()
+    background_indexer.stop()
+    search_executor.shutdown(wait=True)
+    if index_shards is not None:
+        sharded_search.executor.shutdown(wait=True)
+        sharded_indexer.executor.shutdown(wait=True)
+        index_shards.dispose()
+    if INDEX_BACKEND == "segment" and search_backend is not None:
+        search_backend.close()
 
 
 @app.get("/")
@@ -53,6 +502,105 @@ def read_root():
     return {"Hello": "World"}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once caches are warm; `/` only shows the process is up."""
+    if not warmed_up.is_set():
+        detail = f"Warm-up failed: {warm_up_error}" if warm_up_error else "Warming up"
+        raise HTTPException(status_code=503, detail=detail)
+    return {"ready": True}
+
+
+@app.get("/search")
+async def search(
+    document_type: int = Query(..., ge=0),
+    q: str = Query(..., min_length=1, max_length=1000),
+    limit: int = Query(20, ge=1, le=1000),
+):
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(
+        search_executor, run_search, document_type, q, limit
+    )
+    return {"results": [result.as_dict() for result in results]}
+
+
+@app.post("/search/batch")
+async def search_batch(request: SearchBatchRequest):
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(
+        search_executor,
+        run_search_many,
+        request.document_type,
+        request.queries,
+        request.limit,
+    )
+    return {"results": [[result.as_dict() for result in found] for found in results]}
+
+
+@app.post("/index", status_code=202)
+async def index_documents(
+    documents: List[IndexableDocument],
+    response: Response,
+    wait: bool = Query(False, description="Return once the documents are searchable"),
+):
+    if len(documents) > MAX_INDEX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_INDEX_BATCH} documents per request",
+        )
+    if ingest_buffer is None:
+        if wait:
+            raise HTTPException(status_code=400, detail="wait needs INGEST_JOURNAL")
+        try:
+            batch_id = background_indexer.submit(documents)
+        except IndexQueueFull:
+            raise HTTPException(status_code=503, detail="Indexing queue is full")
+        return {"batch_id": batch_id, "accepted": len(documents)}
+
+    # Journal writes are fsynced, so keep them off the event loop
+    loop = asyncio.get_running_loop()
+    try:
+        sequence = await loop.run_in_executor(None, ingest_buffer.submit, documents)
+    except IndexQueueFull:
+        raise HTTPException(status_code=503, detail="Ingest buffer is full")
+    result = {"batch_id": sequence, "accepted": len(documents)}
+    if wait:
+        result["visible"] = await loop.run_in_executor(
+            None, ingest_buffer.wait_visible, sequence, INGEST_WAIT_TIMEOUT
+        )
+        if result["visible"]:
+            response.status_code = 200
+    return result
+
+
+@app.get("/index/stats")
+async def index_stats():
+    if ingest_buffer is not None:
+        return ingest_buffer.stats()
+    return background_indexer.stats()
+
+
+@app.get("/index/maintenance")
+def index_maintenance_stats():
+    if maintenance_scheduler is None:
+        raise HTTPException(status_code=404, detail="Maintenance is not scheduled")
+    return maintenance_scheduler.stats()
+
+
+@app.get("/search/cache/stats")
+def search_cache_stats():
+    return search_result_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    if metrics_registry is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.post("/search/tokenize")
 def tokenize_text(text: str = Query(..., min_length=1, max_length=1000)):
     tokenizer = WordTokenizer(weight=1)
@@ -82,6 +630,8 @@ def tokenize_prefixes(
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     logger.info("Starting webserver...")
     uvicorn.run(
         app,
@@ -1,13 +1,28 @@
 from typing import Annotated
 
 from fastapi import Depends, FastAPI, HTTPException, Query
+from sqlalchemy import Index
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
 
 class IndexEntry(SQLModel, table=True):
+    __table_args__ = (
+        # Covers the search query: filter by type and token, read document and
+        # weight straight from the index without touching the table
+        Index(
+            "ix_indexentry_search",
+            "document_type",
+            "token_id",
+            "document_id",
+            "weight",
+        ),
+        # Removing a document's entries before reindexing it
+        Index("ix_indexentry_document", "document_type", "document_id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
-    token_id: int = Field(index=True)
-    document_type: int = Field(index=True)
-    field_id: int = Field(index=True)
-    document_id: int = Field(index=True)
-    weight: int = Field(index=True)
+    token_id: int = Field()
+    document_type: int = Field()
+    field_id: int = Field()
+    document_id: int = Field()
+    weight: int = Field()
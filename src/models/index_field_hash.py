@@ -0,0 +1,27 @@
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class IndexFieldHash(SQLModel, table=True):
+    """Content hash of one indexed field of a document.
+
+    Lets the indexer skip fields whose text, weight and tokenizers are the
+    same as when they were last indexed.
+    """
+
+    __table_args__ = (
+        # One row per field; also serves lookups of a whole document
+        Index(
+            "ix_indexfieldhash_document_field",
+            "document_type",
+            "document_id",
+            "field_id",
+            unique=True,
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    document_type: int = Field()
+    document_id: int = Field()
+    field_id: int = Field()
+    content_hash: str = Field()
@@ -1,10 +1,19 @@
 from typing import Annotated
 
 from fastapi import Depends, FastAPI, HTTPException, Query
+from sqlalchemy import Index
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
 
 class IndexToken(SQLModel, table=True):
+    __table_args__ = (
+        # One row per (name, weight); also serves lookups by name alone
+        Index("ix_indextoken_name_weight", "name", "weight", unique=True),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     name: str = Field()
     weight: int = Field()
+    # Upper bound of this token's summed weight in any one document; raised
+    # by the indexer, never lowered, and used to prune top-k search
+    max_weight: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
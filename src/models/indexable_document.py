@@ -0,0 +1,27 @@
+from typing import Dict
+
+from pydantic import BaseModel, Field
+
+from interfaces.indexable_document_interface import IndexableDocumentInterface
+
+
+class IndexableDocument(BaseModel, IndexableDocumentInterface):
+    """Plain document accepted by the indexing API.
+
+    `fields` maps field ids to their text and `weights` maps the same ids to
+    the field weight used when scoring.
+    """
+
+    document_type: int = Field(ge=0)
+    document_id: int = Field(ge=0)
+    fields: Dict[int, str] = Field(default_factory=dict)
+    weights: Dict[int, int] = Field(default_factory=dict)
+
+    def get_document_id(self) -> int:
+        return self.document_id
+
+    def get_document_type(self) -> int:
+        return self.document_type
+
+    def get_indexable_fields(self) -> Dict[str, Dict[int, object]]:
+        return {"fields": self.fields, "weights": self.weights}
@@ -0,0 +1,16 @@
+from typing import Annotated, List
+
+from pydantic import BaseModel, Field
+
+# Largest number of queries accepted by one POST /search/batch request
+MAX_BATCH_QUERIES = 100
+
+
+class SearchBatchRequest(BaseModel):
+    """Body of `POST /search/batch`: several queries over one document type."""
+
+    document_type: int = Field(ge=0)
+    queries: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(
+        min_length=1, max_length=MAX_BATCH_QUERIES
+    )
+    limit: int = Field(20, ge=1, le=1000)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from interfaces.indexable_document_interface import IndexableDocumentInterface
+from services.search_indexing_service import SearchIndexingService
+from sqlmodel import Session
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Queue item that tells the worker to exit after draining earlier batches
+_STOP = object()
+
+
+class IndexQueueFull(Exception):
+    """Raised by `BackgroundIndexer.submit` when the queue is at capacity."""
+
+
+class BackgroundIndexer:
+    """Apply indexing batches on a dedicated worker thread.
+
+    Request handlers `submit` batches and return immediately; the worker
+    drains the bounded queue and writes each batch through
+    `SearchIndexingService.index_documents`, so a long reindex never occupies
+    the event loop or the request threadpool. A full queue rejects new
+    batches instead of growing without bound.
+
+    Batches are written while holding `write_lock`; pass the same lock to
+    `IndexMaintenanceService` so maintenance never interleaves with a batch.
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[Session], SearchIndexingService],
+        session_factory: Callable[[], Session],
+        max_queued_batches: int = 100,
+        batch_size: int = 500,
+        write_lock: Optional[threading.Lock] = None,
+    ) -> None:
+        self.service_factory = service_factory
+        self.session_factory = session_factory
+        self.batch_size = int(batch_size)
+        self.write_lock = write_lock or threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(
+            maxsize=max(1, max_queued_batches)
+        )
+        self._batch_ids = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.processed_batches = 0
+        self.processed_documents = 0
+        self.unchanged_documents = 0
+        self.failed_batches = 0
+        self.last_completed_batch = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="background-indexer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Finish the queued batches, then stop the worker."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, documents: Sequence[IndexableDocumentInterface]) -> int:
+        """Queue a batch and return its id; raise `IndexQueueFull` when full."""
+        batch_id = next(self._batch_ids)
+        try:
+            self._queue.put_nowait((batch_id, list(documents)))
+        except queue.Full:
+            raise IndexQueueFull("Indexing queue is full") from None
+        return batch_id
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued_batches": self._queue.qsize(),
+                "max_queued_batches": self._queue.maxsize,
+                "processed_batches": self.processed_batches,
+                "processed_documents": self.processed_documents,
+                "unchanged_documents": self.unchanged_documents,
+                "failed_batches": self.failed_batches,
+                "last_completed_batch": self.last_completed_batch,
+                "last_error": self.last_error,
+            }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch_id, documents = item
+            self._apply(batch_id, documents)
+
+    def _apply(
+        self, batch_id: int, documents: List[IndexableDocumentInterface]
+    ) -> None:
+        try:
+            with self.write_lock, self.session_factory() as session:
+                stats = self.service_factory(session).index_documents(
+                    documents, batch_size=self.batch_size
+                )
+        except Exception as exc:
+            logger.exception("Indexing batch %s failed", batch_id)
+            with self._lock:
+                self.failed_batches += 1
+                self.last_completed_batch = batch_id
+                self.last_error = f"batch {batch_id}: {exc}"
+            return
+
+        with self._lock:
+            self.processed_batches += 1
+            self.processed_documents += stats.documents
+            self.unchanged_documents += stats.unchanged
+            self.last_completed_batch = batch_id
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# (id, name, weight) of a token removed by `collect_orphan_tokens`
+RemovedToken = Tuple[int, str, int]
+
+# Tasks of `run`, in the order they are applied
+MAINTENANCE_TASKS = ("gc", "reindex", "vacuum", "analyze")
+
+INDEX_TABLES = ("indextoken", "indexentry", "indexfieldhash")
+
+# Deletes the tokens of one id range that no entry references. The recursive
+# CTE walks the distinct document types through the search index (one seek
+# per type), so the NOT IN probe is a covering range scan per type instead of
+# a scan of `indexentry`
+_DELETE_ORPHAN_TOKENS = """
+DELETE FROM indextoken
+WHERE id >= :low AND id < :high AND id NOT IN (
+    SELECT e.token_id FROM indexentry e
+    WHERE e.document_type IN (
+        WITH RECURSIVE types(document_type) AS (
+            SELECT MIN(document_type) FROM indexentry
+            UNION ALL
+            SELECT (
+                SELECT MIN(document_type) FROM indexentry
+                WHERE document_type > types.document_type
+            ) FROM types WHERE types.document_type IS NOT NULL
+        )
+        SELECT document_type FROM types WHERE document_type IS NOT NULL
+    )
+    AND e.token_id >= :low AND e.token_id < :high
+)
+RETURNING id, name, weight
+"""
+
+
+@dataclass
+class MaintenanceSettings:
+    """Throttling of maintenance work so it does not starve live search.
+
+    - `batch_size` token ids are checked per garbage collection transaction
+    - `pause_seconds` is slept between those transactions and between backup
+      steps of `backup_pages` pages
+    - `analysis_limit` bounds the rows ANALYZE samples per index
+    """
+
+    batch_size: int = 1000
+    pause_seconds: float = 0.05
+    backup_pages: int = 1024
+    analysis_limit: int = 1000
+
+    @classmethod
+    def from_env(cls) -> "MaintenanceSettings":
+        defaults = cls()
+        return cls(
+            batch_size=int(os.getenv("MAINTENANCE_BATCH_SIZE", defaults.batch_size)),
+            pause_seconds=float(
+                os.getenv("MAINTENANCE_PAUSE_MS", defaults.pause_seconds * 1000)
+            )
+            / 1000,
+            backup_pages=int(os.getenv("SNAPSHOT_PAGES", defaults.backup_pages)),
+            analysis_limit=int(
+                os.getenv("MAINTENANCE_ANALYSIS_LIMIT", defaults.analysis_limit)
+            ),
+        )
+
+
+@dataclass
+class MaintenanceReport:
+    database_file: str = ""
+    tasks: List[str] = field(default_factory=list)
+    removed_tokens: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    free_pages_before: int = 0
+    free_pages_after: int = 0
+    elapsed_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class IndexMaintenanceService:
+    """Keep one index database compact: token GC, rebuilds, VACUUM, snapshots.
+
+    Reindexing deletes and reinserts entries, which fragments `indexentry`
+    and leaves tokens no entry references any more. The tasks of `run`:
+    - `gc` deletes those orphan tokens, one id range per short write
+      transaction with a pause in between
+    - `reindex` rebuilds the indexes of the index tables
+    - `vacuum` rewrites the file, dropping free pages and defragmenting
+      tables; it holds the write lock for its whole duration
+    - `analyze` refreshes the planner statistics, sampling at most
+      `analysis_limit` rows per index
+
+    `snapshot` copies the database through the SQLite backup API while it
+    stays online. Maintenance uses its own connections in autocommit mode;
+    searches keep reading in WAL mode throughout.
+
+    Writers of the same process pass their `write_lock`: it is held during
+    every GC transaction, reindex and vacuum, so indexing waits for them
+    instead of running into the busy timeout, and so token caches can be
+    updated through `on_tokens_removed` before the next batch resolves a
+    removed token. Another process indexing into the same file keeps its
+    token cache and must not run while tokens are collected.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        settings: Optional[MaintenanceSettings] = None,
+        write_lock: Optional[threading.Lock] = None,
+        on_tokens_removed: Optional[Callable[[List[RemovedToken]], None]] = None,
+    ) -> None:
+        self.database_file = engine.url.database
+        self.settings = settings or MaintenanceSettings()
+        self.write_lock = write_lock or threading.Lock()
+        self.on_tokens_removed = on_tokens_removed
+
+    def run(self, tasks: Sequence[str] = MAINTENANCE_TASKS) -> MaintenanceReport:
+        """Apply `tasks` (a subset of `MAINTENANCE_TASKS`) and report the effect."""
+        unknown = set(tasks) - set(MAINTENANCE_TASKS)
+        if unknown:
+            raise ValueError(f"Unknown maintenance tasks: {', '.join(sorted(unknown))}")
+
+        started = time.perf_counter()
+        report = MaintenanceReport(
+            database_file=self.database_file,
+            tasks=[task for task in MAINTENANCE_TASKS if task in tasks],
+        )
+        report.bytes_before, report.free_pages_before = self._storage()
+        for task in report.tasks:
+            task_started = time.perf_counter()
+            if task == "gc":
+                report.removed_tokens = self.collect_orphan_tokens()
+            elif task == "reindex":
+                self.rebuild_indexes()
+            elif task == "vacuum":
+                self.vacuum()
+            else:
+                self.analyze()
+            logger.info(
+                "Maintenance %s of %s took %.2fs",
+                task,
+                self.database_file,
+                time.perf_counter() - task_started,
+            )
+        report.bytes_after, report.free_pages_after = self._storage()
+        report.elapsed_seconds = time.perf_counter() - started
+        return report
+
+    def collect_orphan_tokens(self) -> int:
+        """Delete tokens no entry references; return how many were removed."""
+        with self._connect() as connection:
+            highest = connection.execute("SELECT MAX(id) FROM indextoken").fetchone()[0]
+            if highest is None:
+                return 0
+            lowest = connection.execute("SELECT MIN(id) FROM indextoken").fetchone()[0]
+
+            removed = 0
+            batch_size = max(1, self.settings.batch_size)
+            # The newest token always stays: SQLite hands the largest id + 1
+            # to the next row, and token dictionaries load ids above the
+            # largest they have seen, so the largest id must never be reused
+            for low in range(lowest, highest, batch_size):
+                high = min(low + batch_size, highest)
+                with self.write_lock:
+                    connection.execute("BEGIN IMMEDIATE")
+                    try:
+                        rows = connection.execute(
+                            _DELETE_ORPHAN_TOKENS, {"low": low, "high": high}
+                        ).fetchall()
+                        connection.execute("COMMIT")
+                    except BaseException:
+                        connection.execute("ROLLBACK")
+                        raise
+                    if rows and self.on_tokens_removed is not None:
+                        self.on_tokens_removed(
+                            [
+                                (int(id_), name, int(weight))
+                                for id_, name, weight in rows
+                            ]
+                        )
+                removed += len(rows)
+                self._pause()
+        if removed:
+            logger.info("Removed %s orphan tokens from %s", removed, self.database_file)
+        return removed
+
+    def rebuild_indexes(self) -> None:
+        """Rebuild the indexes of the index tables from their rows."""
+        with self._connect() as connection, self.write_lock:
+            for table in INDEX_TABLES:
+                connection.execute(f"REINDEX {table}")
+
+    def vacuum(self) -> None:
+        """Rewrite the database file without free pages or fragmentation."""
+        with self._connect() as connection, self.write_lock:
+            # The rewritten copy goes to a temporary file: with the pool's
+            # temp_store=MEMORY it would have to fit in memory
+            connection.execute("PRAGMA temp_store=FILE")
+            connection.execute("VACUUM")
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def analyze(self) -> None:
+        """Refresh the statistics the query planner picks indexes with."""
+        with self._connect() as connection:
+            connection.execute(
+                f"PRAGMA analysis_limit={int(self.settings.analysis_limit)}"
+            )
+            connection.execute("ANALYZE")
+
+    def snapshot(self, path: str) -> int:
+        """Copy a consistent snapshot of the database to `path`; return its size.
+
+        The copy is written to `path.tmp` and renamed into place, so `path` is
+        always a complete database. A read transaction is held for the whole
+        copy: in WAL mode it pins the snapshot, so commits made meanwhile do
+        not restart the backup, however slowly it is throttled.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial = f"{path}.tmp"
+        if os.path.exists(partial):
+            os.remove(partial)
+
+        with self._connect() as source:
+            target = sqlite3.connect(partial)
+            try:
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                source.backup(
+                    target,
+                    pages=max(1, self.settings.backup_pages),
+                    progress=lambda status, remaining, total: self._pause(),
+                )
+                source.execute("COMMIT")
+                # A single file, readable without its -wal companion
+                target.execute("PRAGMA journal_mode=DELETE")
+            except BaseException:
+                target.close()
+                os.remove(partial)
+                raise
+            target.close()
+        os.replace(partial, path)
+        return os.path.getsize(path)
+
+    def _storage(self) -> Tuple[int, int]:
+        """Size of the database file and its WAL in bytes, and free pages."""
+        with self._connect() as connection:
+            free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        size = 0
+        for path in (self.database_file, f"{self.database_file}-wal"):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size, int(free_pages)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.database_file, isolation_level=None, check_same_thread=False
+        )
+        try:
+            connection.execute("PRAGMA busy_timeout=30000")
+            yield connection
+        finally:
+            connection.close()
+
+    def _pause(self) -> None:
+        if self.settings.pause_seconds > 0:
+            time.sleep(self.settings.pause_seconds)
+
+
+class MaintenanceScheduler:
+    """Run maintenance on a background thread every `interval_seconds`.
+
+    Each run applies `tasks` to every service in turn and, with
+    `snapshot_dir`, then snapshots every database into that directory under
+    its file name. A failing run is logged and retried at the next interval.
+    """
+
+    def __init__(
+        self,
+        services: Sequence[IndexMaintenanceService],
+        interval_seconds: float,
+        tasks: Sequence[str] = ("gc", "analyze"),
+        snapshot_dir: Optional[str] = None,
+    ) -> None:
+        self.services = list(services)
+        self.interval_seconds = float(interval_seconds)
+        self.tasks = tuple(tasks)
+        self.snapshot_dir = snapshot_dir
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.failed_runs = 0
+        self.removed_tokens = 0
+        self.last_reports: List[Dict[str, Any]] = []
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="index-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the thread; a run in progress is finished first."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def run_once(self) -> List[MaintenanceReport]:
+        reports = []
+        for service in self.services:
+            reports.append(service.run(self.tasks))
+            if self.snapshot_dir:
+                service.snapshot(
+                    os.path.join(
+                        self.snapshot_dir, os.path.basename(service.database_file)
+                    )
+                )
+        return reports
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "interval_seconds": self.interval_seconds,
+                "tasks": list(self.tasks),
+                "runs": self.runs,
+                "failed_runs": self.failed_runs,
+                "removed_tokens": self.removed_tokens,
+                "last_reports": self.last_reports,
+                "last_error": self.last_error,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                reports = self.run_once()
+            except Exception as exc:
+                logger.exception("Index maintenance failed")
+                with self._lock:
+                    self.failed_runs += 1
+                    self.last_error = str(exc)
+                continue
+            with self._lock:
+                self.runs += 1
+                self.removed_tokens += sum(report.removed_tokens for report in reports)
+                self.last_reports = [report.as_dict() for report in reports]
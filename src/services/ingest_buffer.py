@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import contextlib
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from interfaces.index_backend_interface import DocumentKey
+from interfaces.indexable_document_interface import IndexableDocumentInterface
+from models.indexable_document import IndexableDocument
+from services.background_indexer import IndexQueueFull
+from services.search_indexing_service import SearchIndexingService, prepare_document
+from sqlmodel import Session
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class IngestBuffer:
+    """Coalesce single-document updates into journaled group commits.
+
+    `submit` appends the documents to an append-only journal (fsynced unless
+    `fsync` is off) and keeps only the latest version of each (document
+    type, id) in memory. A flush thread writes the pending documents through
+    `SearchIndexingService.index_documents` in one transaction once
+    `max_documents` are pending or the oldest has waited `max_delay_seconds`,
+    so a stream of tiny updates costs one commit per group instead of one
+    per update, and superseded versions are never written.
+
+    Each flush seals the current journal file; sealed files are deleted once
+    their documents are committed. `start` replays the sealed and current
+    journal files left by a crash, so an accepted update survives a restart.
+
+    `submit` returns a sequence number; `wait_visible` blocks until every
+    update up to it is committed and therefore searchable (read-your-writes),
+    and asks for an immediate flush instead of waiting out the delay.
+
+    Flushes hold `write_lock`, like `BackgroundIndexer` batches.
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[Session], SearchIndexingService],
+        session_factory: Callable[[], Session],
+        journal_path: str,
+        max_documents: int = 500,
+        max_delay_seconds: float = 0.05,
+        max_pending_documents: int = 100_000,
+        fsync: bool = True,
+        write_lock: Optional[threading.Lock] = None,
+    ) -> None:
+        self.service_factory = service_factory
+        self.session_factory = session_factory
+        self.journal_path = journal_path
+        self.max_documents = max(1, int(max_documents))
+        self.max_delay_seconds = max(0.0, float(max_delay_seconds))
+        self.max_pending_documents = max(1, int(max_pending_documents))
+        self.fsync = fsync
+        self.write_lock = write_lock or threading.Lock()
+
+        self._changed = threading.Condition()
+        self._pending: Dict[DocumentKey, IndexableDocumentInterface] = {}
+        self._oldest_pending_at = 0.0
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        self._journal_records = 0
+        self._sealed: List[str] = []
+        self.submitted_sequence = 0
+        self.visible_sequence = 0
+        self.flushes = 0
+        self.flushed_documents = 0
+        self.superseded_documents = 0
+        self.failed_flushes = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Replay the journal left by the previous run, then start flushing."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._changed:
+            self._replay()
+            self._stopping = False
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(
+            target=self._run, name="ingest-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush every pending document, then stop the flush thread."""
+        if self._thread is None:
+            return
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+        with self._changed:
+            self._journal.close()
+            self._journal = None
+
+    def submit(self, documents: Sequence[IndexableDocumentInterface]) -> int:
+        """Journal documents and queue them; return their sequence number.
+
+        Raise `IndexQueueFull` while too many documents are pending.
+        """
+        lines = []
+        for document in documents:
+            document_type, document_id, fields = prepare_document(document)
+            lines.append((document_type, document_id, fields, document))
+
+        with self._changed:
+            if self._journal is None:
+                raise RuntimeError("IngestBuffer is not started")
+            if len(self._pending) + len(lines) > self.max_pending_documents:
+                raise IndexQueueFull("Ingest buffer is full")
+            sequence = self.submitted_sequence + 1
+            self._journal.write(
+                "".join(
+                    journal_line(sequence, document_type, document_id, fields)
+                    for document_type, document_id, fields, _ in lines
+                )
+            )
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._journal_records += len(lines)
+            self.submitted_sequence = sequence
+
+            if not self._pending:
+                self._oldest_pending_at = time.monotonic()
+            for document_type, document_id, _, document in lines:
+                key = (document_type, document_id)
+                if self._pending.pop(key, None) is not None:
+                    self.superseded_documents += 1
+                self._pending[key] = document
+            self._changed.notify_all()
+        return sequence
+
+    def wait_visible(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """Wait until updates up to `sequence` are committed; False on timeout."""
+        with self._changed:
+            if self.visible_sequence < sequence:
+                self._flush_requested = True
+                self._changed.notify_all()
+            return self._changed.wait_for(
+                lambda: self.visible_sequence >= sequence, timeout
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._changed:
+            return {
+                "pending_documents": len(self._pending),
+                "max_pending_documents": self.max_pending_documents,
+                "submitted_sequence": self.submitted_sequence,
+                "visible_sequence": self.visible_sequence,
+                "flushes": self.flushes,
+                "flushed_documents": self.flushed_documents,
+                "superseded_documents": self.superseded_documents,
+                "failed_flushes": self.failed_flushes,
+                "sealed_journals": len(self._sealed),
+                "last_error": self.last_error,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._changed:
+                while not self._flush_due():
+                    self._changed.wait(self._time_to_flush())
+                if not self._pending:
+                    return
+                documents = self._pending
+                self._pending = {}
+                self._flush_requested = False
+                sequence = self.submitted_sequence
+                self._seal_journal()
+                sealed = list(self._sealed)
+
+            try:
+                self._write(list(documents.values()))
+            except Exception as exc:
+                logger.exception("Flushing %s documents failed", len(documents))
+                self._requeue(documents, exc)
+                if self._stopping:
+                    # The journal still holds them for the next start
+                    return
+                # Back off instead of retrying a failing database in a loop
+                time.sleep(max(self.max_delay_seconds, 0.1))
+                continue
+
+            for path in sealed:
+                # Cleanup must not stop the flush loop
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+            with self._changed:
+                self._sealed = [path for path in self._sealed if path not in sealed]
+                self.visible_sequence = max(self.visible_sequence, sequence)
+                self.flushes += 1
+                self.flushed_documents += len(documents)
+                self._changed.notify_all()
+
+    def _flush_due(self) -> bool:
+        if not self._pending:
+            return self._stopping
+        return (
+            self._stopping
+            or self._flush_requested
+            or len(self._pending) >= self.max_documents
+            or time.monotonic() - self._oldest_pending_at >= self.max_delay_seconds
+        )
+
+    def _time_to_flush(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        waited = time.monotonic() - self._oldest_pending_at
+        return max(0.0, self.max_delay_seconds - waited)
+
+    def _write(self, documents: List[IndexableDocumentInterface]) -> None:
+        with self.write_lock, self.session_factory() as session:
+            self.service_factory(session).index_documents(
+                documents, batch_size=len(documents)
+            )
+
+    def _requeue(
+        self, documents: Dict[DocumentKey, IndexableDocumentInterface], exc
+    ) -> None:
+        """Put back the documents of a failed flush unless updated since."""
+        with self._changed:
+            requeued = dict(documents)
+            requeued.update(self._pending)
+            if requeued and not self._pending:
+                self._oldest_pending_at = time.monotonic()
+            self._pending = requeued
+            self.failed_flushes += 1
+            self.last_error = str(exc)
+
+    def _seal_journal(self) -> None:
+        """Close the current journal file and start a new one."""
+        if not self._journal_records:
+            return
+        self._journal.close()
+        sealed = f"{self.journal_path}.{self.submitted_sequence:012d}"
+        os.replace(self.journal_path, sealed)
+        self._sealed.append(sealed)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_records = 0
+
+    def _replay(self) -> None:
+        """Load the journal files of the previous run into the pending set."""
+        paths = sorted(glob.glob(glob.escape(self.journal_path) + ".*"))
+        if os.path.exists(self.journal_path):
+            paths.append(self.journal_path)
+        replayed = 0
+        live_records = 0
+        for path in paths:
+            with open(path, encoding="utf-8") as journal:
+                for number, line in enumerate(journal, 1):
+                    try:
+                        sequence, document = parse_journal_line(line)
+                    except (ValueError, KeyError, TypeError):
+                        # A crash can leave the last line half written
+                        logger.warning("Skipping bad journal line %s:%s", path, number)
+                        continue
+                    key = (document.document_type, document.document_id)
+                    self._pending.pop(key, None)
+                    self._pending[key] = document
+                    self.submitted_sequence = max(self.submitted_sequence, sequence)
+                    replayed += 1
+                    if path == self.journal_path:
+                        live_records += 1
+        if os.path.exists(self.journal_path):
+            paths.remove(self.journal_path)
+            if live_records:
+                # Sealed under the largest sequence, after every older file;
+                # never onto an existing sealed file, the only copy of its
+                # updates
+                sequence = self.submitted_sequence
+                while f"{self.journal_path}.{sequence:012d}" in paths:
+                    sequence += 1
+                sealed = f"{self.journal_path}.{sequence:012d}"
+                os.replace(self.journal_path, sealed)
+                paths.append(sealed)
+            else:
+                # Left empty by a crash between sealing and committing
+                os.remove(self.journal_path)
+        self._sealed = list(dict.fromkeys(paths))
+        # visible_sequence stays behind: replayed updates become visible once
+        # the first flush commits them
+        if self._pending:
+            self._oldest_pending_at = time.monotonic()
+            logger.info(
+                "Replaying %s journaled updates of %s documents",
+                replayed,
+                len(self._pending),
+            )
+
+
+def journal_line(sequence: int, document_type: int, document_id: int, fields) -> str:
+    """One journal record: a document reduced by `prepare_document`."""
+    return (
+        json.dumps(
+            {
+                "sequence": sequence,
+                "document_type": document_type,
+                "document_id": document_id,
+                "fields": [list(field) for field in fields],
+            },
+            separators=(",", ":"),
+        )
+        + "\n"
+    )
+
+
+def parse_journal_line(line: str):
+    """Return the sequence and the document of a journal record."""
+    record = json.loads(line)
+    fields = {int(field_id): content for field_id, _, content in record["fields"]}
+    weights = {int(field_id): int(weight) for field_id, weight, _ in record["fields"]}
+    document = IndexableDocument(
+        document_type=int(record["document_type"]),
+        document_id=int(record["document_id"]),
+        fields=fields,
+        weights=weights,
+    )
+    return int(record["sequence"]), document
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from typing import Callable, List, Tuple
+
+from models.index_entry import IndexEntry
+from models.index_field_hash import IndexFieldHash
+from models.index_token import IndexToken
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Indexes created by `Field(index=True)` before schema version 1
+LEGACY_ENTRY_INDEXES = (
+    "ix_indexentry_token_id",
+    "ix_indexentry_document_type",
+    "ix_indexentry_field_id",
+    "ix_indexentry_document_id",
+    "ix_indexentry_weight",
+)
+
+
+def _migrate_to_composite_indexes(connection: Connection) -> None:
+    """Version 1: unique (name, weight) tokens and composite entry indexes."""
+    # Duplicate tokens would break the unique index: point entries at the
+    # oldest copy of each (name, weight), then drop the other copies
+    connection.execute(
+        text(
+            "UPDATE indexentry SET token_id = ("
+            " SELECT MIN(t2.id) FROM indextoken t1"
+            " JOIN indextoken t2 ON t2.name = t1.name AND t2.weight = t1.weight"
+            " WHERE t1.id = indexentry.token_id"
+            ") WHERE token_id NOT IN ("
+            " SELECT MIN(id) FROM indextoken GROUP BY name, weight"
+            ")"
+        )
+    )
+    connection.execute(
+        text(
+            "DELETE FROM indextoken WHERE id NOT IN ("
+            " SELECT MIN(id) FROM indextoken GROUP BY name, weight"
+            ")"
+        )
+    )
+
+    for name in LEGACY_ENTRY_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    for index in (*IndexToken.__table__.indexes, *IndexEntry.__table__.indexes):
+        index.create(connection, checkfirst=True)
+
+    connection.execute(text("ANALYZE"))
+
+
+def _add_token_max_weight(connection: Connection) -> None:
+    """Version 2: per-token score upper bound for top-k pruning."""
+    columns = {
+        column["name"] for column in inspect(connection).get_columns("indextoken")
+    }
+    if "max_weight" not in columns:
+        connection.execute(
+            text(
+                "ALTER TABLE indextoken"
+                " ADD COLUMN max_weight INTEGER NOT NULL DEFAULT 0"
+            )
+        )
+
+    # Backfill from the largest per-document sum; a temp table keeps this to
+    # one pass over `indexentry` instead of a correlated scan per token
+    connection.execute(
+        text(
+            "CREATE TEMP TABLE token_max_weight"
+            " (token_id INTEGER PRIMARY KEY, max_weight INTEGER NOT NULL)"
+        )
+    )
+    connection.execute(
+        text(
+            "INSERT INTO token_max_weight (token_id, max_weight)"
+            " SELECT token_id, MAX(total) FROM ("
+            "  SELECT token_id, SUM(weight) AS total FROM indexentry"
+            "  GROUP BY document_type, token_id, document_id"
+            " ) GROUP BY token_id"
+        )
+    )
+    connection.execute(
+        text(
+            "UPDATE indextoken SET max_weight = ("
+            " SELECT max_weight FROM token_max_weight"
+            " WHERE token_id = indextoken.id"
+            ") WHERE id IN (SELECT token_id FROM token_max_weight)"
+        )
+    )
+    connection.execute(text("DROP TABLE token_max_weight"))
+
+
+def _add_field_hashes(connection: Connection) -> None:
+    """Version 3: per-field content hashes for change-aware reindexing.
+
+    Starts empty; documents indexed before are rewritten as a whole the next
+    time they are indexed, which also records their hashes.
+    """
+    IndexFieldHash.__table__.create(connection, checkfirst=True)
+    for index in IndexFieldHash.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+# Ordered (version, step) pairs. A step upgrades a database that is at the
+# previous version; add new steps at the end and never edit shipped ones.
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = [
+    (1, _migrate_to_composite_indexes),
+    (2, _add_token_max_weight),
+    (3, _add_field_hashes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+class SchemaMigrationService:
+    """Create or upgrade the index schema of a SQLite database.
+
+    The applied version is tracked in SQLite's `PRAGMA user_version`:
+    - A database at `SCHEMA_VERSION` is left alone after reading the pragma
+    - A new database gets all tables at `SCHEMA_VERSION` directly
+    - An existing database runs every migration step above its version, each
+      in its own transaction
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def current_version(self) -> int:
+        with self.engine.connect() as connection:
+            return int(connection.execute(text("PRAGMA user_version")).scalar() or 0)
+
+    def is_up_to_date(self) -> bool:
+        return self.current_version() == SCHEMA_VERSION
+
+    def migrate(self) -> int:
+        """Bring the database to `SCHEMA_VERSION` and return that version."""
+        version = self.current_version()
+        if version == SCHEMA_VERSION:
+            # Nothing to do; skips create_all, which inspects every table
+            return version
+
+        if version == 0 and not self._has_index_tables():
+            logger.info("Creating index schema version %s", SCHEMA_VERSION)
+            SQLModel.metadata.create_all(self.engine)
+            self._set_version(SCHEMA_VERSION)
+            return SCHEMA_VERSION
+
+        # Tables missing from an older database are created at their current
+        # definition before upgrading the ones that exist
+        SQLModel.metadata.create_all(self.engine)
+
+        for step_version, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            logger.info("Migrating index schema to version %s", step_version)
+            with self.engine.begin() as connection:
+                step(connection)
+                connection.execute(text(f"PRAGMA user_version = {int(step_version)}"))
+            version = step_version
+
+        return version
+
+    def _has_index_tables(self) -> bool:
+        tables = set(inspect(self.engine).get_table_names())
+        return IndexToken.__tablename__ in tables or IndexEntry.__tablename__ in tables
+
+    def _set_version(self, version: int) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(text(f"PRAGMA user_version = {int(version)}"))
@@ -1,136 +1,818 @@
 from __future__ import annotations
 
+import hashlib
 import math
-from typing import Dict, Iterable, List, Optional
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import (
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
+from backends.sql_index_backend import SQLITE_MAX_VARIABLES, SqlIndexBackend
+from backends.sql_index_backend import chunks as _chunks
+from interfaces.index_backend_interface import (
+    DocumentKey,
+    EntryRow,
+    IndexBackendInterface,
+)
 from interfaces.indexable_document_interface import IndexableDocumentInterface
 from interfaces.tokenizer_interface import TokenizerInterface
 from models.index_entry import IndexEntry
 from models.index_token import IndexToken
 from sqlmodel import Session, select
-from sqlalchemy import delete as sa_delete
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from utils.fused_tokenizer import FusedTokenizer
+from utils.index_generation import IndexGeneration
+from utils.logger import get_logger
+from utils.lru_cache import LRUCache
+from utils.metrics import COUNT_BUCKETS, MetricsRegistry
+
+logger = get_logger(__name__)
+
+# Enough for the word, prefix and trigram vocabulary of a mid-sized catalog.
+DEFAULT_TOKEN_CACHE_SIZE = 100_000
+
+# Documents per transaction for `index_documents`.
+DEFAULT_BATCH_SIZE = 500
+
+# Field id and token weight of the rows written by the aggregated layout; the
+# token weight is already folded into each row's weight
+AGGREGATED_FIELD_ID = 0
+AGGREGATED_TOKEN_WEIGHT = 0
+
+TokenKey = Tuple[str, int]
+
+# ceil(sqrt(len)) for common token lengths; lengths 0 and 1 both map to 1
+_SQRT_LENGTH = tuple(math.ceil(math.sqrt(max(1, n))) for n in range(64))
+
+# (document_type, document_id, [(field_id, field_weight, content)])
+PreparedDocument = Tuple[int, int, List[Tuple[int, int, str]]]
+
+# (document_type, document_id, [(token, token_weight, field_id, final_weight)])
+TokenizedDocument = Tuple[int, int, List[Tuple[str, int, int, int]]]
+
+# Field ids of a document that need reindexing; None means every field
+ChangedFields = Optional[Set[int]]
+
+
+@dataclass
+class EntryDiff:
+    """Row changes that bring the stored entries of some documents up to date."""
+
+    deleted: List[int] = field(default_factory=list)
+    # (entry id, new weight)
+    updated: List[Tuple[int, int]] = field(default_factory=list)
+    inserted: List[EntryRow] = field(default_factory=list)
+    # Every entry of the documents after the change, for replicas and bounds
+    entries: List[EntryRow] = field(default_factory=list)
+
+
+@dataclass
+class IndexingStats:
+    """Throughput report returned by `SearchIndexingService.index_documents`."""
+
+    documents: int = 0
+    # Documents whose indexed fields were all unchanged and skipped
+    unchanged: int = 0
+    entries: int = 0
+    batches: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def entries_per_second(self) -> float:
+        return self.entries / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "documents": self.documents,
+            "unchanged": self.unchanged,
+            "entries": self.entries,
+            "batches": self.batches,
+            "elapsed_seconds": self.elapsed_seconds,
+            "documents_per_second": self.documents_per_second,
+            "entries_per_second": self.entries_per_second,
+        }
+
+
+class IndexingMetrics:
+    """Stage timings and sizes observed by `SearchIndexingService`.
+
+    Create one per process and share it between service instances, so the
+    metrics are looked up in the registry only once.
+    """
+
+    STAGES = ("hash", "tokenize", "resolve", "diff", "delete", "insert", "commit")
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.stages = {
+            stage: registry.histogram(
+                "index_stage_seconds",
+                "Time spent in each stage of writing an indexing batch",
+                stage=stage,
+            )
+            for stage in self.STAGES
+        }
+        self.tokens_per_document = registry.histogram(
+            "index_tokens_per_document",
+            "Tokens produced by the changed fields of a document",
+            COUNT_BUCKETS,
+        )
+        self.entries_per_commit = registry.histogram(
+            "index_entries_per_commit",
+            "Entry rows deleted, updated or inserted by one commit",
+            COUNT_BUCKETS,
+        )
+        self.documents = registry.counter(
+            "index_documents_total", "Documents written to the index"
+        )
+        self.unchanged = registry.counter(
+            "index_unchanged_documents_total",
+            "Documents skipped because no indexed field changed",
+        )
 
 
 class SearchIndexingService:
     """Python port of the provided PHP SearchIndexingService.
 
     Responsibilities:
-    - Remove any existing index entries for a document
-    - Run configured tokenizers over each indexable field
-    - Ensure tokens exist in `index_tokens` (find-or-create)
-    - Batch-insert `index_entries` with computed weights
+    - Skip fields whose content hash (text, field weight and tokenizer
+      configuration) matches the one stored in `index_field_hashes`
+    - Run configured tokenizers over each changed field through one fused
+      pipeline, optionally in a pool of worker processes
+      (`index_documents_parallel`)
+    - Resolve all tokens of a document against `index_tokens` in bulk,
+      serving hot tokens from an in-process (name, weight) -> id LRU cache
+    - Diff the new entries of changed fields against the stored ones and only
+      delete, update or insert the rows that differ, through the durable
+      `SqlIndexBackend`
+    - Raise each token's `max_weight` (its largest per-document weight), the
+      upper bound used by top-k pruning
+    - With `aggregate_entries`, fold the entries of a document into one row
+      per token name (see `aggregate_rows`)
+    - Commit once per indexed document, or once per chunk for `index_documents`
+    - Mirror every committed change to the `replicas` backends (e.g. an
+      in-memory inverted index used for search)
+
+    Pass the same `token_cache` to every service instance of a process so the
+    cache survives across sessions; `warm_up_tokens` preloads the N most
+    referenced tokens when that cache is still empty. A shared `generation`
+    is bumped after each committed write to invalidate search result caches.
+    With `metrics`, the time spent in each stage of a batch is recorded.
     """
 
-    def __init__(self, session: Session, tokenizers: Iterable[TokenizerInterface]):
+    def __init__(
+        self,
+        session: Session,
+        tokenizers: Iterable[TokenizerInterface],
+        token_cache: Optional[LRUCache] = None,
+        token_cache_size: int = DEFAULT_TOKEN_CACHE_SIZE,
+        warm_up_tokens: int = 0,
+        generation: Optional[IndexGeneration] = None,
+        replicas: Sequence[IndexBackendInterface] = (),
+        metrics: Optional[IndexingMetrics] = None,
+        aggregate_entries: bool = False,
+    ):
         self.session = session
+        self.backend = SqlIndexBackend(session)
+        self.replicas = list(replicas)
         self.tokenizers = list(tokenizers)
+        self.pipeline = FusedTokenizer(self.tokenizers)
+        self.aggregate_entries = aggregate_entries
+        # Switching layouts changes every field hash, so documents are rewritten
+        self._fingerprint = tokenizer_fingerprint(self.tokenizers) + (
+            b"|aggregated" if aggregate_entries else b""
+        )
+        self.token_cache = (
+            token_cache if token_cache is not None else LRUCache(token_cache_size)
+        )
+        # Bumped after every committed write so result caches can invalidate
+        self.generation = generation
+        self.metrics = metrics
+        # Token ids created in the open transaction; cached only after commit
+        self._uncommitted_tokens: Dict[TokenKey, int] = {}
+
+        if warm_up_tokens and len(self.token_cache) == 0:
+            self.warm_up_token_cache(warm_up_tokens)
 
     def index_document(self, document: IndexableDocumentInterface) -> None:
         # 1. Get document info
-        document_type = document.get_document_type()
-        # If document_type is an enum-like object, use its value
-        document_type_value = getattr(document_type, "value", document_type)
-        document_id = document.get_document_id()
-
-        indexable_fields = document.get_indexable_fields()
-
-        # attempt to retrieve fields and weights using common patterns
-        fields: Dict = {}
-        weights: Dict = {}
-        if hasattr(indexable_fields, "get_fields"):
-            fields = indexable_fields.get_fields() or {}
-        elif hasattr(indexable_fields, "fields"):
-            fields = getattr(indexable_fields, "fields") or {}
-        elif isinstance(indexable_fields, dict):
-            fields = indexable_fields.get("fields", indexable_fields) or {}
-
-        if hasattr(indexable_fields, "get_weights"):
-            weights = indexable_fields.get_weights() or {}
-        elif hasattr(indexable_fields, "weights"):
-            weights = getattr(indexable_fields, "weights") or {}
-        elif isinstance(indexable_fields, dict):
-            weights = indexable_fields.get("weights", {}) or {}
-
-        # 2. Remove existing index for this document
-        self._remove_document_index(document_type_value, document_id)
-
-        # 3. Prepare batch insert data
-        insert_entries: List[IndexEntry] = []
-
-        # 4. Process each field
-        for field_id_value, content in (fields or {}).items():
-            if not content:
-                continue
-
-            # normalize field id (support enum-like values)
-            field_id = getattr(field_id_value, "value", field_id_value)
-            field_weight = int(
-                weights.get(field_id_value, 0) or weights.get(field_id, 0) or 0
-            )
+        prepared = self._prepare_document(document)
 
-            # 5. Run all tokenizers on this field
-            for tokenizer in self.tokenizers:
-                tokens = tokenizer.tokenize(content)
-                for token in tokens:
-                    # tokenizer IndexToken uses `name` and `weight`
-                    token_value = getattr(token, "name", None)
-                    token_weight = int(
-                        getattr(token, "weight", tokenizer.get_weight() or 0) or 0
-                    )
+        # 2-7. Tokenize changed fields, write the entry diff and commit once
+        self._write_batch([prepared])
+
+    def index_documents(
+        self,
+        documents: Iterable[IndexableDocumentInterface],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> IndexingStats:
+        """Index a (possibly lazy) stream of documents in chunks.
+
+        The field hashes of each chunk are loaded with one query; unchanged
+        documents are skipped and only the changed fields of the others are
+        tokenized, their tokens resolved together, the entry diff written
+        with core `executemany` statements and committed as a single
+        transaction. Only one chunk is held in memory at a time.
+        """
+        stats = IndexingStats()
+        started = time.perf_counter()
+
+        for chunk in _batched(documents, max(1, int(batch_size))):
+            prepared = [self._prepare_document(document) for document in chunk]
+            entries, unchanged = self._write_batch(prepared)
+            stats.entries += entries
+            stats.unchanged += unchanged
+            stats.documents += len(chunk)
+            stats.batches += 1
+
+        stats.elapsed_seconds = time.perf_counter() - started
+        return stats
+
+    def index_documents_parallel(
+        self,
+        documents: Iterable[IndexableDocumentInterface],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: Optional[int] = None,
+        max_pending_batches: Optional[int] = None,
+        ordered: bool = True,
+    ) -> IndexingStats:
+        """Pipelined variant of `index_documents` that tokenizes in processes.
+
+        Chunks are reduced to plain data in this process, tokenized by a
+        `ProcessPoolExecutor` and written by this process (the single SQLite
+        writer) as the results arrive. At most `max_pending_batches` chunks
+        (default: twice the worker count) are in flight, which bounds memory
+        when `documents` is a large generator.
 
-                    if not token_value:
+        Workers tokenize every field; field hashes are compared only when a
+        chunk is written, against what earlier chunks committed, and the
+        tokens of unchanged fields are dropped there.
+
+        With `ordered=False` chunks are written in completion order. Only use
+        it when a document id cannot appear in more than one chunk, otherwise
+        an older version may overwrite a newer one.
+        """
+        workers = max(1, int(workers or os.cpu_count() or 1))
+        max_pending = max(1, int(max_pending_batches or workers * 2))
+        stats = IndexingStats()
+        started = time.perf_counter()
+
+        def write(future: Future) -> None:
+            prepared = submitted.pop(future)
+            entries, unchanged = self._write_batch(prepared, future.result())
+            stats.entries += entries
+            stats.unchanged += unchanged
+            stats.documents += len(prepared)
+            stats.batches += 1
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_tokenizer_worker,
+            initargs=(self.tokenizers,),
+        ) as executor:
+            pending: Deque[Future] = deque()
+            submitted: Dict[Future, List[PreparedDocument]] = {}
+
+            def drain(limit: int) -> None:
+                while len(pending) > limit:
+                    if ordered:
+                        write(pending.popleft())
                         continue
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        write(future)
 
-                    # 6. Find or create token in index_tokens
-                    token_id = self.find_or_create_token(token_value, token_weight)
+            for chunk in _batched(documents, max(1, int(batch_size))):
+                prepared = [self._prepare_document(document) for document in chunk]
+                future = executor.submit(_tokenize_in_worker, prepared)
+                submitted[future] = prepared
+                pending.append(future)
+                drain(max_pending - 1)
 
-                    # 7. Calculate final weight
-                    token_length = len(token_value)
-                    final_weight = int(
-                        field_weight
-                        * token_weight
-                        * math.ceil(math.sqrt(max(1, token_length)))
-                    )
+            drain(0)
 
-                    # 8. Add to batch insert (create IndexEntry object)
-                    entry = IndexEntry(
-                        token_id=int(token_id),
-                        document_type=int(document_type_value),
-                        field_id=int(field_id),
-                        document_id=int(document_id),
-                        weight=int(final_weight),
-                    )
-                    insert_entries.append(entry)
+        stats.elapsed_seconds = time.perf_counter() - started
+        return stats
+
+    def resolve_token_ids(self, tokens: Iterable[TokenKey]) -> Dict[TokenKey, int]:
+        """Map (name, weight) pairs to token ids, creating missing tokens.
+
+        Cached tokens skip the database entirely. The rest are fetched with
+        chunked `IN` queries and the missing ones are created with a single
+        multi-row `INSERT ... ON CONFLICT DO NOTHING`. Nothing is committed
+        here; the caller owns the transaction.
+        """
+        pending: Set[TokenKey] = {(name, int(weight)) for name, weight in tokens}
+        resolved: Dict[TokenKey, int] = self.token_cache.get_many(pending)
+        pending.difference_update(resolved)
+        if not pending:
+            return resolved
 
-        # 9. Batch insert for performance
-        if insert_entries:
-            self._batch_insert_search_documents(insert_entries)
+        for key in list(pending):
+            if key in self._uncommitted_tokens:
+                resolved[key] = self._uncommitted_tokens[key]
+                pending.discard(key)
+
+        fetched: Dict[TokenKey, int] = {}
+        self._fetch_token_ids(pending, fetched)
+        self.token_cache.put_many(fetched.items())
+        resolved.update(fetched)
+
+        missing = [key for key in pending if key not in fetched]
+        if missing:
+            # Tokens created concurrently by another writer are skipped by the
+            # unique (name, weight) index and picked up by the select below
+            self.session.execute(
+                sqlite_insert(IndexToken).on_conflict_do_nothing(
+                    index_elements=["name", "weight"]
+                ),
+                [{"name": name, "weight": weight} for name, weight in missing],
+            )
+            created: Dict[TokenKey, int] = {}
+            self._fetch_token_ids(set(missing), created)
+            self._uncommitted_tokens.update(created)
+            resolved.update(created)
+
+        return resolved
+
+    def warm_up_token_cache(self, limit: int) -> int:
+        """Load the `limit` most referenced tokens into the cache.
+
+        Returns the number of tokens loaded.
+        """
+        usage = func.count(IndexEntry.id)
+        stmt = (
+            select(IndexToken.id, IndexToken.name, IndexToken.weight)
+            .join(IndexEntry, IndexEntry.token_id == IndexToken.id)
+            .group_by(IndexToken.id)
+            .order_by(usage.desc())
+            .limit(int(limit))
+        )
+        rows = self.session.execute(stmt).all()
+        # Insert least used first so the hottest tokens are the last evicted
+        self.token_cache.put_many(
+            ((name, int(weight)), int(token_id))
+            for token_id, name, weight in reversed(rows)
+        )
+        return len(rows)
 
     def find_or_create_token(self, name: str, weight: int) -> int:
         """Find existing token by name+weight or create it and return its id."""
+        key = (name, int(weight))
+        cached = self.token_cache.get(key)
+        if cached is not None:
+            return cached
+
         stmt = select(IndexToken).where(
             IndexToken.name == name, IndexToken.weight == weight
         )
         result = self.session.exec(stmt).first()
         if result:
+            self.token_cache.put(key, int(result.id))
             return int(result.id)
 
         token = IndexToken(name=name, weight=int(weight))
         self.session.add(token)
-        self.session.commit()
+        self._commit()
         self.session.refresh(token)
+        self.token_cache.put(key, int(token.id))
         return int(token.id)
 
+    def _commit(self) -> Dict[TokenKey, int]:
+        """Commit and return the tokens that this transaction created."""
+        try:
+            self.session.commit()
+        except Exception:
+            self._rollback()
+            raise
+        created = self._uncommitted_tokens
+        self._uncommitted_tokens = {}
+        if created:
+            self.token_cache.put_many(created.items())
+        return created
+
+    def _rollback(self) -> None:
+        # Ids of tokens inserted in this transaction are no longer valid
+        self.session.rollback()
+        self._uncommitted_tokens.clear()
+
+    def _fetch_token_ids(self, keys: Set[TokenKey], resolved: Dict[TokenKey, int]):
+        names = sorted({name for name, _ in keys})
+        for chunk in _chunks(names, SQLITE_MAX_VARIABLES):
+            stmt = select(IndexToken.id, IndexToken.name, IndexToken.weight).where(
+                IndexToken.name.in_(chunk)
+            )
+            for token_id, name, weight in self.session.execute(stmt):
+                key = (name, int(weight))
+                if key in keys and key not in resolved:
+                    resolved[key] = int(token_id)
+
+    def _extract_fields(self, indexable_fields) -> Tuple[Dict, Dict]:
+        return extract_fields(indexable_fields)
+
+    def _prepare_document(
+        self, document: IndexableDocumentInterface
+    ) -> PreparedDocument:
+        return prepare_document(document)
+
+    def _tokenize_document(
+        self, document: IndexableDocumentInterface
+    ) -> TokenizedDocument:
+        # 2. Tokenize every field
+        return tokenize_prepared_document(
+            self.pipeline, self._prepare_document(document)
+        )
+
+    def _write_batch(
+        self,
+        documents: Sequence[PreparedDocument],
+        tokenized: Optional[Sequence[TokenizedDocument]] = None,
+    ) -> Tuple[int, int]:
+        """Bring the index of prepared documents up to date in one transaction.
+
+        `tokenized` holds the same documents already tokenized (by worker
+        processes); without it only the changed fields are tokenized here.
+
+        Returns the number of entries written (inserted or updated) and the
+        number of documents skipped because no field changed.
+        """
+        # A later version of the same document within a batch wins
+        latest: Dict[DocumentKey, int] = {}
+        for position, (document_type, document_id, _) in enumerate(documents):
+            latest[(document_type, document_id)] = position
+
+        metrics = self.metrics
+        clock = time.perf_counter() if metrics is not None else 0.0
+        try:
+            # 2. Compare field hashes; documents without stored hashes (new or
+            #    indexed before hashes existed) are reindexed as a whole
+            stored = self.backend.field_hashes(list(latest))
+            hashes: Dict[DocumentKey, Dict[int, str]] = {}
+            changed: Dict[DocumentKey, ChangedFields] = {}
+            for key, position in latest.items():
+                new_hashes = field_hashes(documents[position], self._fingerprint)
+                old_hashes = stored.get(key)
+                if new_hashes == (old_hashes or {}):
+                    continue
+                hashes[key] = new_hashes
+                if old_hashes is None or self.aggregate_entries:
+                    # Aggregated rows span every field of the document
+                    changed[key] = None
+                    continue
+                field_ids = new_hashes.keys() | old_hashes.keys()
+                fields = {
+                    field_id
+                    for field_id in field_ids
+                    if new_hashes.get(field_id) != old_hashes.get(field_id)
+                }
+                # Comparing every stored entry also drops rows of a previous
+                # layout, whose field ids no hash refers to
+                changed[key] = None if fields == field_ids else fields
+
+            if metrics is not None:
+                clock = _lap(metrics, "hash", clock)
+            if not changed:
+                self._commit()
+                if metrics is not None:
+                    _lap(metrics, "commit", clock)
+                    metrics.unchanged.inc(len(latest))
+                return 0, len(latest)
+
+            # 3. Tokenize the changed fields only and resolve their tokens
+            rows_by_key = {
+                key: self._changed_rows(
+                    documents[latest[key]],
+                    tokenized[latest[key]] if tokenized is not None else None,
+                    fields,
+                )
+                for key, fields in changed.items()
+            }
+            if self.aggregate_entries:
+                rows_by_key = {
+                    key: aggregate_rows(rows) for key, rows in rows_by_key.items()
+                }
+            if metrics is not None:
+                clock = _lap(metrics, "tokenize", clock)
+                for rows in rows_by_key.values():
+                    metrics.tokens_per_document.observe(len(rows))
+            token_ids = self.resolve_token_ids(
+                (token_value, token_weight)
+                for rows in rows_by_key.values()
+                for token_value, token_weight, _, _ in rows
+            )
+
+            if metrics is not None:
+                clock = _lap(metrics, "resolve", clock)
+
+            # 4-6. Write only the rows that differ from the stored entries
+            keys = list(changed)
+            diff = diff_entries(
+                self.backend.document_entries(keys),
+                (
+                    (
+                        document_type,
+                        document_id,
+                        token_ids[(token_value, token_weight)],
+                        field_id,
+                        final_weight,
+                    )
+                    for (document_type, document_id), rows in rows_by_key.items()
+                    for token_value, token_weight, field_id, final_weight in rows
+                ),
+                changed,
+            )
+            if metrics is not None:
+                clock = _lap(metrics, "diff", clock)
+            self.backend.delete_entries(diff.deleted)
+            if metrics is not None:
+                clock = _lap(metrics, "delete", clock)
+            self.backend.update_entry_weights(diff.updated)
+            self.backend.insert_entries(diff.inserted)
+            self.backend.replace_field_hashes(hashes)
+            self.backend.raise_token_bounds(token_bounds(diff.entries))
+            if metrics is not None:
+                clock = _lap(metrics, "insert", clock)
+        except Exception:
+            self._rollback()
+            raise
+
+        # 7. Single commit for deletes, new tokens, entries and hashes
+        created_tokens = self._commit()
+        if metrics is not None:
+            _lap(metrics, "commit", clock)
+            metrics.entries_per_commit.observe(
+                len(diff.deleted) + len(diff.updated) + len(diff.inserted)
+            )
+            metrics.documents.inc(len(changed))
+            metrics.unchanged.inc(len(latest) - len(changed))
+
+        self._apply_to_replicas(keys, diff.entries, created_tokens)
+        if self.generation is not None:
+            self.generation.bump(document_type for document_type, _ in keys)
+        return len(diff.updated) + len(diff.inserted), len(latest) - len(changed)
+
+    def _changed_rows(
+        self,
+        prepared: PreparedDocument,
+        tokenized: Optional[TokenizedDocument],
+        fields: ChangedFields,
+    ) -> List[Tuple[str, int, int, int]]:
+        if tokenized is not None:
+            rows = tokenized[2]
+            if fields is None:
+                return rows
+            return [row for row in rows if row[2] in fields]
+
+        document_type, document_id, prepared_fields = prepared
+        if fields is not None:
+            prepared_fields = [item for item in prepared_fields if item[0] in fields]
+        return tokenize_prepared_document(
+            self.pipeline, (document_type, document_id, prepared_fields)
+        )[2]
+
+    def _apply_to_replicas(
+        self,
+        keys: List[Tuple[int, int]],
+        entries: List[EntryRow],
+        created_tokens: Dict[TokenKey, int],
+    ) -> None:
+        # The SQL tables are already committed and stay the source of truth; a
+        # replica that fails here must be rebuilt from them
+        for replica in self.replicas:
+            try:
+                if created_tokens:
+                    replica.register_tokens(created_tokens)
+                replica.replace_documents(keys, entries)
+            except Exception:
+                logger.exception("Failed to update index replica %r", replica)
+
     def _remove_document_index(self, document_type: int, document_id: int) -> None:
-        # Efficient delete using SQLAlchemy core delete
-        delete_stmt = sa_delete(IndexEntry).where(
-            IndexEntry.document_type == int(document_type),
-            IndexEntry.document_id == int(document_id),
+        self.backend.replace_documents([(int(document_type), int(document_id))], [])
+
+
+def _lap(metrics: IndexingMetrics, stage: str, started: float) -> float:
+    """Record the time since `started` for `stage` and return the current time."""
+    now = time.perf_counter()
+    metrics.stages[stage].observe(now - started)
+    return now
+
+
+def tokenizer_fingerprint(tokenizers: Iterable[TokenizerInterface]) -> bytes:
+    """Identify a tokenizer configuration, so field hashes change with it."""
+    return repr(
+        [
+            (type(tokenizer).__module__, type(tokenizer).__qualname__)
+            + tuple(sorted(vars(tokenizer).items()))
+            for tokenizer in tokenizers
+        ]
+    ).encode("utf-8")
+
+
+def field_hashes(prepared: PreparedDocument, fingerprint: bytes) -> Dict[int, str]:
+    """Hash each field's weight and content together with `fingerprint`."""
+    digests: Dict[int, "hashlib._Hash"] = {}
+    for field_id, field_weight, content in prepared[2]:
+        digest = digests.get(field_id)
+        if digest is None:
+            digest = digests[field_id] = hashlib.blake2b(fingerprint, digest_size=16)
+        digest.update(f"{field_weight}\0".encode("utf-8"))
+        digest.update(str(content).encode("utf-8", "surrogatepass"))
+    return {field_id: digest.hexdigest() for field_id, digest in digests.items()}
+
+
+def diff_entries(
+    existing: Iterable[Tuple[int, EntryRow]],
+    new: Iterable[EntryRow],
+    changed: Dict[DocumentKey, ChangedFields],
+) -> EntryDiff:
+    """Compare stored (entry id, entry) rows with the new entries.
+
+    Only fields listed in `changed` are compared, the stored entries of other
+    fields are kept as they are. New entries are merged to one row per
+    (document, token, field); repeated stored rows of the same key, written
+    before that, are merged into the first one.
+    """
+    diff = EntryDiff()
+
+    wanted: Dict[Tuple[int, int, int, int], int] = {}
+    for document_type, document_id, token_id, field_id, weight in new:
+        key = (document_type, document_id, token_id, field_id)
+        wanted[key] = wanted.get(key, 0) + weight
+
+    current: Dict[Tuple[int, int, int, int], List[Tuple[int, int]]] = {}
+    for entry_id, entry in existing:
+        document_type, document_id, token_id, field_id, weight = entry
+        fields = changed[(document_type, document_id)]
+        if fields is not None and field_id not in fields:
+            diff.entries.append(entry)
+            continue
+        key = (document_type, document_id, token_id, field_id)
+        current.setdefault(key, []).append((entry_id, weight))
+
+    for key, rows in current.items():
+        weight = wanted.pop(key, None)
+        if weight is None:
+            diff.deleted.extend(entry_id for entry_id, _ in rows)
+            continue
+        (entry_id, old_weight), duplicates = rows[0], rows[1:]
+        diff.deleted.extend(duplicate_id for duplicate_id, _ in duplicates)
+        if duplicates or old_weight != weight:
+            diff.updated.append((entry_id, weight))
+        diff.entries.append(key + (weight,))
+
+    for key, weight in wanted.items():
+        diff.inserted.append(key + (weight,))
+        diff.entries.append(key + (weight,))
+    return diff
+
+
+def token_bounds(entries: Iterable[EntryRow]) -> Dict[int, int]:
+    """Largest summed weight of each token within a single document."""
+    totals: Dict[Tuple[int, int, int], int] = {}
+    for document_type, document_id, token_id, _, weight in entries:
+        key = (document_type, document_id, token_id)
+        totals[key] = totals.get(key, 0) + weight
+
+    bounds: Dict[int, int] = {}
+    for (_, _, token_id), total in totals.items():
+        if total > bounds.get(token_id, 0):
+            bounds[token_id] = total
+    return bounds
+
+
+def aggregate_rows(
+    rows: Iterable[Tuple[str, int, int, int]],
+) -> List[Tuple[str, int, int, int]]:
+    """Fold tokenized rows into one row per token name.
+
+    The final weights (field weight x token weight x length factor) of every
+    field and tokenizer that produced a name are summed into a single row
+    with `AGGREGATED_TOKEN_WEIGHT` and `AGGREGATED_FIELD_ID`, so a document
+    stores one entry per (token, document) and search scores stay the same.
+    """
+    totals: Dict[str, int] = {}
+    for token_value, _, _, final_weight in rows:
+        totals[token_value] = totals.get(token_value, 0) + final_weight
+    return [
+        (token_value, AGGREGATED_TOKEN_WEIGHT, AGGREGATED_FIELD_ID, weight)
+        for token_value, weight in totals.items()
+    ]
+
+
+def extract_fields(indexable_fields) -> Tuple[Dict, Dict]:
+    # attempt to retrieve fields and weights using common patterns
+    fields: Dict = {}
+    weights: Dict = {}
+    if hasattr(indexable_fields, "get_fields"):
+        fields = indexable_fields.get_fields() or {}
+    elif hasattr(indexable_fields, "fields"):
+        fields = getattr(indexable_fields, "fields") or {}
+    elif isinstance(indexable_fields, dict):
+        fields = indexable_fields.get("fields", indexable_fields) or {}
+
+    if hasattr(indexable_fields, "get_weights"):
+        weights = indexable_fields.get_weights() or {}
+    elif hasattr(indexable_fields, "weights"):
+        weights = getattr(indexable_fields, "weights") or {}
+    elif isinstance(indexable_fields, dict):
+        weights = indexable_fields.get("weights", {}) or {}
+
+    return fields, weights
+
+
+def prepare_document(document: IndexableDocumentInterface) -> PreparedDocument:
+    """Reduce a document to plain, picklable data ready for tokenization."""
+    # 1. Get document info
+    document_type = document.get_document_type()
+    # If document_type is an enum-like object, use its value
+    document_type_value = getattr(document_type, "value", document_type)
+    document_id = document.get_document_id()
+
+    fields, weights = extract_fields(document.get_indexable_fields())
+
+    prepared_fields: List[Tuple[int, int, str]] = []
+    for field_id_value, content in (fields or {}).items():
+        if not content:
+            continue
+
+        # normalize field id (support enum-like values)
+        field_id = getattr(field_id_value, "value", field_id_value)
+        field_weight = int(
+            weights.get(field_id_value, 0) or weights.get(field_id, 0) or 0
         )
-        self.session.exec(delete_stmt)
-        self.session.commit()
+        prepared_fields.append((int(field_id), field_weight, content))
+
+    return int(document_type_value), int(document_id), prepared_fields
+
+
+def tokenize_prepared_document(
+    pipeline: FusedTokenizer, prepared: PreparedDocument
+) -> TokenizedDocument:
+    """Run all tokenizers over the fields of a prepared document.
+
+    Module level (rather than a method) so worker processes can run it.
+    """
+    document_type, document_id, prepared_fields = prepared
+    rows: List[Tuple[str, int, int, int]] = []
+    sqrt_length = _SQRT_LENGTH
+
+    for field_id, field_weight, content in prepared_fields:
+        # Run all tokenizers on this field, normalizing the text only once
+        for token_value, token_weight in pipeline.tokenize_pairs(content):
+            # Calculate final weight
+            token_length = len(token_value)
+            length_factor = (
+                sqrt_length[token_length]
+                if token_length < len(sqrt_length)
+                else math.ceil(math.sqrt(token_length))
+            )
+            final_weight = int(field_weight * token_weight * length_factor)
+
+            rows.append((token_value, token_weight, field_id, final_weight))
+
+    return document_type, document_id, rows
+
+
+# Tokenizer pipeline of a worker process, installed once by the pool initializer
+_worker_pipeline: Optional[FusedTokenizer] = None
+
+
+def _init_tokenizer_worker(tokenizers: List[TokenizerInterface]) -> None:
+    global _worker_pipeline
+    _worker_pipeline = FusedTokenizer(tokenizers)
+
+
+def _tokenize_in_worker(
+    prepared_documents: List[PreparedDocument],
+) -> List[TokenizedDocument]:
+    return [
+        tokenize_prepared_document(_worker_pipeline, prepared)
+        for prepared in prepared_documents
+    ]
+
 
-    def _batch_insert_search_documents(self, entries: List[IndexEntry]) -> None:
-        # Use bulk save for performance
-        self.session.add_all(entries)
-        self.session.commit()
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
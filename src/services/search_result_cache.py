@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from utils.index_generation import IndexGeneration
+
+# Rough per-object footprints used for the memory bound
+_ENTRY_OVERHEAD_BYTES = 200
+_RESULT_BYTES = 120
+_TOKEN_OVERHEAD_BYTES = 60
+
+CacheKey = Tuple[int, FrozenSet[str], Optional[int]]
+
+
+class SearchResultCache:
+    """LRU + TTL cache of search results, invalidated by index generation.
+
+    Keys are (document_type, normalized token set, limit), so queries that
+    differ only in case, punctuation or word order share an entry. An entry
+    is served only while:
+    - it is younger than `ttl_seconds` (0 disables expiry)
+    - the `IndexGeneration` of its document type has not moved since it was
+      filled
+    The least recently used entries are evicted beyond `max_entries` or
+    `max_bytes` (estimated).
+    """
+
+    def __init__(
+        self,
+        generation: IndexGeneration,
+        max_entries: int = 10000,
+        ttl_seconds: float = 300.0,
+        max_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.generation = generation
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = max(0, int(max_bytes))
+        # key -> (generation, expires_at, size, results)
+        self._data: (
+            "OrderedDict[CacheKey, Tuple[Tuple[int, int], float, int, List[Any]]]"
+        ) = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, generation: IndexGeneration) -> "SearchResultCache":
+        return cls(
+            generation,
+            max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL", "300")),
+            max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        )
+
+    @staticmethod
+    def make_key(document_type: int, token_values, limit: Optional[int]) -> CacheKey:
+        return int(document_type), frozenset(token_values), limit
+
+    def get(self, key: CacheKey) -> Optional[List[Any]]:
+        current = self.generation.current(key[0])
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            generation, expires_at, _, results = entry
+            if generation != current:
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if self.ttl_seconds and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return results
+
+    def snapshot_generation(self, document_type: int) -> Tuple[int, int]:
+        """Generation to pass to `put`; read it *before* running the query."""
+        return self.generation.current(document_type)
+
+    def put(
+        self, key: CacheKey, generation: Tuple[int, int], results: List[Any]
+    ) -> None:
+        if self.max_entries == 0:
+            return
+        size = (
+            _ENTRY_OVERHEAD_BYTES
+            + sum(len(token) + _TOKEN_OVERHEAD_BYTES for token in key[1])
+            + len(results) * _RESULT_BYTES
+        )
+        if self.max_bytes and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (generation, expires_at, size, list(results))
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
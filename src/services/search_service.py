@@ -1,110 +1,376 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backends.sql_index_backend import SqlIndexBackend
+from backends.token_dictionary import TokenDictionary
+from backends.typo_corrector import TypoCorrector
+from interfaces.index_backend_interface import IndexBackendInterface
+from interfaces.tokenizer_interface import TokenizerInterface
+from services.search_result_cache import SearchResultCache
+from sqlmodel import Session
+from utils.fused_tokenizer import FusedTokenizer
+from utils.metrics import MetricsRegistry
+
+# Upper bound on distinct query tokens (prevent DoS with huge queries)
+MAX_QUERY_TOKENS = 300
+
+# Results scoring below this fraction of the best match are dropped
+MIN_NORMALIZED_SCORE = 0.05
+
+
+class SearchMetrics:
+    """Stage timings and counters observed by `SearchService`.
+
+    Create one per process and share it between service instances, so the
+    metrics are looked up in the registry only once.
+    """
+
+    STAGES = ("tokenize", "expand", "resolve", "score")
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.stages = {
+            stage: registry.histogram(
+                "search_stage_seconds",
+                "Time spent in each stage of a search",
+                stage=stage,
+            )
+            for stage in self.STAGES
+        }
+        self.searches = registry.counter("search_queries_total", "Searches run")
+        self.cache_hits = registry.counter(
+            "search_cache_hits_total", "Searches answered from the result cache"
+        )
+
+
 class SearchService:
-    def search(self, document_type, query: str, limit: int = None) -> list:
+    """Search over the index written by `SearchIndexingService`.
+
+    A query is tokenized with the same tokenizers as the indexer, its tokens
+    are resolved to ids and documents are scored by summing the weights of
+    their matching entries. Scores are normalized against the best match.
+
+    Resolution and scoring are delegated to an index backend: by default
+    `SqlIndexBackend`, which does both in SQLite, or e.g. a shared
+    `MemoryIndexBackend` that answers from an in-process inverted index.
+
+    With a `result_cache`, repeated queries over an unchanged index are
+    answered from memory without touching SQLite.
+
+    With a `token_dictionary`, query words are also expanded to the indexed
+    words they are a prefix of, so prefix search works without indexing
+    every prefix through `PrefixTokenizer`. With a `typo_corrector`,
+    misspelled query words also match the indexed words closest to them.
+
+    With `metrics`, the time spent tokenizing the query, expanding it,
+    resolving its tokens (SQL for the default backend) and scoring is
+    recorded per search.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        tokenizers: Iterable[TokenizerInterface],
+        result_cache: Optional[SearchResultCache] = None,
+        backend: Optional[IndexBackendInterface] = None,
+        token_dictionary: Optional[TokenDictionary] = None,
+        typo_corrector: Optional[TypoCorrector] = None,
+        metrics: Optional[SearchMetrics] = None,
+    ):
+        self.session = session
+        self.backend = backend if backend is not None else SqlIndexBackend(session)
+        self.tokenizers = list(tokenizers)
+        self.pipeline = FusedTokenizer(self.tokenizers)
+        self.result_cache = result_cache
+        self.token_dictionary = token_dictionary
+        self.typo_corrector = typo_corrector
+        self.metrics = metrics
+
+    def search(
+        self, document_type, query: str, limit: Optional[int] = None
+    ) -> List[SearchResult]:
         """
         Perform a search based on the given document type and query.
-        
+
         Args:
             document_type: The type of document to search.
             query (str): The search query.
             limit (int, optional): The maximum number of results to return.
-        
+
         Returns:
-            list: The search results.
+            list: The search results, best match first.
         """
-        # 1. Tokenize query using all tokenizers
-        query_tokens = self.tokenize_query(query)
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.searches.inc()
+            started = time.perf_counter()
 
-        if not query_tokens:
+        # 1-4. Tokenize the query into unique, bounded token values
+        token_values = self.query_token_values(query)
+        if not token_values:
             return []
 
-        # 2. Extract unique token values
-        token_values = list(set(
-            token.value if isinstance(token, Token) else token
-            for token in query_tokens
-        ))
+        if metrics is not None:
+            started = _lap(metrics, "tokenize", started)
 
-        # 3. Sort tokens (longest first - prioritize specific matches)
-        token_values.sort(key=len, reverse=True)
+        # 5. Serve repeated queries from the result cache
+        cache = self.result_cache
+        if cache is not None:
+            document_type_value = int(getattr(document_type, "value", document_type))
+            key = cache.make_key(document_type_value, token_values, limit)
+            cached = cache.get(key)
+            if cached is not None:
+                if metrics is not None:
+                    metrics.cache_hits.inc()
+                return list(cached)
+            generation = cache.snapshot_generation(document_type_value)
 
-        # 4. Limit token count (prevent DoS with huge queries)
-        if len(token_values) > 300:
-            token_values = token_values[:300]
+        # 6. Expand prefixes and correct misspelled words
+        expanded_ids = self.expand_query(query)
+        if metrics is not None:
+            _lap(metrics, "expand", started)
+
+        # 7. Score documents in the backend
+        results = self.execute_search(document_type, token_values, limit, expanded_ids)
+
+        if cache is not None:
+            cache.put(key, generation, results)
+
+        # 8. Return results
+        return results
 
-        # 5. Execute optimized SQL query
-        results = self.execute_search(document_type, token_values, limit)
+    def search_many(
+        self, document_type, queries: Sequence[str], limit: Optional[int] = None
+    ) -> List[List[SearchResult]]:
+        """
+        Search several queries at once, e.g. every widget of a page.
+
+        Each query is tokenized, served from the result cache and expanded on
+        its own, but the tokens of all remaining queries are resolved with one
+        lookup and scored with one backend call (`search_many`), which reads
+        the postings the queries share only once.
+
+        Args:
+            document_type: The type of document to search.
+            queries (list): The search queries.
+            limit (int, optional): The maximum number of results per query.
+
+        Returns:
+            list: The search results of each query, in the order of `queries`.
+        """
+        results: List[List[SearchResult]] = [[] for _ in queries]
+        document_type_value = int(getattr(document_type, "value", document_type))
+        cache = self.result_cache
+        # (position, token values, expanded ids, cache key, cache generation)
+        pending = []
+        for position, query in enumerate(queries):
+            if self.metrics is not None:
+                self.metrics.searches.inc()
+            token_values = self.query_token_values(query)
+            if not token_values:
+                continue
+            key = generation = None
+            if cache is not None:
+                key = cache.make_key(document_type_value, token_values, limit)
+                cached = cache.get(key)
+                if cached is not None:
+                    if self.metrics is not None:
+                        self.metrics.cache_hits.inc()
+                    results[position] = list(cached)
+                    continue
+                generation = cache.snapshot_generation(document_type_value)
+            pending.append(
+                (position, token_values, self.expand_query(query), key, generation)
+            )
 
-        # 6. Return results
+        rows = self.score_documents_many(
+            document_type_value,
+            [token_values for _, token_values, _, _, _ in pending],
+            limit,
+            [expanded_ids for _, _, expanded_ids, _, _ in pending],
+        )
+        for (position, _, _, key, generation), query_rows in zip(pending, rows):
+            results[position] = normalize_scores(query_rows)
+            if cache is not None:
+                cache.put(key, generation, results[position])
         return results
 
-    def execute_search(self, document_type, token_values: list, limit: int = None) -> list:
+    def query_token_values(self, query: str) -> List[str]:
+        """Unique token values of `query`, longest first, capped in number."""
+        # 1. Tokenize query using all tokenizers
+        query_tokens = self.tokenize_query(query)
+        return unique_token_values(query_tokens) if query_tokens else []
+
+    def execute_search(
+        self,
+        document_type,
+        token_values: Sequence[str],
+        limit: Optional[int] = None,
+        expanded_ids: Sequence[int] = (),
+    ) -> List[SearchResult]:
         """
         Execute the search query and return results.
-        
+
         Args:
             document_type: The type of document to search.
             token_values (list): The token values to search for.
             limit (int, optional): The maximum number of results to return.
-        
+            expanded_ids (list, optional): Extra token ids, e.g. prefix expansions.
+
         Returns:
-            list: The search results.
+            list: The search results, best match first.
         """
-        token_count = len(token_values)
-        min_token_weight = 0.05  # Example threshold
-
-        # Build parameter placeholders for token values
-        token_placeholders = ','.join(['?'] * token_count)
-
-        # Build the SQL query (simplified for demonstration)
-        sql = "SELECT sd.document_id, ... FROM index_entries sd ..."
-
-        # Build parameters array
-        params = [
-            document_type.value,  # document_type
-            *token_values,        # token values for IN clause
-            document_type.value,  # for subquery
-            *token_values,        # token values for subquery
-            min_token_weight,     # minimum token weight
-            # ... more parameters
-        ]
-
-        # Execute query with parameter binding
-        results = self.connection.execute_query(sql, params).fetchall()
-
-        # Filter out results with low normalized scores (below threshold)
-        results = [
-            result for result in results
-            if float(result['score']) >= 0.05
-        ]
-
-        # Convert to SearchResult objects
-        return [
-            SearchResult(
-                document_id=int(result['document_id']),
-                score=float(result['score'])
-            )
-            for result in results
-        ]
+        return normalize_scores(
+            self.score_documents(document_type, token_values, limit, expanded_ids)
+        )
+
+    def score_documents(
+        self,
+        document_type,
+        token_values: Sequence[str],
+        limit: Optional[int] = None,
+        expanded_ids: Sequence[int] = (),
+        min_score: float = MIN_NORMALIZED_SCORE,
+    ) -> List[Tuple[int, int]]:
+        """Return raw (document id, score) rows, best match first.
+
+        Documents scoring below `min_score` times the best score are dropped.
+        """
+        # If document_type is an enum-like object, use its value
+        document_type_value = int(getattr(document_type, "value", document_type))
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+
+        token_ids = self.resolve_token_ids(token_values)
+        if expanded_ids:
+            token_ids = list(dict.fromkeys([*token_ids, *expanded_ids]))
+        if metrics is not None:
+            started = _lap(metrics, "resolve", started)
+        if not token_ids:
+            return []
 
-    def tokenize_query(self, query: str) -> list:
+        rows = self.backend.search(document_type_value, token_ids, limit, min_score)
+        if metrics is not None:
+            _lap(metrics, "score", started)
+        return rows
+
+    def score_documents_many(
+        self,
+        document_type,
+        token_value_lists: Sequence[Sequence[str]],
+        limit: Optional[int] = None,
+        expanded_id_lists: Optional[Sequence[Sequence[int]]] = None,
+        min_score: float = MIN_NORMALIZED_SCORE,
+    ) -> List[List[Tuple[int, int]]]:
+        """`score_documents` for several queries, resolved and scored together."""
+        if not token_value_lists:
+            return []
+        document_type_value = int(getattr(document_type, "value", document_type))
+        ids_by_name = self.backend.resolve_token_ids_by_name(
+            list({value for values in token_value_lists for value in values})
+        )
+        token_id_lists = []
+        for position, token_values in enumerate(token_value_lists):
+            token_ids = [
+                token_id
+                for value in token_values
+                for token_id in ids_by_name.get(value, ())
+            ]
+            if expanded_id_lists:
+                token_ids.extend(expanded_id_lists[position])
+            token_id_lists.append(list(dict.fromkeys(token_ids)))
+        return self.backend.search_many(
+            document_type_value, token_id_lists, limit, min_score
+        )
+
+    def tokenize_query(self, query: str) -> List[str]:
         """
         Tokenize the query string.
-        
+
         Args:
             query (str): The search query.
-        
+
         Returns:
-            list: A list of tokens.
+            list: Token names produced by all tokenizers (may contain duplicates).
         """
-        # Placeholder for tokenization logic
-        pass
+        if not query:
+            return []
+        return [name for name, _ in self.pipeline.tokenize_pairs(query)]
 
+    def expand_query(self, query: str) -> List[int]:
+        """Return the ids of indexed words that query words may stand for.
+
+        - With a `token_dictionary`: words that query words are a prefix of
+        - With a `typo_corrector`: words closest to misspelled query words
+        The dictionaries first pick up tokens created since the last search.
+        """
+        dictionaries = {
+            id(dictionary): dictionary
+            for dictionary in (
+                self.token_dictionary,
+                self.typo_corrector.dictionary if self.typo_corrector else None,
+            )
+            if dictionary is not None
+        }
+        if not dictionaries or not query:
+            return []
+        for dictionary in dictionaries.values():
+            dictionary.refresh(self.session)
+
+        expanded: Dict[int, None] = {}
+        if self.token_dictionary is not None:
+            expanded.update(dict.fromkeys(self.token_dictionary.expand_query(query)))
+        if self.typo_corrector is not None:
+            expanded.update(dict.fromkeys(self.typo_corrector.correct_query(query)))
+        return list(expanded)[:MAX_QUERY_TOKENS]
+
+    def resolve_token_ids(self, token_values: Sequence[str]) -> List[int]:
+        """Return the ids of all indexed tokens named in `token_values`.
+
+        A name can map to several ids (one per tokenizer weight).
+        """
+        if not token_values:
+            return []
+        return self.backend.resolve_token_ids(token_values)
 
-class Token:
-    def __init__(self, value):
-        self.value = value
+
+def unique_token_values(query_tokens: Iterable[str]) -> List[str]:
+    """Steps 2-4 of a search, shared with `ShardedSearchService`."""
+    # 2. Extract unique token values
+    token_values = list(set(query_tokens))
+
+    # 3. Sort tokens (longest first - prioritize specific matches)
+    token_values.sort(key=lambda value: (-len(value), value))
+
+    # 4. Limit token count (prevent DoS with huge queries)
+    return token_values[:MAX_QUERY_TOKENS]
+
+
+def normalize_scores(rows: Sequence[Tuple[int, int]]) -> List["SearchResult"]:
+    """Turn raw rows, best match first, into results scored relative to it."""
+    if not rows:
+        return []
+    # Rows are ordered by score, so the first one is the normalization base
+    max_score = float(rows[0][1]) or 1.0
+    return [
+        SearchResult(document_id=int(document_id), score=float(score) / max_score)
+        for document_id, score in rows
+    ]
+
+
+def _lap(metrics: SearchMetrics, stage: str, started: float) -> float:
+    """Record the time since `started` for `stage` and return the current time."""
+    now = time.perf_counter()
+    metrics.stages[stage].observe(now - started)
+    return now
 
 
 class SearchResult:
     def __init__(self, document_id: int, score: float):
         self.document_id = document_id
-        self.score = score
\ No newline at end of file
+        self.score = score
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"document_id": self.document_id, "score": self.score}
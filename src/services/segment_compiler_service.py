@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import glob
+import os
+from array import array
+from typing import Dict, List, Optional
+
+from backends.segment import SEGMENT_SUFFIX, SegmentWriter, segment_path
+from models.index_entry import IndexEntry
+from models.index_token import IndexToken
+from sqlalchemy import func
+from sqlmodel import Session, select
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rows fetched per round trip while streaming entries
+STREAM_BATCH_SIZE = 10_000
+
+
+class SegmentCompilerService:
+    """Compile the SQL index into one segment file per document type.
+
+    Entries are streamed in (document_type, token_id, document_id) order,
+    which the composite search index already provides, and the weights of a
+    token in different fields of a document are summed. Only one postings
+    list is held in memory at a time. Both reads run in one explicit read
+    transaction (pysqlite does not begin one for SELECTs), so the segments
+    are a consistent snapshot even while the indexer runs.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def compile(self, directory: str, quantize: bool = True) -> List[str]:
+        """Write the segments to `directory` and return their paths.
+
+        Segments of document types that no longer have entries are removed.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        # In WAL mode the snapshot is taken by the first read and held until
+        # the transaction ends, so every token an entry references has a name
+        dbapi_connection = self.session.connection().connection.driver_connection
+        began = not dbapi_connection.in_transaction
+        if began:
+            dbapi_connection.execute("BEGIN")
+        try:
+            return self._compile(directory, quantize)
+        finally:
+            if began and dbapi_connection.in_transaction:
+                dbapi_connection.execute("COMMIT")
+
+    def _compile(self, directory: str, quantize: bool) -> List[str]:
+        # 1. Token names, needed by every segment's name table
+        names: Dict[int, str] = {
+            int(token_id): name
+            for token_id, name in self.session.execute(
+                select(IndexToken.id, IndexToken.name)
+            )
+        }
+
+        # 2. Stream aggregated postings and cut them into segments
+        stmt = (
+            select(
+                IndexEntry.document_type,
+                IndexEntry.token_id,
+                IndexEntry.document_id,
+                func.sum(IndexEntry.weight),
+            )
+            .group_by(
+                IndexEntry.document_type, IndexEntry.token_id, IndexEntry.document_id
+            )
+            .order_by(
+                IndexEntry.document_type, IndexEntry.token_id, IndexEntry.document_id
+            )
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+
+        written: List[str] = []
+        writer: Optional[SegmentWriter] = None
+        current_token: Optional[int] = None
+        document_ids = array("q")
+        weights = array("q")
+
+        def flush_postings() -> None:
+            if writer is not None and current_token is not None:
+                if current_token not in names:
+                    # A nameless token could never be resolved by a search
+                    raise RuntimeError(
+                        f"Index entries reference token {current_token}, "
+                        "which has no row in indextoken"
+                    )
+                writer.add_postings(current_token, document_ids, weights)
+                writer.add_token_name(current_token, names[current_token])
+            del document_ids[:]
+            del weights[:]
+
+        try:
+            for document_type, token_id, document_id, weight in self.session.execute(
+                stmt
+            ):
+                if writer is None or writer.document_type != document_type:
+                    flush_postings()
+                    current_token = None
+                    if writer is not None:
+                        writer.close()
+                        written.append(writer.path)
+                    writer = SegmentWriter(
+                        segment_path(directory, document_type),
+                        document_type,
+                        quantize=quantize,
+                    )
+                if token_id != current_token:
+                    flush_postings()
+                    current_token = int(token_id)
+                document_ids.append(int(document_id))
+                weights.append(int(weight))
+
+            flush_postings()
+            if writer is not None:
+                writer.close()
+                written.append(writer.path)
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            raise
+
+        # 3. Drop segments of document types that have no entries anymore
+        for path in glob.glob(os.path.join(directory, f"*{SEGMENT_SUFFIX}")):
+            if path not in written:
+                os.remove(path)
+
+        logger.info("Compiled %s index segments into %s", len(written), directory)
+        return written
@@ -0,0 +1,475 @@
+from __future__ import annotations
+
+import dataclasses
+import heapq
+import os
+import time
+import zlib
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import groupby, islice
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backends.sql_index_backend import SqlIndexBackend
+from interfaces.index_backend_interface import DocumentKey, EntryRow
+from interfaces.indexable_document_interface import IndexableDocumentInterface
+from interfaces.tokenizer_interface import TokenizerInterface
+from models.index_entry import IndexEntry
+from models.index_token import IndexToken
+from services.schema_migration_service import SchemaMigrationService
+from services.search_indexing_service import (
+    DEFAULT_BATCH_SIZE,
+    IndexingStats,
+    SearchIndexingService,
+    _batched,
+    token_bounds,
+)
+from services.search_result_cache import SearchResultCache
+from services.search_service import (
+    MIN_NORMALIZED_SCORE,
+    SearchMetrics,
+    SearchResult,
+    SearchService,
+    normalize_scores,
+    unique_token_values,
+)
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from utils.database import SqliteSettings, create_sqlite_engine
+from utils.fused_tokenizer import FusedTokenizer
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Builds the indexing or search service of one shard from its session
+IndexingServiceFactory = Callable[[Session, int], SearchIndexingService]
+SearchServiceFactory = Callable[[Session, int], SearchService]
+
+
+@dataclass
+class ShardSettings:
+    """Where the shard databases live.
+
+    `path_template` is formatted with the shard number, e.g.
+    `shards/shard-{shard}.db`; a `count` of 0 disables sharding.
+    """
+
+    count: int = 0
+    path_template: str = "shards/shard-{shard}.db"
+
+    @classmethod
+    def from_env(cls) -> "ShardSettings":
+        defaults = cls()
+        return cls(
+            count=int(os.getenv("SHARD_COUNT", defaults.count)),
+            path_template=os.getenv("SHARD_PATH", defaults.path_template),
+        )
+
+    def paths(self) -> List[str]:
+        return [self.path_template.format(shard=shard) for shard in range(self.count)]
+
+
+def shard_for(document_type: int, document_id: int, shard_count: int) -> int:
+    """Shard of a document; stable across processes and Python versions."""
+    key = f"{int(document_type)}:{int(document_id)}".encode("ascii")
+    return zlib.crc32(key) % shard_count
+
+
+class IndexShards:
+    """One SQLite database per shard, each with the full index schema.
+
+    Documents are partitioned by `shard_for(document_type, document_id)`.
+    Every shard has its own tokens, entries and field hashes, so token ids
+    are only meaningful within their shard.
+    """
+
+    def __init__(self, engines: Sequence[Engine]) -> None:
+        if not engines:
+            raise ValueError("At least one shard is required")
+        self.engines = list(engines)
+
+    @classmethod
+    def open(
+        cls, settings: ShardSettings, sqlite_settings: SqliteSettings
+    ) -> "IndexShards":
+        """Create an engine per shard path with the given storage profile."""
+        engines = []
+        for path in settings.paths():
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            engines.append(
+                create_sqlite_engine(
+                    dataclasses.replace(sqlite_settings, database_file=path)
+                )
+            )
+        return cls(engines)
+
+    @property
+    def count(self) -> int:
+        return len(self.engines)
+
+    def migrate(self) -> List[int]:
+        return [SchemaMigrationService(engine).migrate() for engine in self.engines]
+
+    def shard_of(self, document: IndexableDocumentInterface) -> int:
+        document_type = document.get_document_type()
+        return shard_for(
+            getattr(document_type, "value", document_type),
+            document.get_document_id(),
+            self.count,
+        )
+
+    def dispose(self) -> None:
+        for engine in self.engines:
+            engine.dispose()
+
+
+class ShardedIndexingService:
+    """Index documents into their shards, one writer per shard in parallel.
+
+    Offers the `index_documents` method of `SearchIndexingService`, so it
+    can back a `BackgroundIndexer`. Each chunk of `batch_size` documents per
+    shard is partitioned and every shard writes its part through its own
+    `SearchIndexingService` and session on the `executor`, so SQLite write
+    locks are taken per file. Token caches must be per shard, because token
+    ids differ between shards.
+    """
+
+    def __init__(
+        self,
+        shards: IndexShards,
+        service_factory: IndexingServiceFactory,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.shards = shards
+        self.service_factory = service_factory
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=shards.count, thread_name_prefix="shard-writer"
+        )
+
+    def index_documents(
+        self,
+        documents: Iterable[IndexableDocumentInterface],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> IndexingStats:
+        batch_size = max(1, int(batch_size))
+        stats = IndexingStats()
+        started = time.perf_counter()
+
+        for chunk in _batched(documents, batch_size * self.shards.count):
+            partitions: Dict[int, List[IndexableDocumentInterface]] = {}
+            for document in chunk:
+                partitions.setdefault(self.shards.shard_of(document), []).append(
+                    document
+                )
+            futures = [
+                self.executor.submit(self._index_shard, shard, part, batch_size)
+                for shard, part in partitions.items()
+            ]
+            # Wait for every shard before raising, so no write outlives the call
+            errors = []
+            for future in futures:
+                try:
+                    shard_stats = future.result()
+                except Exception as exc:
+                    errors.append(exc)
+                    continue
+                stats.documents += shard_stats.documents
+                stats.unchanged += shard_stats.unchanged
+                stats.entries += shard_stats.entries
+                stats.batches += shard_stats.batches
+            if errors:
+                raise errors[0]
+
+        stats.elapsed_seconds = time.perf_counter() - started
+        return stats
+
+    def _index_shard(
+        self,
+        shard: int,
+        documents: List[IndexableDocumentInterface],
+        batch_size: int,
+    ) -> IndexingStats:
+        with Session(self.shards.engines[shard]) as session:
+            return self.service_factory(session, shard).index_documents(
+                documents, batch_size=batch_size
+            )
+
+
+class ShardedSearchService:
+    """Scatter a search over every shard and gather the best results.
+
+    The query is tokenized once; each shard then expands it and scores its
+    documents with its own `SearchService` (own token ids and dictionaries),
+    concurrently on the `executor`, and returns raw scores of its top
+    `limit`. The per-shard lists, already ordered, are merged with a heap.
+    A shard drops documents relative to its own best score, which is never
+    above the overall best, so the merge still sees every document that
+    passes the overall `MIN_NORMALIZED_SCORE` cut. Results match those of a
+    single database holding all documents.
+    """
+
+    def __init__(
+        self,
+        shards: IndexShards,
+        tokenizers: Iterable[TokenizerInterface],
+        service_factory: SearchServiceFactory,
+        executor: Optional[Executor] = None,
+        result_cache: Optional[SearchResultCache] = None,
+        metrics: Optional[SearchMetrics] = None,
+    ) -> None:
+        self.shards = shards
+        self.pipeline = FusedTokenizer(list(tokenizers))
+        self.service_factory = service_factory
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=shards.count, thread_name_prefix="shard-search"
+        )
+        self.result_cache = result_cache
+        self.metrics = metrics
+
+    def search(
+        self, document_type, query: str, limit: Optional[int] = None
+    ) -> List[SearchResult]:
+        if self.metrics is not None:
+            self.metrics.searches.inc()
+        if not query:
+            return []
+        query_tokens = [name for name, _ in self.pipeline.tokenize_pairs(query)]
+        if not query_tokens:
+            return []
+        token_values = unique_token_values(query_tokens)
+
+        document_type_value = int(getattr(document_type, "value", document_type))
+        cache = self.result_cache
+        if cache is not None:
+            key = cache.make_key(document_type_value, token_values, limit)
+            cached = cache.get(key)
+            if cached is not None:
+                if self.metrics is not None:
+                    self.metrics.cache_hits.inc()
+                return list(cached)
+            generation = cache.snapshot_generation(document_type_value)
+
+        futures = [
+            self.executor.submit(
+                self._score_shard,
+                shard,
+                document_type_value,
+                query,
+                token_values,
+                limit,
+            )
+            for shard in range(self.shards.count)
+        ]
+        results = normalize_scores(
+            merge_shard_rows([future.result() for future in futures], limit)
+        )
+
+        if cache is not None:
+            cache.put(key, generation, results)
+        return results
+
+    def search_many(
+        self, document_type, queries: Sequence[str], limit: Optional[int] = None
+    ) -> List[List[SearchResult]]:
+        """`SearchService.search_many` over every shard, one task per shard."""
+        results: List[List[SearchResult]] = [[] for _ in queries]
+        document_type_value = int(getattr(document_type, "value", document_type))
+        cache = self.result_cache
+        # (position, query, token values, cache key, cache generation)
+        pending = []
+        for position, query in enumerate(queries):
+            if self.metrics is not None:
+                self.metrics.searches.inc()
+            query_tokens = [name for name, _ in self.pipeline.tokenize_pairs(query)]
+            if not query_tokens:
+                continue
+            token_values = unique_token_values(query_tokens)
+            key = generation = None
+            if cache is not None:
+                key = cache.make_key(document_type_value, token_values, limit)
+                cached = cache.get(key)
+                if cached is not None:
+                    if self.metrics is not None:
+                        self.metrics.cache_hits.inc()
+                    results[position] = list(cached)
+                    continue
+                generation = cache.snapshot_generation(document_type_value)
+            pending.append((position, query, token_values, key, generation))
+        if not pending:
+            return results
+
+        futures = [
+            self.executor.submit(
+                self._score_shard_many,
+                shard,
+                document_type_value,
+                [query for _, query, _, _, _ in pending],
+                [token_values for _, _, token_values, _, _ in pending],
+                limit,
+            )
+            for shard in range(self.shards.count)
+        ]
+        shard_rows = [future.result() for future in futures]
+        for index, (position, _, _, key, generation) in enumerate(pending):
+            results[position] = normalize_scores(
+                merge_shard_rows([rows[index] for rows in shard_rows], limit)
+            )
+            if cache is not None:
+                cache.put(key, generation, results[position])
+        return results
+
+    def _score_shard(
+        self,
+        shard: int,
+        document_type: int,
+        query: str,
+        token_values: Sequence[str],
+        limit: Optional[int],
+    ) -> List[Tuple[int, int]]:
+        with Session(self.shards.engines[shard]) as session:
+            service = self.service_factory(session, shard)
+            expanded_ids = service.expand_query(query)
+            return service.score_documents(
+                document_type, token_values, limit, expanded_ids
+            )
+
+    def _score_shard_many(
+        self,
+        shard: int,
+        document_type: int,
+        queries: Sequence[str],
+        token_value_lists: Sequence[Sequence[str]],
+        limit: Optional[int],
+    ) -> List[List[Tuple[int, int]]]:
+        with Session(self.shards.engines[shard]) as session:
+            service = self.service_factory(session, shard)
+            expanded_id_lists = [service.expand_query(query) for query in queries]
+            return service.score_documents_many(
+                document_type, token_value_lists, limit, expanded_id_lists
+            )
+
+
+def merge_shard_rows(
+    shard_rows: Iterable[Sequence[Tuple[int, int]]],
+    limit: Optional[int],
+    min_score: float = MIN_NORMALIZED_SCORE,
+) -> List[Tuple[int, int]]:
+    """Merge per-shard (document id, score) rows, each ordered best first.
+
+    Keeps the backends' order (score descending, then document id) and their
+    cut of documents below `min_score` times the best score.
+    """
+    merged = heapq.merge(*shard_rows, key=lambda row: (-row[1], row[0]))
+    first = next(merged, None)
+    if first is None:
+        return []
+    threshold = first[1] * min_score
+    rows = [first]
+    for row in merged:
+        if row[1] < threshold or (limit is not None and len(rows) >= limit):
+            break
+        rows.append(row)
+    return rows
+
+
+@dataclass
+class ReshardStats:
+    documents: int = 0
+    entries: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def reshard(
+    source: IndexShards, target: IndexShards, batch_size: int = DEFAULT_BATCH_SIZE
+) -> ReshardStats:
+    """Copy the index of every document from `source` into its `target` shard.
+
+    The stored entries, field hashes and token bounds move as they are; the
+    documents are not tokenized again. Token ids are resolved by (name,
+    weight) in the target shard. Target shards must be separate databases;
+    a document already present in its target is replaced, so an interrupted
+    run can be repeated. A single unsharded database is a source of one shard.
+    """
+    stats = ReshardStats()
+    started = time.perf_counter()
+    pending: Dict[int, List[Tuple[DocumentKey, List[Tuple[str, int, int, int]]]]] = {}
+    hashes: Dict[int, Dict[DocumentKey, Dict[int, str]]] = {}
+
+    def flush(shard: int) -> None:
+        documents = pending.pop(shard, [])
+        if not documents:
+            return
+        with Session(target.engines[shard]) as session:
+            writer = SearchIndexingService(session, [])
+            token_ids = writer.resolve_token_ids(
+                (name, token_weight)
+                for _, rows in documents
+                for name, token_weight, _, _ in rows
+            )
+            entries: List[EntryRow] = [
+                (document_type, document_id, token_ids[(name, token_weight)], *row)
+                for (document_type, document_id), rows in documents
+                for name, token_weight, *row in rows
+            ]
+            keys = [key for key, _ in documents]
+            writer.backend.replace_documents(keys, entries)
+            writer.backend.replace_field_hashes(hashes.pop(shard, {}))
+            writer.backend.raise_token_bounds(token_bounds(entries))
+            writer._commit()
+        stats.entries += len(entries)
+
+    for engine in source.engines:
+        with Session(engine) as session:
+            stmt = (
+                select(
+                    IndexEntry.document_type,
+                    IndexEntry.document_id,
+                    IndexToken.name,
+                    IndexToken.weight,
+                    IndexEntry.field_id,
+                    IndexEntry.weight,
+                )
+                .join(IndexToken, IndexToken.id == IndexEntry.token_id)
+                .order_by(IndexEntry.document_type, IndexEntry.document_id)
+                .execution_options(yield_per=10_000)
+            )
+            rows = session.execute(stmt)
+            documents = groupby(rows, key=lambda row: (int(row[0]), int(row[1])))
+            while True:
+                batch = [
+                    (
+                        key,
+                        [
+                            (name, int(token_weight), int(field_id), int(weight))
+                            for _, _, name, token_weight, field_id, weight in group
+                        ],
+                    )
+                    for key, group in islice(documents, batch_size)
+                ]
+                if not batch:
+                    break
+                stored = SqlIndexBackend(session).field_hashes(
+                    [key for key, _ in batch]
+                )
+                for key, document_rows in batch:
+                    shard = shard_for(*key, target.count)
+                    pending.setdefault(shard, []).append((key, document_rows))
+                    if key in stored:
+                        hashes.setdefault(shard, {})[key] = stored[key]
+                    stats.documents += 1
+                    if len(pending[shard]) >= batch_size:
+                        flush(shard)
+        for shard in list(pending):
+            flush(shard)
+
+    stats.elapsed_seconds = time.perf_counter() - started
+    logger.info(
+        "Resharded %s documents (%s entries) into %s shards in %.1fs",
+        stats.documents,
+        stats.entries,
+        target.count,
+        stats.elapsed_seconds,
+    )
+    return stats
@@ -0,0 +1,122 @@
+"""
+SQLite engine configuration.
+
+Every pooled connection gets the same storage profile (journal mode,
+synchronous level, page cache, mmap, temp store, busy timeout) when it is
+opened. Settings come from environment variables so deployments can tune
+them the same way they set `LOG_LEVEL`.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlmodel import create_engine
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+@dataclass
+class SqliteSettings:
+    """Storage profile applied to every SQLite connection.
+
+    - WAL lets readers proceed while the indexer holds the write lock
+    - `synchronous=NORMAL` is durable across application crashes in WAL mode
+      and only risks the last transactions on power loss
+    - `cache_size` follows SQLite's convention: negative values are KiB
+    """
+
+    database_file: str = "database.db"
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    cache_size: int = -65536
+    mmap_size: int = 268435456
+    temp_store: str = "MEMORY"
+    busy_timeout_ms: int = 5000
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "SqliteSettings":
+        defaults = cls()
+        return cls(
+            database_file=os.getenv("SQLITE_FILE", defaults.database_file),
+            journal_mode=os.getenv("SQLITE_JOURNAL_MODE", defaults.journal_mode),
+            synchronous=os.getenv("SQLITE_SYNCHRONOUS", defaults.synchronous),
+            cache_size=int(os.getenv("SQLITE_CACHE_SIZE", defaults.cache_size)),
+            mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", defaults.mmap_size)),
+            temp_store=os.getenv("SQLITE_TEMP_STORE", defaults.temp_store),
+            busy_timeout_ms=int(
+                os.getenv("SQLITE_BUSY_TIMEOUT_MS", defaults.busy_timeout_ms)
+            ),
+            pool_size=int(os.getenv("DB_POOL_SIZE", defaults.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", defaults.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", defaults.pool_timeout)),
+        )
+
+    def validate(self) -> None:
+        """Raise ValueError for settings SQLite would reject or ignore."""
+        self.journal_mode = self.journal_mode.upper()
+        self.synchronous = self.synchronous.upper()
+        self.temp_store = self.temp_store.upper()
+        if self.journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unsupported SQLITE_JOURNAL_MODE: {self.journal_mode}")
+        if self.synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unsupported SQLITE_SYNCHRONOUS: {self.synchronous}")
+        if self.temp_store not in TEMP_STORES:
+            raise ValueError(f"Unsupported SQLITE_TEMP_STORE: {self.temp_store}")
+        if self.pool_size < 1:
+            raise ValueError("DB_POOL_SIZE must be at least 1")
+
+    @property
+    def url(self) -> str:
+        return f"sqlite:///{self.database_file}"
+
+    def pragmas(self) -> list:
+        return [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA cache_size={int(self.cache_size)}",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA temp_store={self.temp_store}",
+            f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}",
+        ]
+
+
+def create_sqlite_engine(settings: SqliteSettings) -> Engine:
+    """Create a pooled engine that applies `settings` to each new connection."""
+    settings.validate()
+    engine = create_engine(
+        settings.url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": settings.busy_timeout_ms / 1000,
+        },
+        poolclass=QueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+    )
+    apply_sqlite_pragmas(engine, settings)
+    return engine
+
+
+def apply_sqlite_pragmas(engine: Engine, settings: SqliteSettings) -> None:
+    """Run the profile's PRAGMAs on every connection `engine` opens."""
+    statements = settings.pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Tuple
+
+from interfaces.tokenizer_interface import TokenizerInterface
+from utils.ngrams_tokenizer import NGramsTokenizer
+from utils.prefix_tokenizer import PrefixTokenizer
+from utils.text_normalizer import extract_words
+from utils.word_tokenizer import WordTokenizer
+
+# Tokenizers whose output is fully derived from `extract_words`. Exact types
+# only: a subclass may override `tokenize` and must keep its own behaviour.
+_WORD_BASED_TOKENIZERS = (WordTokenizer, PrefixTokenizer, NGramsTokenizer)
+
+
+class FusedTokenizer:
+    """Run several tokenizers over a text with a single normalization pass.
+
+    The text is lowercased, cleaned and split once, and every word-based
+    tokenizer derives its tokens from that shared word list. Tokens are
+    returned as plain (name, weight) tuples instead of `IndexToken` models,
+    in the same order as calling each tokenizer's `tokenize` in turn.
+    Tokenizers of other types fall back to their own `tokenize`.
+    """
+
+    def __init__(self, tokenizers: Iterable[TokenizerInterface]) -> None:
+        self.tokenizers = list(tokenizers)
+        self._stages = [
+            (tokenizer, type(tokenizer) in _WORD_BASED_TOKENIZERS)
+            for tokenizer in self.tokenizers
+        ]
+
+    def tokenize_pairs(self, text: str) -> List[Tuple[str, int]]:
+        if not isinstance(text, str):
+            text = str(text)
+
+        words = None
+        pairs: List[Tuple[str, int]] = []
+        for tokenizer, word_based in self._stages:
+            if word_based:
+                if words is None:
+                    words = extract_words(text)
+                weight = tokenizer.weight
+                pairs.extend(
+                    (name, weight) for name in tokenizer.tokenize_words(words) if name
+                )
+                continue
+
+            for token in tokenizer.tokenize(text):
+                name = getattr(token, "name", None)
+                if name:
+                    weight = getattr(token, "weight", tokenizer.get_weight() or 0)
+                    pairs.append((name, int(weight or 0)))
+        return pairs
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class IndexGeneration:
+    """Monotonic counters that change whenever the index is written.
+
+    Caches store the generation they were filled at and treat an entry as
+    stale once it differs. With `per_document_type` enabled a write only
+    invalidates results of the document types it touched; `bump_all` (or
+    disabling it) invalidates everything.
+
+    Counters live in process memory: they only observe writes made through
+    services that share this instance.
+    """
+
+    def __init__(self, per_document_type: bool = True) -> None:
+        self.per_document_type = per_document_type
+        self._global = 0
+        self._by_type: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def current(self, document_type: Optional[int] = None) -> Tuple[int, int]:
+        """Return the (global, per-type) generation seen by `document_type`."""
+        with self._lock:
+            if document_type is None or not self.per_document_type:
+                return self._global, 0
+            return self._global, self._by_type.get(int(document_type), 0)
+
+    def bump(self, document_types: Iterable[int] = ()) -> None:
+        """Record a write affecting `document_types`."""
+        with self._lock:
+            if not self.per_document_type:
+                self._global += 1
+                return
+            touched = False
+            for document_type in set(document_types):
+                key = int(document_type)
+                self._by_type[key] = self._by_type.get(key, 0) + 1
+                touched = True
+            if not touched:
+                self._global += 1
+
+    def bump_all(self) -> None:
+        with self._lock:
+            self._global += 1
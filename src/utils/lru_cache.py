@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Iterable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded least-recently-used cache with hit/miss/eviction counters.
+
+    - `max_size` of 0 disables caching (every lookup is a miss)
+    - All operations are guarded by a lock so one instance can be shared by
+      the request handlers of a process
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        self.max_size = max(0, int(max_size))
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        """Return the cached subset of `keys`, counting hits and misses."""
+        found: Dict[K, V] = {}
+        with self._lock:
+            for key in keys:
+                try:
+                    value = self._data[key]
+                except KeyError:
+                    self.misses += 1
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                found[key] = value
+        return found
+
+    def put(self, key: K, value: V) -> None:
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._put(key, value)
+
+    def put_many(self, items: Iterable[Tuple[K, V]]) -> None:
+        if self.max_size == 0:
+            return
+        with self._lock:
+            for key, value in items:
+                self._put(key, value)
+
+    def discard(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _put(self, key: K, value: V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, 100us to 10s
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    10.0,
+)
+
+# Buckets for per-document and per-commit row counts
+COUNT_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000, 100000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative histogram rendered in the Prometheus text format."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # One count per bucket plus the +Inf bucket, not cumulative
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[position] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """Cumulative bucket counts, total count and sum."""
+        with self._lock:
+            counts, count, total = list(self._counts), self.count, self.sum
+        cumulative, running = [], 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, count, total
+
+
+class Counter:
+    """Monotonic counter rendered in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class MetricsRegistry:
+    """Process-wide set of histograms, counters and gauges.
+
+    A metric is identified by its name and labels; `histogram` and `counter`
+    return the existing instance when called again, so services can look
+    them up once per instance. Gauges are callables read at render time,
+    e.g. queue depths kept by other components.
+    """
+
+    def __init__(self, prefix: str = "littlesearch") -> None:
+        self.prefix = prefix
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], Counter] = {}
+        self._gauges: Dict[Tuple[str, Labels], Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["MetricsRegistry"]:
+        """A registry, or None when `METRICS_ENABLED` is off."""
+        enabled = os.getenv("METRICS_ENABLED", "1").lower()
+        return cls() if enabled in ("1", "true", "yes") else None
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        **labels: str,
+    ) -> Histogram:
+        return self._register(
+            self._histograms, name, help_text, "histogram", labels, buckets
+        )
+
+    def counter(self, name: str, help_text: str, **labels: str) -> Counter:
+        return self._register(self._counters, name, help_text, "counter", labels)
+
+    def gauge(
+        self, name: str, help_text: str, read: Callable[[], float], **labels: str
+    ) -> None:
+        key = (self._full_name(name), _labels(labels))
+        with self._lock:
+            self._help.setdefault(key[0], (help_text, "gauge"))
+            self._gauges[key] = read
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            described = dict(self._help)
+
+        lines: List[str] = []
+        headed = set()
+
+        def head(name: str) -> None:
+            if name not in headed:
+                headed.add(name)
+                help_text, kind = described[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            head(name)
+            cumulative, count, total = histogram.snapshot()
+            bounds = [_number(bound) for bound in histogram.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, cumulative):
+                lines.append(
+                    f"{name}_bucket{_format(labels + (('le', bound),))} {bucket_count}"
+                )
+            lines.append(f"{name}_sum{_format(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_format(labels)} {count}")
+        for (name, labels), counter in counters:
+            head(name)
+            lines.append(f"{name}{_format(labels)} {counter.value}")
+        for (name, labels), read in gauges:
+            head(name)
+            try:
+                value = float(read())
+            except Exception:
+                continue
+            lines.append(f"{name}{_format(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metrics, name, help_text, kind, labels, *args):
+        key = (self._full_name(name), _labels(labels))
+        with self._lock:
+            metric = metrics.get(key)
+            if metric is None:
+                self._help.setdefault(key[0], (help_text, kind))
+                metric = metrics[key] = (
+                    Histogram(*args) if kind == "histogram" else Counter()
+                )
+            return metric
+
+    def _full_name(self, name: str) -> str:
+        return f"{self.prefix}_{name}" if self.prefix else name
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value == int(value) else repr(float(value))
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-import re
 from typing import List
 
 from interfaces.tokenizer_interface import TokenizerInterface
 from models.index_token import IndexToken
+from utils.text_normalizer import extract_words
 
 
 class NGramsTokenizer(TokenizerInterface):
@@ -21,15 +21,18 @@ class NGramsTokenizer(TokenizerInterface):
         self.weight = int(weight)
 
     def _extract_words(self, text: str) -> List[str]:
-        s = (text or "").strip().lower()
-        s = re.sub(r"[^a-z0-9]", " ", s)
-        s = re.sub(r"\s+", " ", s)
-        words = [w for w in s.split(" ") if len(w) >= 2]
-        return words
+        return extract_words(text or "")
 
     def tokenize(self, text: str) -> List[IndexToken]:
         words = self._extract_words(text)
 
+        return [
+            IndexToken(name=ngram, weight=self.weight)
+            for ngram in self.tokenize_words(words)
+        ]
+
+    def tokenize_words(self, words: List[str]) -> List[str]:
+        """Return token names for already normalized words (see `FusedTokenizer`)."""
         tokens = {}
         for word in words:
             word_len = len(word)
@@ -38,7 +41,7 @@ class NGramsTokenizer(TokenizerInterface):
                 ngram = word[i : i + self.ngram_length]
                 tokens[ngram] = True
 
-        return [IndexToken(name=ngram, weight=self.weight) for ngram in tokens.keys()]
+        return list(tokens.keys())
 
     def get_weight(self) -> int:
         return self.weight
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-import re
 from typing import List
 
 from interfaces.tokenizer_interface import TokenizerInterface
 from models.index_token import IndexToken
+from utils.text_normalizer import extract_words
 
 
 class PrefixTokenizer(TokenizerInterface):
@@ -22,15 +22,18 @@ class PrefixTokenizer(TokenizerInterface):
         self.weight = int(weight)
 
     def _extract_words(self, text: str) -> List[str]:
-        s = (text or "").strip().lower()
-        s = re.sub(r"[^a-z0-9]", " ", s)
-        s = re.sub(r"\s+", " ", s)
-        words = [w for w in s.split(" ") if len(w) >= 2]
-        return words
+        return extract_words(text or "")
 
     def tokenize(self, text: str) -> List[IndexToken]:
         words = self._extract_words(text)
 
+        return [
+            IndexToken(name=prefix, weight=self.weight)
+            for prefix in self.tokenize_words(words)
+        ]
+
+    def tokenize_words(self, words: List[str]) -> List[str]:
+        """Return token names for already normalized words (see `FusedTokenizer`)."""
         prefixes = {}
         for word in words:
             word_len = len(word)
@@ -39,9 +42,7 @@ class PrefixTokenizer(TokenizerInterface):
                 prefixes[prefix] = True
 
         # Preserve insertion order by iterating keys (Python 3.7+ dict preserves order)
-        return [
-            IndexToken(name=prefix, weight=self.weight) for prefix in prefixes.keys()
-        ]
+        return list(prefixes.keys())
 
     def get_weight(self) -> int:
         return self.weight
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import re
+from typing import List
+
+# Everything the tokenizers do not index, collapsed in a single pass. Runs of
+# these characters become one separator, which also covers the separate
+# "collapse whitespace" step of the original PHP normalization.
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+MIN_WORD_LENGTH = 2
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase `text` and replace every run of non a-z0-9 characters by a space."""
+    return _NON_ALPHANUMERIC.sub(" ", text.lower()).strip()
+
+
+def extract_words(text: str) -> List[str]:
+    """Split normalized text into words of at least `MIN_WORD_LENGTH` characters.
+
+    Duplicates are kept in their original order; tokenizers decide whether
+    to de-duplicate.
+    """
+    return [w for w in normalize_text(text).split() if len(w) >= MIN_WORD_LENGTH]
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-import re
 from typing import List
 
 from interfaces.tokenizer_interface import TokenizerInterface
 from models.index_token import IndexToken
+from utils.text_normalizer import extract_words
 
 
 class WordTokenizer(TokenizerInterface):
@@ -25,18 +25,18 @@ class WordTokenizer(TokenizerInterface):
         if not isinstance(text, str):
             text = str(text)
 
-        # Normalize: lowercase, trim
-        s = text.strip().lower()
+        # Normalize (lowercase, non a-z0-9 to spaces, mirrors PHP pattern),
+        # split into words and filter short ones
+        words = extract_words(text)
 
-        # Replace non a-z0-9 with space (mirrors PHP pattern)
-        s = re.sub(r"[^a-z0-9]", " ", s)
-
-        # Collapse multiple whitespace into single space
-        s = re.sub(r"\s+", " ", s)
-
-        # Split into words and filter short ones
-        words = [w for w in s.split(" ") if len(w) >= 2]
+        # Map to IndexToken objects
+        tokens: List[IndexToken] = [
+            IndexToken(name=w, weight=self.weight) for w in self.tokenize_words(words)
+        ]
+        return tokens
 
+    def tokenize_words(self, words: List[str]) -> List[str]:
+        """Return token names for already normalized words (see `FusedTokenizer`)."""
         # Remove duplicates while preserving order
         seen = set()
         unique_words: List[str] = []
@@ -44,12 +44,7 @@ class WordTokenizer(TokenizerInterface):
             if w not in seen:
                 seen.add(w)
                 unique_words.append(w)
-
-        # Map to IndexToken objects
-        tokens: List[IndexToken] = [
-            IndexToken(name=w, weight=self.weight) for w in unique_words
-        ]
-        return tokens
+        return unique_words
 
     def get_weight(self) -> int:
         return self.weight